@@ -5,6 +5,7 @@ Main application for generating and displaying Reddit user personas.
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
@@ -22,7 +23,13 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 from src.reddit_scraper import RedditScraper
 from src.persona_generator import PersonaGenerator
 from src.graphrag_handler import GraphRAGHandler
-from src.graphrag_handler import GraphRAGHandler
+from src.corpus_store import RedditCorpus
+from src.raw_data_io import find_raw_data_file, load_raw_data
+from src.profiling import StageProfiler
+from src import metrics
+from src.item_store import SUBMISSION, as_item_store
+from src.activity_analytics import DAY_NAMES, compute_activity_analytics
+from src.persona_parser import get_parsed_persona, load_parsed_persona
 
 
 def setup_page():
@@ -86,64 +93,57 @@ def show_sidebar():
         show_raw_data = st.checkbox("Show Raw Data", False,
                                    help="Display scraped data in a separate tab")
         
-        return data_limit, show_raw_data
+        profile_run = st.checkbox("Profile Run", False,
+                                  help="Record per-stage timings for the analysis")
+        
+        return data_limit, show_raw_data, profile_run
+
+
+def _top_series(names, values, mask, n=10):
+    """The ``n`` largest ``values`` among the codes in ``mask`` as a name-indexed Series."""
+    codes = np.flatnonzero(mask)
+    codes = codes[np.argsort(-values[codes], kind='stable')[:n]]
+    return pd.Series(values[codes], index=[names[code] for code in codes])
 
 
 def analyze_user_activity(reddit_data):
-    """Analyze Reddit user activity for visualizations."""
-    submissions = reddit_data['submissions']
-    comments = reddit_data['comments']
-    
-    # Combine all data
-    all_data = []
-    
-    # Process submissions
-    for sub in submissions:
-        all_data.append({
-            'type': 'submission',
-            'subreddit': sub['subreddit'],
-            'score': sub['score'],
-            'created_utc': sub['created_utc'],
-            'text': f"{sub['title']} {sub['selftext']}"
-        })
-    
-    # Process comments
-    for comment in comments:
-        all_data.append({
-            'type': 'comment',
-            'subreddit': comment['subreddit'],
-            'score': comment['score'],
-            'created_utc': comment['created_utc'],
-            'text': comment['body']
-        })
-    
-    if not all_data:
-        return None
+    """Analyze Reddit user activity for visualizations.
+
+    Accepts either a ``reddit_data`` dict or an ``ItemStore``; every
+    statistic is computed straight from the store's columns.
+    """
+    store = as_item_store(reddit_data)
     
-    df = pd.DataFrame(all_data)
+    if len(store) == 0:
+        return None
     
-    # Convert timestamps
-    df['datetime'] = pd.to_datetime(df['created_utc'], unit='s')
-    df['hour'] = df['datetime'].dt.hour
-    df['day_of_week'] = df['datetime'].dt.day_name()
+    # Extended analytics straight from the store's arrays
+    analytics = compute_activity_analytics(store)
+    heatmap = analytics['heatmap']
     
     # Calculate statistics
-    total_posts = len(submissions)
-    total_comments = len(comments)
-    total_karma = df['score'].sum()
-    avg_karma = df['score'].mean()
-    
-    # Top subreddits
-    top_subreddits = df['subreddit'].value_counts().head(10)
-    karma_by_subreddit = df.groupby('subreddit')['score'].sum().sort_values(ascending=False).head(10)
-    
-    # Activity patterns
-    activity_by_hour = df['hour'].value_counts().sort_index()
-    activity_by_day = df['day_of_week'].value_counts()
+    total_posts = int((store.kinds == SUBMISSION).sum())
+    total_comments = len(store) - total_posts
+    total_karma = store.scores.sum()
+    avg_karma = store.scores.mean()
+    
+    # Top subreddits (per-code counts and karma; items without a subreddit are left out)
+    names, counts = store.subreddit_counts()
+    karma = np.bincount(store.subreddit_codes, weights=store.scores, minlength=len(names)).astype(np.int64)
+    named = counts > 0
+    top_subreddits = _top_series(names, counts, named)
+    karma_by_subreddit = _top_series(names, karma, named)
+    
+    # Activity patterns (hours/days with no activity are left out)
+    hour_counts = heatmap.sum(axis=0)
+    day_counts = heatmap.sum(axis=1)
+    activity_by_hour = pd.Series(hour_counts, index=range(24)).loc[lambda counts: counts > 0]
+    activity_by_day = pd.Series(day_counts, index=list(DAY_NAMES)).loc[lambda counts: counts > 0]
+    activity_by_day = activity_by_day.sort_values(ascending=False, kind='stable')
     
     # Most popular posts/comments
-    most_upvoted = df.loc[df['score'].idxmax()] if not df.empty else None
-    most_downvoted = df.loc[df['score'].idxmin()] if not df.empty else None
+    most_upvoted = _activity_highlight(store, int(store.scores.argmax()))
+    most_downvoted = _activity_highlight(store, int(store.scores.argmin()))
     
     return {
         'total_posts': total_posts,
@@ -156,10 +156,45 @@ def analyze_user_activity(reddit_data):
         'activity_by_day': activity_by_day,
         'most_upvoted': most_upvoted,
         'most_downvoted': most_downvoted,
-        'dataframe': df
+        'store': store,
+        'analytics': analytics
+    }
+
+
+def _activity_highlight(store, index):
+    """Summarize a single item for the most up/downvoted panels."""
+    return {
+        'score': int(store.scores[index]),
+        'subreddit': store.subreddit(index),
+        'type': store.kind_name(index),
+        'text': store.combined_text(index)
     }
 
 
+def load_corpus_data(username, limit=500):
+    """Load a user's stored history from the SQLite corpus, if present."""
+    try:
+        with RedditCorpus() as corpus:
+            data = corpus.load_user_data(username, limit=limit)
+        metrics.record_cache('corpus', data is not None)
+        return data
+    except Exception as e:
+        print(f"Error loading corpus data: {e}")
+        return None
+
+
+def load_raw_data_file(username, output_dir="output"):
+    """Load a user's raw data file (legacy JSON or NDJSON), if present."""
+    path = find_raw_data_file(username, output_dir)
+    if not path:
+        return None
+    try:
+        return load_raw_data(path)
+    except Exception as e:
+        print(f"Error loading raw data file {path}: {e}")
+        return None
+
+
 def generate_wordcloud(text):
     """Generate and display word cloud."""
     if not text or len(text.strip()) < 10:
@@ -183,34 +218,25 @@ def generate_wordcloud(text):
         st.error(f"Error generating word cloud: {e}")
 
 
-def display_persona(persona_text, username):
+def display_persona(persona_text, username, parsed=None):
     """Display the generated persona in a structured, user-friendly format."""
     st.header(f"🎭 User Persona: u/{username}")
     
-    # Parse the persona text for better display
-    lines = persona_text.split('\n')
-    current_section = ""
-    content = {}
-    
-    for line in lines:
-        line = line.strip()
-        if line.startswith('## '):
-            current_section = line[3:].strip()
-            content[current_section] = []
-        elif line and current_section:
-            content[current_section].append(line)
+    # Parsed once per persona text (or loaded from the cache next to the persona file)
+    parsed = parsed or get_parsed_persona(persona_text)
+    section = parsed.section_text
     
     # Display user profile prominently
-    if '👤 User Profile' in content:
-        st.markdown("### � User Profile")
-        profile_content = '\n'.join(content['👤 User Profile'])
+    profile_content = section('👤 User Profile')
+    if profile_content:
+        st.markdown("### 👤 User Profile")
         st.markdown(profile_content)
         st.divider()
     
     # Core identity section
-    if '🎯 Core Identity' in content:
+    identity_content = section('🎯 Core Identity')
+    if identity_content:
         st.markdown("### 🎯 Core Identity")
-        identity_content = '\n'.join(content['🎯 Core Identity'])
         st.markdown(identity_content)
         st.divider()
     
@@ -219,73 +245,69 @@ def display_persona(persona_text, username):
     
     with col1:
         # Interests & Hobbies
-        if '🎮 Interests & Hobbies' in content:
+        interests_content = section('🎮 Interests & Hobbies')
+        if interests_content:
             st.markdown("### 🎮 Interests & Hobbies")
-            interests_content = '\n'.join(content['🎮 Interests & Hobbies'])
             st.markdown(interests_content)
         
         # Goals & Motivations
-        if '🎯 Goals & Motivations' in content:
+        goals_content = section('🎯 Goals & Motivations')
+        if goals_content:
             st.markdown("### 🎯 Goals & Motivations")
-            goals_content = '\n'.join(content['🎯 Goals & Motivations'])
             st.markdown(goals_content)
     
     with col2:
         # Values & Beliefs
-        if '💭 Values & Beliefs' in content:
+        values_content = section('💭 Values & Beliefs')
+        if values_content:
             st.markdown("### 💭 Values & Beliefs")
-            values_content = '\n'.join(content['💭 Values & Beliefs'])
             st.markdown(values_content)
         
         # Frustrations & Pain Points
-        if '😤 Frustrations & Pain Points' in content:
+        frustrations_content = section('😤 Frustrations & Pain Points')
+        if frustrations_content:
             st.markdown("### 😤 Frustrations & Pain Points")
-            frustrations_content = '\n'.join(content['😤 Frustrations & Pain Points'])
             st.markdown(frustrations_content)
     
     # Behavioral patterns
-    if '🔍 Behavioral Patterns' in content:
+    behavior_content = section('🔍 Behavioral Patterns')
+    if behavior_content:
         st.markdown("### 🔍 Behavioral Patterns")
-        behavior_content = '\n'.join(content['🔍 Behavioral Patterns'])
         st.markdown(behavior_content)
     
     # Activity summary
-    if '📊 Activity Summary' in content:
+    activity_content = section('📊 Activity Summary')
+    if activity_content:
         st.markdown("### 📊 Activity Summary")
-        activity_content = '\n'.join(content['📊 Activity Summary'])
         st.markdown(activity_content)
     
     # Persona quote (highlighted)
-    if '🎭 Persona Quote' in content:
-        quote_content = '\n'.join(content['🎭 Persona Quote'])
-        if quote_content.strip():
-            st.markdown("### 💬 Persona Quote")
-            st.markdown(f"> {quote_content}")
+    quote_content = section('🎭 Persona Quote')
+    if quote_content.strip():
+        st.markdown("### 💬 Persona Quote")
+        st.markdown(f"> {quote_content}")
     
     # Summary
-    if '📝 Summary' in content:
+    summary_content = section('📝 Summary')
+    if summary_content:
         st.markdown("### 📝 Summary")
-        summary_content = '\n'.join(content['📝 Summary'])
         st.markdown(summary_content)
     
     # Citations in collapsible section
-    if 'EVIDENCE SOURCES:' in persona_text:
+    if parsed.evidence_text:
         with st.expander("📎 View Sources & Citations"):
-            sources_start = persona_text.find('EVIDENCE SOURCES:')
-            if sources_start != -1:
-                sources_text = persona_text[sources_start:]
-                st.markdown(sources_text)
+            st.markdown(parsed.evidence_text)
     
     # Recent activity highlights
-    if '🔍 Recent Activity Highlights' in content:
+    highlights_content = section('🔍 Recent Activity Highlights')
+    if highlights_content:
         with st.expander("🔍 Recent Activity Highlights"):
-            activity_content = '\n'.join(content['🔍 Recent Activity Highlights'])
-            st.markdown(activity_content)
+            st.markdown(highlights_content)
     
     # Enhancement notes
-    if '📝 Enhancement Available' in content:
+    enhancement_content = section('📝 Enhancement Available')
+    if enhancement_content:
         with st.expander("ℹ️ About This Analysis"):
-            enhancement_content = '\n'.join(content['📝 Enhancement Available'])
             st.markdown(enhancement_content)
 
 
@@ -351,10 +373,12 @@ def display_activity_analysis(analysis, reddit_data):
             )
             st.plotly_chart(fig_day, use_container_width=True)
     
+    display_activity_patterns(analysis['analytics'])
+    
     # Word cloud
     st.subheader("☁️ Word Cloud")
-    if not analysis['dataframe'].empty and 'text' in analysis['dataframe'].columns:
-        all_text = ' '.join(analysis['dataframe']['text'].fillna('').astype(str))
+    if len(analysis['store']) > 0:
+        all_text = analysis['store'].text_blob()
         if len(all_text.strip()) > 10:
             generate_wordcloud(all_text)
         else:
@@ -384,6 +408,61 @@ def display_activity_analysis(analysis, reddit_data):
             st.write(f"**Text:** {most_down['text'][:300]}...")
 
 
+def display_activity_patterns(analytics):
+    """Display the extended analytics: heatmap, sessions, activity rate, score percentiles and trend."""
+    if not analytics:
+        return
+    
+    st.subheader("📈 Activity Patterns")
+    sessions = analytics['sessions']
+    trend = analytics['trend']
+    tz = analytics['timezone']
+    trend_icons = {'increasing': '📈', 'decreasing': '📉', 'flat': '➡️'}
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Sessions", sessions['count'])
+    col2.metric("Items / Session", f"{sessions['mean_size']:.1f}")
+    col3.metric("Avg Session Length", f"{sessions['mean_duration'] / 60:.0f} min")
+    col4.metric("Activity Trend", f"{trend_icons[trend['direction']]} {trend['direction'].title()}",
+                f"{trend['change'] * 100:+.0f}% over {trend['weeks']} weeks")
+    col5.metric("Estimated Timezone", tz['label'], f"{tz['confidence']:.0%} confidence", delta_color='off',
+                help="Best fit of the posting-hour distribution against a typical daily activity curve")
+    if analytics['undated_items']:
+        st.caption(f"{analytics['undated_items']} items without a timestamp are left out of these patterns.")
+    
+    col_left, col_right = st.columns(2)
+    
+    with col_left:
+        fig_heatmap = px.imshow(
+            analytics['heatmap'],
+            x=list(range(24)),
+            y=list(DAY_NAMES),
+            labels={'x': 'Hour (UTC)', 'y': 'Day', 'color': 'Posts/Comments'},
+            title="Activity by Day and Hour",
+            aspect='auto',
+            color_continuous_scale='Blues'
+        )
+        st.plotly_chart(fig_heatmap, use_container_width=True)
+    
+    with col_right:
+        daily = analytics['daily']
+        fig_rate = px.line(
+            x=pd.to_datetime(daily['day_start'], unit='s'),
+            y=analytics['rolling_rate'],
+            title=f"Activity Rate ({analytics['rolling_window_days']}-day rolling average)",
+            labels={'x': 'Date', 'y': 'Posts/Comments per day'}
+        )
+        st.plotly_chart(fig_rate, use_container_width=True)
+    
+    percentiles = analytics['subreddit_percentiles']
+    if len(percentiles['codes']) > 0:
+        st.markdown("**Score Percentiles by Subreddit**")
+        table = pd.DataFrame(percentiles['values'], columns=[f"p{p}" for p in percentiles['percentiles']])
+        table.insert(0, 'Items', percentiles['counts'])
+        table.insert(0, 'Subreddit', [f"r/{name}" for name in percentiles['subreddits']])
+        st.dataframe(table, hide_index=True, use_container_width=True)
+
+
 def display_raw_data(reddit_data):
     """Display raw scraped data."""
     st.subheader("📄 Raw Data Overview")
@@ -409,7 +488,7 @@ def display_raw_data(reddit_data):
         st.dataframe(comments_df)
 
 
-def create_download_formats(persona_text, username, reddit_data):
+def create_download_formats(persona_text, username, reddit_data, parsed=None):
     """Create multiple download formats for the persona."""
     
     # Format 1: Clean text format (no markdown)
@@ -454,7 +533,7 @@ https://github.com/yourusername/reddit-persona-generator
 """
     
     # Format 3: CSV data format for spreadsheet use
-    csv_data = extract_persona_data_for_csv(persona_text, username, reddit_data)
+    csv_data = extract_persona_data_for_csv(persona_text, username, reddit_data, parsed)
     
     return {
         'clean_text': clean_text,
@@ -462,22 +541,12 @@ https://github.com/yourusername/reddit-persona-generator
         'csv_data': csv_data
     }
 
-def extract_persona_data_for_csv(persona_text, username, reddit_data):
+def extract_persona_data_for_csv(persona_text, username, reddit_data, parsed=None):
     """Extract structured data for CSV export."""
     
-    # Parse persona for key data points
-    lines = persona_text.split('\n')
-    data_points = []
-    
-    current_section = ""
-    for line in lines:
-        line = line.strip()
-        if line.startswith('## '):
-            current_section = line[3:].strip()
-        elif line.startswith('**') and ':' in line and current_section:
-            key = line.split('**')[1].split(':')[0] if '**' in line else line.split(':')[0]
-            value = ':'.join(line.split(':')[1:]).strip()
-            data_points.append([current_section, key, value])
+    # Key/value fields from the parsed persona
+    parsed = parsed or get_parsed_persona(persona_text)
+    data_points = parsed.field_rows()
     
     # Create CSV content
     output = io.StringIO()
@@ -591,11 +660,18 @@ docker run -p 7474:7474 -p 7687:7687 \\
         with col2:
             if st.button("🔄 Rebuild Graph", key=f"rebuild_graph_{username}"):
                 with st.spinner("Rebuilding knowledge graph..."):
-                    graphrag.cleanup_graph(username)
-                    success = graphrag.create_graph_from_persona(persona_text, username, reddit_data)
+                    # Only the differences from the stored graph are written
+                    success = graphrag.create_graph_from_persona(persona_text, username, reddit_data, incremental=True)
                     
                     if success:
-                        st.success("✅ Knowledge graph rebuilt successfully!")
+                        update = graphrag.user_graphs.get(username, {}).get('last_update')
+                        if update:
+                            st.success(f"✅ Knowledge graph updated to version {update['version']} "
+                                       f"({update['nodes_added'] + update['nodes_updated'] + update['nodes_deleted']} node and "
+                                       f"{update['relationships_added'] + update['relationships_updated'] + update['relationships_deleted']} "
+                                       f"relationship changes)")
+                        else:
+                            st.success("✅ Knowledge graph rebuilt successfully!")
                         # Clear chat history for this user
                         st.session_state[chat_history_key] = []
                         st.rerun()
@@ -678,7 +754,7 @@ def main():
     setup_page()
     
     # Sidebar
-    data_limit, show_raw_data = show_sidebar()
+    data_limit, show_raw_data, profile_run = show_sidebar()
     
     # Main input
     st.header("🔍 User Analysis")
@@ -705,14 +781,18 @@ def main():
         progress_container = st.empty()
         status_container = st.empty()
         
-        # Progress callback function
-        def update_progress(message):
+        # Progress callback function (also marks profiling steps)
+        def show_progress(message):
             progress_container.info(message)
         
+        profiler = StageProfiler(enabled=profile_run)
+        update_progress = profiler.wrap_callback(show_progress)
+        
         try:
             # Scrape Reddit data with progress updates
-            update_progress("🚀 Starting Reddit data scraping...")
-            reddit_data = scraper.get_user_data(user_input, limit=data_limit, progress_callback=update_progress)
+            with profiler.activate(), profiler.span("scrape"):
+                update_progress("🚀 Starting Reddit data scraping...")
+                reddit_data = scraper.get_user_data(user_input, limit=data_limit, progress_callback=update_progress)
             
             if not reddit_data:
                 progress_container.empty()
@@ -720,8 +800,9 @@ def main():
                 return
             
             # Save raw data
-            update_progress("💾 Saving raw data...")
-            raw_data_file = scraper.save_raw_data(reddit_data)
+            with profiler.activate(), profiler.span("save raw data"):
+                update_progress("💾 Saving raw data...")
+                raw_data_file = scraper.save_raw_data(reddit_data)
             
             # Show success message
             progress_container.empty()
@@ -729,23 +810,32 @@ def main():
             st.info(f"📁 Raw data saved to: {raw_data_file}")
             
             # Generate persona with progress updates
-            update_progress("🤖 Starting AI persona generation...")
-            persona_text = persona_generator.generate_persona(reddit_data, progress_callback=update_progress)
+            with profiler.activate(), profiler.span("persona generation"):
+                update_progress("🤖 Starting AI persona generation...")
+                persona_text = persona_generator.generate_persona(reddit_data, progress_callback=update_progress)
             
             if persona_text:
                 # Save persona
-                update_progress("💾 Saving persona...")
-                persona_file = persona_generator.save_persona(persona_text, username)
+                with profiler.activate(), profiler.span("save persona"):
+                    update_progress("💾 Saving persona...")
+                    persona_file = persona_generator.save_persona(persona_text, username)
                 
                 # Clear progress and show success
                 progress_container.empty()
                 st.success(f"✅ Persona generated successfully! Saved to: {persona_file}")
                 
                 # Analyze activity
-                update_progress("📊 Analyzing activity patterns...")
-                activity_analysis = analyze_user_activity(reddit_data)
+                with profiler.activate(), profiler.span("activity analysis"):
+                    update_progress("📊 Analyzing activity patterns...")
+                    activity_analysis = analyze_user_activity(reddit_data)
                 progress_container.empty()
                 
+                if profile_run:
+                    with st.expander("⏱️ Run Profile"):
+                        st.code(profiler.summary_table())
+                        st.download_button("📥 Download Trace", json.dumps(profiler.to_trace(), indent=2),
+                                           file_name=f"{username}_profile.json", mime="application/json")
+                
                 # Create tabs for different views
                 if show_raw_data:
                     tabs = st.tabs(["🎭 Persona", "📊 Activity Analysis", "🤖 GraphRAG Chat", "📄 Raw Data"])
@@ -852,8 +942,12 @@ def main():
                     
                     # Store in session state
                     st.session_state.loaded_persona_text = persona_text
+                    st.session_state.loaded_parsed_persona = load_parsed_persona(str(selected_file), persona_text)
                     st.session_state.loaded_username = username
-                    st.session_state.loaded_reddit_data = None
+                    st.session_state.loaded_reddit_data = load_corpus_data(username) or load_raw_data_file(username)
+                    # Columnar copy built once, so reruns only pay for the vectorized analytics
+                    loaded_data = st.session_state.loaded_reddit_data
+                    st.session_state.loaded_item_store = as_item_store(loaded_data) if loaded_data else None
                     
                 except Exception as e:
                     st.error(f"❌ Error loading persona file: {e}")
@@ -867,6 +961,7 @@ def main():
         persona_text = st.session_state.loaded_persona_text
         username = st.session_state.loaded_username
         reddit_data = st.session_state.loaded_reddit_data
+        parsed_persona = st.session_state.get('loaded_parsed_persona')
         
         # Display the persona
         st.markdown("---")
@@ -876,14 +971,14 @@ def main():
         tabs = st.tabs(["📊 Persona", "📈 Activity Analysis", "🤖 GraphRAG Chat"])
         
         with tabs[0]:
-            display_persona(persona_text, username)
+            display_persona(persona_text, username, parsed_persona)
         
         with tabs[1]:
             if reddit_data:
-                analysis = analyze_user_activity(reddit_data)
+                analysis = analyze_user_activity(st.session_state.get('loaded_item_store') or reddit_data)
                 display_activity_analysis(analysis, reddit_data)
             else:
-                st.info("Activity analysis not available for loaded persona files. Generate a new persona to see activity analysis.")
+                st.info("Activity analysis not available: no stored data found for this user. Generate a new persona to see activity analysis.")
         
         with tabs[2]:
             display_graphrag_chat(persona_text, username, reddit_data)
@@ -900,14 +995,18 @@ def main():
         progress_container = st.empty()
         status_container = st.empty()
         
-        # Progress callback function
-        def update_progress(message):
+        # Progress callback function (also marks profiling steps)
+        def show_progress(message):
             progress_container.info(message)
         
+        profiler = StageProfiler(enabled=profile_run)
+        update_progress = profiler.wrap_callback(show_progress)
+        
         try:
             # Scrape Reddit data with progress updates
-            update_progress("🚀 Starting Reddit data scraping...")
-            reddit_data = scraper.get_user_data(user_input, limit=data_limit, progress_callback=update_progress)
+            with profiler.activate(), profiler.span("scrape"):
+                update_progress("🚀 Starting Reddit data scraping...")
+                reddit_data = scraper.get_user_data(user_input, limit=data_limit, progress_callback=update_progress)
             
             if not reddit_data:
                 progress_container.empty()
@@ -915,8 +1014,9 @@ def main():
                 return
             
             # Save raw data
-            update_progress("💾 Saving raw data...")
-            raw_data_file = scraper.save_raw_data(reddit_data)
+            with profiler.activate(), profiler.span("save raw data"):
+                update_progress("💾 Saving raw data...")
+                raw_data_file = scraper.save_raw_data(reddit_data)
             
             # Show success message
             progress_container.empty()
@@ -924,23 +1024,32 @@ def main():
             st.info(f"📁 Raw data saved to: {raw_data_file}")
             
             # Generate persona with progress updates
-            update_progress("🤖 Starting AI persona generation...")
-            persona_text = persona_generator.generate_persona(reddit_data, progress_callback=update_progress)
+            with profiler.activate(), profiler.span("persona generation"):
+                update_progress("🤖 Starting AI persona generation...")
+                persona_text = persona_generator.generate_persona(reddit_data, progress_callback=update_progress)
             
             if persona_text:
                 # Save persona
-                update_progress("💾 Saving persona...")
-                persona_file = persona_generator.save_persona(persona_text, username)
+                with profiler.activate(), profiler.span("save persona"):
+                    update_progress("💾 Saving persona...")
+                    persona_file = persona_generator.save_persona(persona_text, username)
                 
                 # Clear progress and show success
                 progress_container.empty()
                 st.success(f"✅ Persona generated successfully! Saved to: {persona_file}")
                 
                 # Analyze activity
-                update_progress("📊 Analyzing activity patterns...")
-                activity_analysis = analyze_user_activity(reddit_data)
+                with profiler.activate(), profiler.span("activity analysis"):
+                    update_progress("📊 Analyzing activity patterns...")
+                    activity_analysis = analyze_user_activity(reddit_data)
                 progress_container.empty()
                 
+                if profile_run:
+                    with st.expander("⏱️ Run Profile"):
+                        st.code(profiler.summary_table())
+                        st.download_button("📥 Download Trace", json.dumps(profiler.to_trace(), indent=2),
+                                           file_name=f"{username}_profile.json", mime="application/json")
+                
                 # Create tabs for different views
                 if show_raw_data:
                     tabs = st.tabs(["🎭 Persona", "📊 Activity Analysis", "🤖 GraphRAG Chat", "📄 Raw Data"])
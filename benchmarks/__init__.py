@@ -0,0 +1,4 @@
+"""
+Benchmarks
+Performance harness for the persona pipeline on synthetic Reddit histories.
+"""
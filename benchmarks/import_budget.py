@@ -0,0 +1,101 @@
+"""
+Import-Time Budget
+Checks that importing the CLI stays fast and does not pull in heavy
+dependencies (PRAW, pandas, numpy, Gemini, Neo4j) before a stage needs them.
+
+Usage:
+    python -m benchmarks.import_budget                # exits non-zero if over budget
+    python -m benchmarks.import_budget --budget-ms 150
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_MS = 200.0
+DEFAULT_MODULES = ('main',)
+
+# Modules that must stay deferred until a stage actually uses them
+HEAVY_MODULES = ('praw', 'pandas', 'numpy', 'google.generativeai', 'neo4j', 'requests', 'streamlit')
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def measure_import(module: str, runs: int = 5) -> float:
+    """Best-of-``runs`` cumulative import time of ``module`` in a fresh interpreter, in milliseconds."""
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                cwd=ROOT, capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            match = _IMPORTTIME_LINE.match(line)
+            # The top-level line for the module itself carries the cumulative total
+            if match and match.group(4) == module and match.group(3) == ' ':
+                total_ms = int(match.group(2)) / 1000
+                best = total_ms if best is None else min(best, total_ms)
+    if best is None:
+        raise RuntimeError(f"No import timing found for {module}")
+    return best
+
+
+def loaded_heavy_modules(module: str) -> List[str]:
+    """Heavy modules present in ``sys.modules`` after importing ``module``."""
+    script = (f"import sys, json, {module}; "
+              f"print(json.dumps([m for m in {list(HEAVY_MODULES)!r} if m in sys.modules]))")
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check_budget(modules=DEFAULT_MODULES, budget_ms: float = DEFAULT_BUDGET_MS, runs: int = 5) -> Dict:
+    """
+    Measure each module against the budget.
+
+    Args:
+        modules: Modules to import (each in a fresh interpreter)
+        budget_ms: Allowed cumulative import time per module
+        runs: Runs per module (the fastest counts)
+
+    Returns:
+        Per-module timings, heavy imports and pass/fail status
+    """
+    report = {}
+    for module in modules:
+        elapsed = measure_import(module, runs)
+        heavy = loaded_heavy_modules(module)
+        report[module] = {
+            'import_ms': elapsed,
+            'budget_ms': budget_ms,
+            'heavy_modules': heavy,
+            'ok': elapsed <= budget_ms and not heavy
+        }
+    return report
+
+
+def main():
+    """Command-line entry point for the import budget check."""
+    parser = argparse.ArgumentParser(description="Check the CLI import-time budget")
+    parser.add_argument('--modules', default=','.join(DEFAULT_MODULES), help='Comma-separated modules to import')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f'Allowed import time per module (default: {DEFAULT_BUDGET_MS:.0f})')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per module; the fastest counts (default: 5)')
+    args = parser.parse_args()
+
+    modules = [module.strip() for module in args.modules.split(',') if module.strip()]
+    report = check_budget(modules, args.budget_ms, args.runs)
+    for module, result in report.items():
+        status = "✅" if result['ok'] else "❌"
+        print(f"{status} import {module}: {result['import_ms']:.1f} ms (budget {result['budget_ms']:.0f} ms)")
+        if result['heavy_modules']:
+            print(f"   ⚠️ Heavy modules imported eagerly: {', '.join(result['heavy_modules'])}")
+
+    sys.exit(0 if all(result['ok'] for result in report.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
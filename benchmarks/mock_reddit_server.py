@@ -0,0 +1,333 @@
+"""
+Mock Reddit Server
+Local stand-in for reddit.com's public user listings
+(``/user/<name>/comments.json`` and ``/user/<name>/submitted.json``) with
+configurable latency, error injection and rate-limit headers.
+
+Point the scraper at it with ``RedditScraper(base_url=server.base_url)`` or
+the ``REDDIT_BASE_URL`` environment variable.
+
+Usage:
+    python -m benchmarks.mock_reddit_server --raw output/kojied_raw_data.json --synthetic bench_user:5000
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import generate_user_data
+
+LISTING_PATH = re.compile(r'^/(?:user|u)/([^/]+)/(comments|submitted)(?:\.json)?/?$')
+REDDIT_ORIGIN = "https://www.reddit.com"
+
+# Same bounds as reddit.com
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+def _permalink(item: Dict) -> str:
+    url = item.get('url', '')
+    return url[len(REDDIT_ORIGIN):] if url.startswith(REDDIT_ORIGIN) else url
+
+
+def _comment_child(comment: Dict, author: str) -> Dict:
+    return {
+        'kind': 't1',
+        'data': {
+            'id': comment['id'],
+            'name': f"t1_{comment['id']}",
+            'author': author,
+            'body': comment.get('body', ''),
+            'permalink': _permalink(comment),
+            'subreddit': comment.get('subreddit', ''),
+            'score': comment.get('score', 0),
+            'created_utc': comment.get('created_utc', 0),
+            'link_title': comment.get('submission_title', '')
+        }
+    }
+
+
+def _submission_child(submission: Dict, author: str) -> Dict:
+    return {
+        'kind': 't3',
+        'data': {
+            'id': submission['id'],
+            'name': f"t3_{submission['id']}",
+            'author': author,
+            'title': submission.get('title', ''),
+            'selftext': submission.get('selftext', ''),
+            'permalink': _permalink(submission),
+            'subreddit': submission.get('subreddit', ''),
+            'score': submission.get('score', 0),
+            'created_utc': submission.get('created_utc', 0),
+            'num_comments': submission.get('num_comments', 0)
+        }
+    }
+
+
+class MockRedditServer:
+    """Threaded HTTP server serving user listings from ``get_user_data``-format data."""
+
+    def __init__(self, users: Iterable[Dict] = (), host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_statuses: Tuple[int, ...] = (500, 502, 503), forbidden_users: Iterable[str] = (),
+                 rate_limit: Optional[int] = None, rate_limit_window: float = 60.0,
+                 seed: Optional[int] = None):
+        """
+        Configure the mock server (call ``start()`` to begin serving).
+
+        Args:
+            users: Histories in the ``RedditScraper.get_user_data`` format
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Seconds added to every response
+            jitter: Extra random latency, uniformly up to this many seconds
+            error_rate: Probability of answering with one of ``error_statuses``
+            error_statuses: Status codes used for injected errors
+            forbidden_users: Usernames whose listings answer 403
+            rate_limit: Requests allowed per window (None disables limiting and rate-limit headers)
+            rate_limit_window: Rate-limit window length in seconds
+            seed: Seed for jitter and error injection
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.forbidden_users = {name.lower() for name in forbidden_users}
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._listings: Dict[str, Dict[str, List[Dict]]] = {}
+        self._positions: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self._window_start = time.monotonic()
+        self._window_used = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[int, int] = {}
+
+        for reddit_data in users:
+            self.add_user(reddit_data)
+
+    def add_user(self, reddit_data: Dict):
+        """Serve the listings for one user's history (newest first, like reddit.com)."""
+        username = reddit_data['username']
+        comments = sorted(reddit_data.get('comments', []), key=lambda item: item.get('created_utc', 0), reverse=True)
+        submissions = sorted(reddit_data.get('submissions', []), key=lambda item: item.get('created_utc', 0),
+                             reverse=True)
+        listings = {
+            'comments': [_comment_child(comment, username) for comment in comments],
+            'submitted': [_submission_child(submission, username) for submission in submissions]
+        }
+        key = username.lower()
+        self._listings[key] = listings
+        self._positions[key] = {
+            listing: {child['data']['name']: i for i, child in enumerate(children)}
+            for listing, children in listings.items()
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to pass to ``RedditScraper``."""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> 'MockRedditServer':
+        """Start serving from a daemon thread."""
+        handler = type('MockRedditHandler', (_MockRedditHandler,), {'mock': self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-reddit', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+
+    def _rate_limit_state(self) -> Tuple[bool, Dict[str, str]]:
+        """Count one request against the window; return (allowed, headers)."""
+        if self.rate_limit is None:
+            return True, {}
+
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.rate_limit_window:
+                self._window_start = now
+                self._window_used = 0
+            self._window_used += 1
+            used = self._window_used
+            reset = max(0.0, self.rate_limit_window - (now - self._window_start))
+
+        headers = {
+            'X-Ratelimit-Used': str(used),
+            'X-Ratelimit-Remaining': f"{max(self.rate_limit - used, 0):.1f}",
+            'X-Ratelimit-Reset': str(int(reset + 0.999))
+        }
+        if used > self.rate_limit:
+            headers['Retry-After'] = headers['X-Ratelimit-Reset']
+            return False, headers
+        return True, headers
+
+    def _record(self, status: int):
+        with self._lock:
+            self.stats[status] = self.stats.get(status, 0) + 1
+
+    def handle(self, path: str, query: Dict[str, List[str]]) -> Tuple[int, Dict, Dict[str, str]]:
+        """Answer one request; returns ``(status, json_body, headers)``."""
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+        allowed, headers = self._rate_limit_state()
+        if not allowed:
+            return 429, {'message': 'Too Many Requests', 'error': 429}, headers
+
+        with self._lock:
+            inject_error = self.error_rate and self._rng.random() < self.error_rate
+            error_status = self._rng.choice(self.error_statuses) if inject_error else None
+        if error_status:
+            return error_status, {'message': 'Injected error', 'error': error_status}, headers
+
+        match = LISTING_PATH.match(path)
+        if not match:
+            return 404, {'message': 'Not Found', 'error': 404}, headers
+        username, listing = match.group(1).lower(), match.group(2)
+        if username in self.forbidden_users:
+            return 403, {'message': 'Forbidden', 'error': 403}, headers
+        if username not in self._listings:
+            return 404, {'message': 'Not Found', 'error': 404}, headers
+
+        try:
+            limit = int(query.get('limit', [DEFAULT_PAGE_SIZE])[0])
+        except ValueError:
+            limit = DEFAULT_PAGE_SIZE
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+
+        children = self._listings[username][listing]
+        after = query.get('after', [None])[0]
+        start = 0
+        if after:
+            position = self._positions[username][listing].get(after)
+            start = position + 1 if position is not None else len(children)
+
+        page = children[start:start + limit]
+        has_more = start + limit < len(children)
+        body = {
+            'kind': 'Listing',
+            'data': {
+                'after': page[-1]['data']['name'] if page and has_more else None,
+                'before': None,
+                'dist': len(page),
+                'children': page
+            }
+        }
+        return 200, body, headers
+
+
+class _MockRedditHandler(BaseHTTPRequestHandler):
+    mock: MockRedditServer = None
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        status, body, headers = self.mock.handle(parts.path, parse_qs(parts.query))
+        self.mock._record(status)
+
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _synthetic_users(specs: Iterable[str], seed: int) -> List[Dict]:
+    """Parse ``name:items`` specs into synthetic histories."""
+    users = []
+    for i, spec in enumerate(specs):
+        name, _, size = spec.partition(':')
+        users.append(generate_user_data(int(size or 1000), username=name, seed=seed + i))
+    return users
+
+
+def main():
+    """Command-line entry point for the mock server."""
+    parser = argparse.ArgumentParser(description="Serve Reddit user listings locally for scraper testing")
+    parser.add_argument('--raw', nargs='*', default=[], help='Raw data files to serve (any raw data format)')
+    parser.add_argument('--synthetic', nargs='*', default=[], metavar='NAME:ITEMS',
+                        help='Synthetic users to serve, e.g. bench_user:5000')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to bind (default: 8765)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability of an injected 5xx error')
+    parser.add_argument('--forbidden', nargs='*', default=[], help='Usernames answered with 403')
+    parser.add_argument('--rate-limit', type=int, default=None, help='Requests allowed per window (enables 429s)')
+    parser.add_argument('--rate-limit-window', type=float, default=60.0, help='Rate-limit window in seconds')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for synthetic data and error injection')
+    args = parser.parse_args()
+
+    from src.raw_data_io import load_raw_data
+
+    users = [load_raw_data(path) for path in args.raw] + _synthetic_users(args.synthetic, args.seed)
+    if not users:
+        print("❌ Error: provide users to serve with --raw or --synthetic")
+        sys.exit(1)
+
+    server = MockRedditServer(users, host=args.host, port=args.port, latency=args.latency, jitter=args.jitter,
+                              error_rate=args.error_rate, forbidden_users=args.forbidden,
+                              rate_limit=args.rate_limit, rate_limit_window=args.rate_limit_window,
+                              seed=args.seed).start()
+    print(f"🧪 Mock Reddit serving {len(users)} user(s) at {server.base_url}")
+    for reddit_data in users:
+        print(f"   u/{reddit_data['username']}: {len(reddit_data.get('submissions', []))} submissions, "
+              f"{len(reddit_data.get('comments', []))} comments")
+    print(f"   Try: REDDIT_BASE_URL={server.base_url} python main.py --username {users[0]['username']}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopping mock server.")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Benchmark Runner
+Times the data-processing stages of the persona pipeline on synthetic
+histories of increasing size and stores the results as JSON per commit.
+
+Usage:
+    python -m benchmarks.run_benchmarks                       # default sizes 10^2..10^5
+    python -m benchmarks.run_benchmarks --sizes 100,1000000   # custom sizes
+    python -m benchmarks.run_benchmarks --compare OLD.json NEW.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import generate_user_data
+
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000)
+DEFAULT_RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# Each timed benchmark runs until it has used this much time (or MAX_REPEATS runs)
+MIN_TOTAL_SECONDS = 0.5
+MAX_REPEATS = 7
+
+# Latency budgets (benchmark, items) -> seconds; results record whether they were met
+BUDGETS = {
+    ('activity_analytics', 100_000): 0.100,
+    ('analyze_user_activity', 100_000): 0.100,
+}
+
+
+class BenchmarkContext:
+    """Inputs shared by all benchmarks for one history size."""
+
+    def __init__(self, reddit_data: Dict):
+        from src.persona_generator import PersonaGenerator
+        from src.reddit_scraper import RedditScraper
+        from src.graphrag_handler import GraphRAGHandler
+        from src.activity_analytics import compute_activity_analytics
+        from src.item_store import ItemStore
+        from src.persona_parser import get_parsed_persona
+        from src.graph_facts import build_activity_graph
+        from src.passage_index import PassageIndex
+        from app import analyze_user_activity, extract_persona_data_for_csv
+
+        self.reddit_data = reddit_data
+        self.username = reddit_data['username']
+        # prepare_data_for_analysis needs no API client; skip the PRAW health probe
+        self.scraper = RedditScraper.__new__(RedditScraper)
+        self.scraper.reddit = None
+        self.generator = PersonaGenerator()
+        self.graph_handler = GraphRAGHandler()
+        self.persona_text = self.generator.generate_fallback_persona(reddit_data)
+        self.analyze_user_activity = analyze_user_activity
+        self.extract_persona_data_for_csv = extract_persona_data_for_csv
+        self.compute_activity_analytics = compute_activity_analytics
+        self.get_parsed_persona = get_parsed_persona
+        self.build_activity_graph = build_activity_graph
+        self.store = ItemStore.from_reddit_data(reddit_data)
+        self.passage_index = PassageIndex.build(reddit_data['submissions'] + reddit_data['comments'], self.username)
+
+
+def _bench_prepare_data(ctx: BenchmarkContext):
+    return ctx.scraper.prepare_data_for_analysis(ctx.reddit_data)
+
+
+def _bench_analyze_activity(ctx: BenchmarkContext):
+    # The app converts scraped data to an ItemStore once and analyzes the store on every rerun
+    return ctx.analyze_user_activity(ctx.store)
+
+
+def _bench_activity_analytics(ctx: BenchmarkContext):
+    return ctx.compute_activity_analytics(ctx.store)
+
+
+def _bench_fallback_persona(ctx: BenchmarkContext):
+    return ctx.generator.generate_fallback_persona(ctx.reddit_data)
+
+
+def _bench_persona_sections(ctx: BenchmarkContext):
+    # Time a real parse rather than a hit in the per-process parse cache
+    ctx.get_parsed_persona.cache_clear()
+    return ctx.generator.extract_persona_sections(ctx.persona_text)
+
+
+def _bench_persona_csv(ctx: BenchmarkContext):
+    ctx.get_parsed_persona.cache_clear()
+    return ctx.extract_persona_data_for_csv(ctx.persona_text, ctx.username, ctx.reddit_data)
+
+
+def _bench_graph_context(ctx: BenchmarkContext):
+    return ctx.graph_handler._create_persona_file(ctx.persona_text, ctx.username, ctx.reddit_data)
+
+
+def _bench_graph_facts(ctx: BenchmarkContext):
+    return ctx.build_activity_graph(ctx.reddit_data)
+
+
+def _bench_passage_search(ctx: BenchmarkContext):
+    return ctx.passage_index.search("what games and programming languages do they like to discuss", 8)
+
+
+BENCHMARKS: Dict[str, Callable[[BenchmarkContext], object]] = {
+    'prepare_data_for_analysis': _bench_prepare_data,
+    'analyze_user_activity': _bench_analyze_activity,
+    'activity_analytics': _bench_activity_analytics,
+    'generate_fallback_persona': _bench_fallback_persona,
+    'extract_persona_sections': _bench_persona_sections,
+    'extract_persona_data_for_csv': _bench_persona_csv,
+    'graph_context_file': _bench_graph_context,
+    'graph_facts': _bench_graph_facts,
+    'passage_search': _bench_passage_search,
+}
+
+
+def time_benchmark(func: Callable, ctx: BenchmarkContext, n_items: int) -> Dict:
+    """Measure the peak traced memory of ``func`` in one run, then time it over several more."""
+    # The memory run doubles as warm-up (lazy imports, caches); tracemalloc
+    # slows allocation-heavy code too much to time under it
+    tracemalloc.start()
+    try:
+        func(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings: List[float] = []
+    while len(timings) < MAX_REPEATS and (not timings or sum(timings) < MIN_TOTAL_SECONDS):
+        start = time.perf_counter()
+        func(ctx)
+        timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    return {
+        'n_items': n_items,
+        'repeats': len(timings),
+        'seconds_median': median,
+        'seconds_min': min(timings),
+        'items_per_second': n_items / median if median > 0 else None,
+        'peak_memory_bytes': peak
+    }
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        result = subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes: List[int], names: Optional[List[str]] = None, seed: int = 42,
+                   progress_callback=None) -> Dict:
+    """
+    Run the benchmark suite.
+
+    Args:
+        sizes: History sizes (total items) to generate
+        names: Benchmarks to run (defaults to all of ``BENCHMARKS``)
+        seed: Seed for the synthetic histories
+        progress_callback: Optional callback function for progress updates
+
+    Returns:
+        JSON-serializable results, tagged with the current commit
+    """
+    names = names or list(BENCHMARKS)
+    results = []
+
+    # Graph context files go to ./temp_graph; keep them out of the working tree
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="persona_bench_") as scratch:
+        os.chdir(scratch)
+        try:
+            for n_items in sizes:
+                if progress_callback:
+                    progress_callback(f"🧪 Generating {n_items:,} synthetic items...")
+                ctx = BenchmarkContext(generate_user_data(n_items, seed=seed))
+                for name in names:
+                    result = time_benchmark(BENCHMARKS[name], ctx, n_items)
+                    result['benchmark'] = name
+                    budget = BUDGETS.get((name, n_items))
+                    if budget is not None:
+                        result['budget_seconds'] = budget
+                        result['within_budget'] = result['seconds_median'] <= budget
+                    results.append(result)
+                    if progress_callback:
+                        flag = ''
+                        if budget is not None:
+                            flag = f"  {'✅' if result['within_budget'] else '❌'} budget {budget * 1000:.0f} ms"
+                        progress_callback(f"   {name:<30} {result['seconds_median'] * 1000:>10.2f} ms "
+                                          f"{result['peak_memory_bytes'] / 2**20:>9.1f} MiB{flag}")
+                del ctx
+        finally:
+            os.chdir(original_cwd)
+
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'sizes': list(sizes),
+        'results': results
+    }
+
+
+def save_results(results: Dict, results_dir: str = DEFAULT_RESULTS_DIR) -> str:
+    """Write results to ``<results_dir>/<commit>_<timestamp>.json``."""
+    os.makedirs(results_dir, exist_ok=True)
+    commit = (results.get('commit') or 'nogit')[:10]
+    if results.get('dirty'):
+        commit += '-dirty'
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(results_dir, f"{commit}_{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def compare_results(old: Dict, new: Dict, threshold: float = 0.10) -> List[Dict]:
+    """
+    Compare two result files benchmark by benchmark.
+
+    Args:
+        old: Baseline results
+        new: Candidate results
+        threshold: Relative slowdown (or memory growth) reported as a regression
+
+    Returns:
+        One row per benchmark/size present in both, with time and memory ratios
+    """
+    baseline = {(r['benchmark'], r['n_items']): r for r in old['results']}
+    rows = []
+    for result in new['results']:
+        before = baseline.get((result['benchmark'], result['n_items']))
+        if before is None:
+            continue
+        time_ratio = result['seconds_median'] / before['seconds_median'] if before['seconds_median'] else None
+        memory_ratio = (result['peak_memory_bytes'] / before['peak_memory_bytes']
+                        if before['peak_memory_bytes'] else None)
+        rows.append({
+            'benchmark': result['benchmark'],
+            'n_items': result['n_items'],
+            'time_ratio': time_ratio,
+            'memory_ratio': memory_ratio,
+            'regression': any(ratio is not None and ratio > 1 + threshold for ratio in (time_ratio, memory_ratio))
+        })
+    return rows
+
+
+def _format_comparison(rows: List[Dict]) -> str:
+    lines = [f"{'Benchmark':<30} {'Items':>9} {'Time':>8} {'Memory':>8}", "-" * 60]
+    for row in rows:
+        time_ratio = f"{row['time_ratio']:.2f}x" if row['time_ratio'] is not None else 'n/a'
+        memory_ratio = f"{row['memory_ratio']:.2f}x" if row['memory_ratio'] is not None else 'n/a'
+        flag = '  ⚠️ regression' if row['regression'] else ''
+        lines.append(f"{row['benchmark']:<30} {row['n_items']:>9,} {time_ratio:>8} {memory_ratio:>8}{flag}")
+    return "\n".join(lines)
+
+
+def _load(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    """Command-line entry point for the benchmark suite."""
+    parser = argparse.ArgumentParser(description="Benchmark the persona pipeline on synthetic histories")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='Comma-separated history sizes (default: 100,1000,10000,100000)')
+    parser.add_argument('--only', default=None,
+                        help=f"Comma-separated benchmarks to run ({', '.join(BENCHMARKS)})")
+    parser.add_argument('--seed', type=int, default=42, help='Synthetic data seed (default: 42)')
+    parser.add_argument('--results-dir', default=DEFAULT_RESULTS_DIR, help='Directory for result JSON files')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='Compare two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown reported as a regression (default: 0.10)')
+    args = parser.parse_args()
+
+    if args.compare:
+        rows = compare_results(_load(args.compare[0]), _load(args.compare[1]), args.threshold)
+        print(_format_comparison(rows))
+        sys.exit(1 if any(row['regression'] for row in rows) else 0)
+
+    names = [name.strip() for name in args.only.split(',')] if args.only else None
+    unknown = set(names or []) - set(BENCHMARKS)
+    if unknown:
+        print(f"❌ Error: unknown benchmark(s): {', '.join(sorted(unknown))}")
+        sys.exit(1)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    results = run_benchmarks(sizes, names, args.seed, progress_callback=print)
+    print(f"📁 Results saved: {save_results(results, args.results_dir)}")
+
+
+if __name__ == "__main__":
+    main()
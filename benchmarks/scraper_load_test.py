@@ -0,0 +1,124 @@
+"""
+Scraper Load Test
+Runs concurrent ``get_user_data`` web scrapes against the local mock Reddit
+server and reports throughput, request outcomes and latency.
+
+Usage:
+    python -m benchmarks.scraper_load_test --users 20 --items 2000 --workers 8 --latency 0.05 --error-rate 0.02
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.mock_reddit_server import MockRedditServer
+from benchmarks.synthetic import generate_user_data
+
+
+def run_load_test(n_users: int = 10, n_items: int = 1000, limit: int = 500, workers: int = 4,
+                  latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                  rate_limit: Optional[int] = None, rate_limit_window: float = 60.0,
+                  request_delay: float = 0.0, seed: int = 42) -> Dict:
+    """
+    Scrape ``n_users`` synthetic users concurrently from a mock server.
+
+    Args:
+        n_users: Number of users served and scraped
+        n_items: Items per synthetic user
+        limit: Scrape limit per listing (as in ``get_user_data``)
+        workers: Concurrent scrapes
+        latency: Mock server latency per response, in seconds
+        jitter: Extra random mock latency, in seconds
+        error_rate: Probability of an injected 5xx error
+        rate_limit: Mock requests per window (None disables 429s)
+        rate_limit_window: Mock rate-limit window, in seconds
+        request_delay: Scraper sleep between pages, in seconds
+        seed: Seed for synthetic data and error injection
+
+    Returns:
+        Summary of the run
+    """
+    from src import metrics
+    from src.reddit_scraper import RedditScraper
+
+    users = [generate_user_data(n_items, username=f"load_user_{i}", seed=seed + i) for i in range(n_users)]
+    expected = {data['username']: min(len(data['submissions']), limit) + min(len(data['comments']), limit)
+                for data in users}
+
+    with MockRedditServer(users, latency=latency, jitter=jitter, error_rate=error_rate,
+                          rate_limit=rate_limit, rate_limit_window=rate_limit_window, seed=seed) as server:
+        scraper = RedditScraper(base_url=server.base_url, request_delay=request_delay)
+
+        def scrape(username: str) -> int:
+            data = scraper.get_user_data(username, limit=limit)
+            return (data['total_submissions'] + data['total_comments']) if data else 0
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            scraped = dict(zip(expected, executor.map(scrape, expected)))
+        elapsed = time.perf_counter() - start
+        status_counts = dict(sorted(server.stats.items()))
+
+    latency_counts = sum(metrics.HTTP_LATENCY.count(listing=listing) for listing in ('comments', 'submitted'))
+    total_items = sum(scraped.values())
+    return {
+        'users': n_users,
+        'items_per_user': n_items,
+        'workers': workers,
+        'seconds': elapsed,
+        'requests': sum(status_counts.values()),
+        'requests_per_second': sum(status_counts.values()) / elapsed if elapsed else None,
+        'items_scraped': total_items,
+        'items_expected': sum(expected.values()),
+        'items_per_second': total_items / elapsed if elapsed else None,
+        'incomplete_users': sorted(name for name in expected if scraped[name] < expected[name]),
+        'status_counts': status_counts,
+        'timed_requests': latency_counts,
+        'rate_limit_sleep_seconds': metrics.RATE_LIMIT_SLEEP.value()
+    }
+
+
+def main():
+    """Command-line entry point for the scraper load test."""
+    parser = argparse.ArgumentParser(description="Load-test the web scraper against a local mock Reddit")
+    parser.add_argument('--users', type=int, default=10, help='Synthetic users to scrape (default: 10)')
+    parser.add_argument('--items', type=int, default=1000, help='Items per user (default: 1000)')
+    parser.add_argument('--limit', type=int, default=500, help='Scrape limit per listing (default: 500)')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent scrapes (default: 4)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mock latency per response (seconds)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random mock latency (seconds)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability of an injected 5xx error')
+    parser.add_argument('--rate-limit', type=int, default=None, help='Mock requests per window (enables 429s)')
+    parser.add_argument('--rate-limit-window', type=float, default=60.0, help='Mock rate-limit window (seconds)')
+    parser.add_argument('--request-delay', type=float, default=0.0, help='Scraper sleep between pages (seconds)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for synthetic data and error injection')
+    parser.add_argument('--json', dest='json_path', default=None, help='Also write the summary to this JSON file')
+    args = parser.parse_args()
+
+    summary = run_load_test(args.users, args.items, args.limit, args.workers, args.latency, args.jitter,
+                            args.error_rate, args.rate_limit, args.rate_limit_window, args.request_delay,
+                            args.seed)
+
+    print(f"✅ Scraped {summary['items_scraped']:,}/{summary['items_expected']:,} items "
+          f"from {summary['users']} users in {summary['seconds']:.2f}s")
+    print(f"   📈 {summary['requests']} requests ({summary['requests_per_second']:.1f}/s), "
+          f"{summary['items_per_second']:.0f} items/s")
+    print(f"   📡 Status codes: {summary['status_counts']}")
+    if summary['incomplete_users']:
+        print(f"   ⚠️ Incomplete scrapes: {len(summary['incomplete_users'])} user(s)")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"📁 Summary saved: {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
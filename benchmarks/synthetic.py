@@ -0,0 +1,101 @@
+"""
+Synthetic Reddit Histories
+Deterministic user histories shaped like ``output/<user>_raw_data.json``.
+"""
+
+import random
+from datetime import datetime
+from typing import Dict, List
+
+SUBREDDITS = [
+    'AskReddit', 'newyorkcity', 'ManorLords', 'programming', 'Python', 'MachineLearning',
+    'datascience', 'cscareerquestions', 'personalfinance', 'running', 'Cooking', 'books',
+    'movies', 'gaming', 'pcgaming', 'travel', 'AskNYC', 'technology', 'worldnews', 'science',
+    'fitness', 'investing', 'explainlikeimfive', 'todayilearned', 'startups', 'webdev',
+    'learnprogramming', 'photography', 'coffee', 'boardgames', 'Music', 'hiphopheads',
+    'nba', 'soccer', 'baseball', 'Entrepreneur', 'productivity', 'cats'
+]
+
+WORDS = (
+    "the a and to of in is that it for you with on this was are as be have at not but "
+    "just like really think about people would time know get make good one more some "
+    "game city work code python data model team build bar music night year new money "
+    "apartment subway coffee food run training book movie series season player build "
+    "granary farm village honey ale tavern brewery startup product market job interview "
+    "learning library function bug deploy server api database query performance memory"
+).split()
+
+# Same rough mix as the sample data: about one submission per three comments
+SUBMISSION_RATIO = 0.25
+
+
+def _sentence(rng: random.Random, min_words: int, max_words: int) -> str:
+    words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+    return ' '.join(words).capitalize() + '.'
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return ' '.join(_sentence(rng, 5, 18) for _ in range(sentences))
+
+
+def generate_user_data(n_items: int, username: str = "synthetic_user", seed: int = 42,
+                       start_utc: float = 1_600_000_000.0, end_utc: float = 1_752_000_000.0) -> Dict:
+    """
+    Generate a synthetic history in the ``RedditScraper.get_user_data`` format.
+
+    Args:
+        n_items: Total number of submissions plus comments
+        username: Username recorded in the data
+        seed: Random seed (the same seed always yields the same history)
+        start_utc: Earliest ``created_utc``
+        end_utc: Latest ``created_utc``
+
+    Returns:
+        Dictionary containing user data
+    """
+    rng = random.Random(seed)
+    # Skewed subreddit popularity, like a real user's activity
+    weights = [1.0 / (rank + 1) for rank in range(len(SUBREDDITS))]
+    subreddits = rng.choices(SUBREDDITS, weights=weights, k=n_items)
+    timestamps = sorted((rng.uniform(start_utc, end_utc) for _ in range(n_items)), reverse=True)
+
+    submissions: List[Dict] = []
+    comments: List[Dict] = []
+    for i, (subreddit, created_utc) in enumerate(zip(subreddits, timestamps)):
+        item_id = f"{i:07x}"
+        score = int(rng.paretovariate(1.2)) - rng.randint(0, 3)
+        if rng.random() < SUBMISSION_RATIO:
+            title = _sentence(rng, 4, 12)
+            slug = '_'.join(title.lower().rstrip('.').split()[:6])
+            submissions.append({
+                'type': 'submission',
+                'id': item_id,
+                'title': title,
+                'selftext': _paragraph(rng, rng.randint(0, 4)),
+                'url': f"https://www.reddit.com/r/{subreddit}/comments/{item_id}/{slug}/",
+                'subreddit': subreddit,
+                'score': score,
+                'created_utc': round(created_utc, 1),
+                'num_comments': rng.randint(0, 60)
+            })
+        else:
+            comments.append({
+                'type': 'comment',
+                'id': item_id,
+                'body': _paragraph(rng, rng.randint(1, 3)),
+                'url': f"https://www.reddit.com/r/{subreddit}/comments/{item_id}/_/{item_id}/",
+                'subreddit': subreddit,
+                'score': score,
+                'created_utc': round(created_utc, 1),
+                'submission_title': _sentence(rng, 4, 12)
+            })
+
+    return {
+        'username': username,
+        'submissions': submissions,
+        'comments': comments,
+        'total_submissions': len(submissions),
+        'total_comments': len(comments),
+        'scraped_at': datetime.fromtimestamp(end_utc).isoformat(),
+        'method': 'synthetic'
+    }
@@ -13,6 +13,11 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.reddit_scraper import RedditScraper
 from src.persona_generator import PersonaGenerator
+from src.corpus_store import RedditCorpus, corpus_path_for
+from src.raw_data_io import RAW_FORMATS
+from src.stream_consumers import AnalysisContextBuilder
+from src.profiling import StageProfiler
+from src import metrics
 
 
 def main():
@@ -25,6 +30,15 @@ Examples:
   %(prog)s --url https://www.reddit.com/user/kojied/
   %(prog)s --username kojied --limit 200
   %(prog)s --username Hungry-Move-6603 --output custom_output/
+  %(prog)s --username kojied --from-corpus
+  %(prog)s --username kojied --raw-format ndjson.zst
+  %(prog)s --username kojied --profile --cprofile
+  %(prog)s --username kojied --metrics-file output/metrics.prom
+  %(prog)s --status [--live]
+  %(prog)s --serve --port 8080
+  %(prog)s --from-raw "output/*_raw_data.*" --llm-workers 8
+  %(prog)s --purge-graph kojied Hungry-Move-6603
+  %(prog)s --restore-graph kojied
         """
     )
     
@@ -38,6 +52,29 @@ Examples:
         '--username',
         help='Reddit username (e.g., kojied)'
     )
+    input_group.add_argument(
+        '--from-raw',
+        nargs='+',
+        metavar='PATH',
+        help='Regenerate personas from raw data files, directories or globs (e.g. "output/*_raw_data.*")'
+    )
+    input_group.add_argument(
+        '--serve',
+        action='store_true',
+        help='Run the persona HTTP service (warm clients; /scrape, /persona, /qa, /health, /metrics)'
+    )
+    input_group.add_argument(
+        '--purge-graph',
+        nargs='+',
+        metavar='USERNAME',
+        help='Delete the Neo4j knowledge graphs of these users in bounded batches'
+    )
+    input_group.add_argument(
+        '--restore-graph',
+        nargs='+',
+        metavar='USERNAME',
+        help='Recreate these users\' Neo4j knowledge graphs from <output>/<user>_graph.json.gz snapshots (no LLM calls)'
+    )
     
     # Configuration options
     parser.add_argument(
@@ -57,14 +94,137 @@ Examples:
         action='store_true',
         help='Verbose output'
     )
+    parser.add_argument(
+        '--raw-format',
+        choices=RAW_FORMATS,
+        default=None,
+        help='Raw data file format (default: RAW_DATA_FORMAT env var or json)'
+    )
+    parser.add_argument(
+        '--from-corpus',
+        action='store_true',
+        help='Use previously scraped data from the SQLite corpus instead of scraping'
+    )
     parser.add_argument(
         '--no-persona',
         action='store_true',
         help='Skip persona generation (only scrape and save raw data)'
     )
+    parser.add_argument(
+        '--structured',
+        action='store_true',
+        help='Request schema-constrained JSON personas (saved as <user>_persona.json and reused for graphs); '
+             'default: PERSONA_OUTPUT_FORMAT env var'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Record per-stage timings; writes <output>/<user>_profile.json and prints a summary'
+    )
+    parser.add_argument(
+        '--cprofile',
+        action='store_true',
+        help='With --profile, also run cProfile (stats saved as <output>/<user>_profile.prof)'
+    )
+    parser.add_argument(
+        '--metrics-file',
+        default=None,
+        help='Write Prometheus-format metrics (HTTP, LLM, Neo4j, cache) to this file at exit'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=None,
+        help='Serve live Prometheus metrics on http://127.0.0.1:<port>/metrics during the run'
+    )
+    
+    # Regeneration options
+    parser.add_argument(
+        '--llm-workers',
+        type=int,
+        default=4,
+        help='With --from-raw, personas generated in parallel (default: 4)'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='With --from-raw, regenerate even when the prompt is unchanged'
+    )
+    
+    # Graph options
+    parser.add_argument(
+        '--delete-batch-size',
+        type=int,
+        default=None,
+        help='With --purge-graph, nodes or relationships deleted per transaction (default: 5000)'
+    )
+    
+    # Service options
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='With --serve, interface to bind (default: 127.0.0.1)'
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8080,
+        help='With --serve, port to listen on (default: 8080)'
+    )
+    parser.add_argument(
+        '--max-scrapes',
+        type=int,
+        default=4,
+        help='With --serve, concurrent scrapes allowed (default: 4)'
+    )
+    parser.add_argument(
+        '--max-llm-calls',
+        type=int,
+        default=2,
+        help='With --serve, concurrent Gemini-backed requests allowed (default: 2)'
+    )
     
     args = parser.parse_args()
     
+    if args.serve:
+        from src.persona_service import serve
+        
+        serve(args.host, args.port, output_dir=args.output, max_scrapes=args.max_scrapes,
+              max_llm_calls=args.max_llm_calls, raw_format=args.raw_format, structured=args.structured or None)
+        return
+    
+    if args.from_raw:
+        run_regeneration(args)
+        return
+    
+    if args.purge_graph:
+        run_graph_purge(args)
+        return
+    
+    if args.restore_graph:
+        run_graph_restore(args)
+        return
+    
+    if args.metrics_port:
+        metrics.start_metrics_server(args.metrics_port)
+        print(f"📈 Serving metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+    
+    profiler = StageProfiler(enabled=args.profile, use_cprofile=args.cprofile)
+    try:
+        with profiler.activate():
+            run_pipeline(args, profiler)
+    finally:
+        if args.profile:
+            username = RedditScraper.extract_username_from_url(args.url or args.username)
+            trace_file = profiler.write_trace(os.path.join(args.output, f"{username}_profile.json"))
+            print("\n" + profiler.summary_table())
+            print(f"⏱️  Profile trace saved: {trace_file}")
+        if args.metrics_file:
+            print(f"📈 Metrics saved: {metrics.REGISTRY.dump(args.metrics_file)}")
+
+
+def run_pipeline(args, profiler: StageProfiler):
+    """Scrape, save and generate a persona for the user given on the command line."""
     # Determine input
     user_input = args.url if args.url else args.username
     
@@ -76,24 +236,38 @@ Examples:
         print("-" * 50)
     
     # Initialize components
-    print("🔧 Initializing scraper...")
-    scraper = RedditScraper()
-    
-    if not args.no_persona:
-        print("🤖 Initializing persona generator...")
-        persona_generator = PersonaGenerator()
+    with profiler.span("client setup"):
+        print("🔧 Initializing scraper...")
+        scraper = RedditScraper()
+        
+        if not args.no_persona:
+            print("🤖 Initializing persona generator...")
+            persona_generator = PersonaGenerator(structured=args.structured or None)
     
     # Extract username
     username = scraper.extract_username_from_url(user_input)
     print(f"👤 Analyzing user: u/{username}")
     
     # Progress callback for command line
-    def progress_callback(message):
+    def print_progress(message):
         print(f"   {message}")
     
-    # Scrape data
-    print("🔍 Scraping Reddit data...")
-    reddit_data = scraper.get_user_data(user_input, limit=args.limit, progress_callback=progress_callback)
+    progress_callback = profiler.wrap_callback(print_progress)
+    
+    # Scrape data (or load it from the corpus)
+    context_builder = None
+    if args.from_corpus:
+        with profiler.span("load corpus"):
+            print("🗃️ Loading data from corpus...")
+            with RedditCorpus(corpus_path_for(args.output)) as corpus:
+                reddit_data = corpus.load_user_data(username, limit=args.limit)
+    else:
+        with profiler.span("scrape"):
+            print("🔍 Scraping Reddit data...")
+            # Build the analysis context while pages arrive
+            context_builder = AnalysisContextBuilder(username)
+            reddit_data = scraper.get_user_data(user_input, limit=args.limit, progress_callback=progress_callback,
+                                                consumers=[context_builder])
     
     if not reddit_data:
         print("❌ Error: Could not retrieve data for this user.")
@@ -106,8 +280,10 @@ Examples:
     print(f"   📡 Method: {reddit_data['method']}")
     
     # Save raw data
-    raw_data_file = scraper.save_raw_data(reddit_data, args.output)
-    print(f"💾 Raw data saved: {raw_data_file}")
+    if not args.from_corpus:
+        with profiler.span("save raw data"):
+            raw_data_file = scraper.save_raw_data(reddit_data, args.output, fmt=args.raw_format)
+        print(f"💾 Raw data saved: {raw_data_file}")
     
     if args.no_persona:
         print("⏭️  Skipping persona generation (--no-persona flag)")
@@ -115,11 +291,15 @@ Examples:
         return
     
     # Generate persona
-    print("🧠 Generating AI persona...")
-    persona_text = persona_generator.generate_persona(reddit_data, progress_callback=progress_callback)
+    with profiler.span("persona generation"):
+        print("🧠 Generating AI persona...")
+        formatted_data = context_builder.build(reddit_data['scraped_at']) if context_builder else None
+        persona_text = persona_generator.generate_persona(reddit_data, progress_callback=progress_callback,
+                                                          formatted_data=formatted_data)
     
     if persona_text:
-        persona_file = persona_generator.save_persona(persona_text, username, args.output)
+        with profiler.span("save persona"):
+            persona_file = persona_generator.save_persona(persona_text, username, args.output)
         print(f"🎭 Persona generated: {persona_file}")
         
         if args.verbose:
@@ -139,33 +319,106 @@ Examples:
         sys.exit(1)
 
 
-def print_status():
-    """Print API configuration status."""
+def run_regeneration(args):
+    """Regenerate personas from stored raw data (--from-raw) without scraping."""
+    from src.regenerate import FAILED, GENERATED, UNCHANGED, regenerate_personas
+    
+    print(f"♻️ Regenerating personas from raw data ({args.llm_workers} parallel)...")
+    generator = PersonaGenerator(structured=True) if args.structured else None
+    results = regenerate_personas(args.from_raw, args.output, workers=args.llm_workers, force=args.force,
+                                  generator=generator, progress_callback=lambda message: print(f"   {message}"))
+    if not results:
+        print("❌ Error: No raw data files matched.")
+        sys.exit(1)
+    
+    counts = {status: sum(1 for result in results if result['status'] == status)
+              for status in (GENERATED, UNCHANGED, FAILED)}
+    print(f"✨ Done: {counts[GENERATED]} generated, {counts[UNCHANGED]} unchanged, {counts[FAILED]} failed")
+    if counts[FAILED]:
+        sys.exit(1)
+
+
+def run_graph_purge(args):
+    """Delete users' knowledge graphs (--purge-graph) in bounded transactions."""
+    from src.graphrag_handler import GRAPH_DELETE_BATCH_SIZE, GraphRAGHandler
+    
+    handler = GraphRAGHandler()
+    print(f"🗑️ Purging knowledge graphs for {len(args.purge_graph)} user(s)...")
+    try:
+        totals = handler.delete_user_graphs(args.purge_graph, batch_size=args.delete_batch_size or GRAPH_DELETE_BATCH_SIZE)
+    except Exception as e:
+        print(f"❌ Error purging graphs: {e}")
+        sys.exit(1)
+    finally:
+        handler.close()
+    print(f"✨ Done: {totals['nodes']} nodes, {totals['relationships']} relationships and "
+          f"{totals['shared_nodes']} orphaned shared nodes deleted")
+
+
+def run_graph_restore(args):
+    """Recreate users' knowledge graphs from their snapshots (--restore-graph) without LLM calls."""
+    from src.graph_snapshot import graph_snapshot_path
+    from src.graphrag_handler import GraphRAGHandler
+    
+    handler = GraphRAGHandler()
+    print(f"♻️ Restoring knowledge graphs for {len(args.restore_graph)} user(s) from snapshots...")
+    try:
+        restored = [username for username in args.restore_graph
+                    if handler.restore_graph_from_snapshot(username, graph_snapshot_path(username, args.output))]
+    finally:
+        handler.close()
+    print(f"✨ Done: {len(restored)} of {len(args.restore_graph)} graphs restored")
+    if len(restored) < len(args.restore_graph):
+        sys.exit(1)
+
+
+def print_status(live: bool = False):
+    """Print API configuration status.
+    
+    Only the environment is inspected unless ``live`` is set, so this
+    returns instantly; ``live`` also connects to Reddit and Gemini.
+    """
     print("🔧 API Configuration Status:")
     print("-" * 30)
     
     # Check Reddit API
-    scraper = RedditScraper()
-    if scraper.reddit:
-        print("✅ Reddit API: Connected")
+    if os.getenv('REDDIT_CLIENT_ID') and os.getenv('REDDIT_CLIENT_SECRET'):
+        if not live:
+            print("✅ Reddit API: Credentials configured")
+        elif RedditScraper().reddit:
+            print("✅ Reddit API: Connected")
+        else:
+            print("⚠️  Reddit API: Connection failed (will use web scraping)")
     else:
         print("⚠️  Reddit API: Not configured (will use web scraping)")
     
+    if os.getenv('REDDIT_BASE_URL'):
+        print(f"🌐 Reddit base URL: {os.getenv('REDDIT_BASE_URL')}")
+    
     # Check Gemini API
-    persona_gen = PersonaGenerator()
-    if persona_gen.model:
-        print("✅ Gemini API: Connected")
+    if os.getenv('GEMINI_API_KEY'):
+        if not live:
+            print("✅ Gemini API: Key configured")
+        elif PersonaGenerator().check_api():
+            print("✅ Gemini API: Connected")
+        else:
+            print("❌ Gemini API: Connection failed")
     else:
         print("❌ Gemini API: Not configured")
         print("   Get API key from: https://aistudio.google.com/app/apikey")
     
+    corpus_path = corpus_path_for()
+    print(f"🗃️ Corpus: {corpus_path}" + ("" if os.path.exists(corpus_path) else " (not created yet)"))
+    
     print("-" * 30)
+    if not live:
+        print("💡 Run 'python main.py --status --live' to test the connections")
 
 
 if __name__ == "__main__":
     # Check if user wants status
     if len(sys.argv) > 1 and sys.argv[1] in ['--status', 'status']:
-        print_status()
+        print_status(live='--live' in sys.argv[2:])
         sys.exit(0)
     
     # Check if user wants help with no args
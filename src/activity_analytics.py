@@ -0,0 +1,314 @@
+"""
+Activity Analytics
+Vectorized activity statistics computed straight from ``ItemStore`` columns:
+hour x weekday heatmap, sessions, rolling activity rate, per-subreddit score
+percentiles, the long-term activity trend and an activity-based timezone
+estimate.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .item_store import ItemStore, as_item_store
+
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+SECONDS_PER_WEEK = 7 * SECONDS_PER_DAY
+
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# 1970-01-01 was a Thursday
+_EPOCH_WEEKDAY = 3
+
+DEFAULT_SESSION_GAP = 30 * 60
+DEFAULT_ROLLING_WINDOW_DAYS = 7
+DEFAULT_PERCENTILES = (25, 50, 75, 90)
+
+# Typical share of daily Reddit activity by local hour (0-23): quiet overnight,
+# rising through the morning, peaking in the evening
+DIURNAL_TEMPLATE = np.array([
+    0.90, 0.60, 0.38, 0.24, 0.17, 0.15, 0.22, 0.40, 0.62, 0.80, 0.92, 1.00,
+    1.05, 1.05, 1.03, 1.03, 1.05, 1.08, 1.12, 1.18, 1.22, 1.22, 1.15, 1.05
+])
+
+# Candidate UTC offsets, one per circular shift of the template
+TIMEZONE_OFFSETS = np.array([k if k <= 12 else k - 24 for k in range(24)])
+
+# Items needed before the estimate's confidence reaches one half
+TIMEZONE_HALF_CONFIDENCE_ITEMS = 50
+
+
+def hour_weekday_heatmap(created_utc: np.ndarray) -> np.ndarray:
+    """Return a 7 x 24 array of item counts by UTC weekday (Monday first) and hour."""
+    seconds = created_utc.astype(np.int64)
+    days = seconds // SECONDS_PER_DAY
+    weekday = (days + _EPOCH_WEEKDAY) % 7
+    hour = (seconds % SECONDS_PER_DAY) // SECONDS_PER_HOUR
+    return np.bincount(weekday * 24 + hour, minlength=7 * 24).reshape(7, 24)
+
+
+def sessionize(created_utc: np.ndarray, gap: float = DEFAULT_SESSION_GAP) -> Dict:
+    """
+    Split activity into sessions wherever consecutive items are more than ``gap`` seconds apart.
+
+    Returns:
+        Session count, size and duration statistics, plus per-session
+        ``starts`` (UTC), ``durations`` (seconds) and ``sizes`` arrays
+    """
+    if len(created_utc) == 0:
+        return {'count': 0, 'starts': np.empty(0), 'durations': np.empty(0), 'sizes': np.empty(0, dtype=np.int64),
+                'mean_size': 0.0, 'median_size': 0.0, 'mean_duration': 0.0, 'longest_duration': 0.0}
+
+    times = np.sort(created_utc)
+    breaks = np.flatnonzero(np.diff(times) > gap) + 1
+    first = np.concatenate(([0], breaks))
+    last = np.concatenate((breaks - 1, [len(times) - 1]))
+
+    sizes = last - first + 1
+    durations = times[last] - times[first]
+    return {
+        'count': int(len(first)),
+        'starts': times[first],
+        'durations': durations,
+        'sizes': sizes,
+        'mean_size': float(sizes.mean()),
+        'median_size': float(np.median(sizes)),
+        'mean_duration': float(durations.mean()),
+        'longest_duration': float(durations.max())
+    }
+
+
+def daily_counts(created_utc: np.ndarray) -> Dict:
+    """Items per UTC day over the whole span, including empty days."""
+    if len(created_utc) == 0:
+        return {'day_start': np.empty(0), 'counts': np.empty(0, dtype=np.int64)}
+    days = created_utc.astype(np.int64) // SECONDS_PER_DAY
+    first_day = int(days.min())
+    counts = np.bincount(days - first_day)
+    return {
+        'day_start': (first_day + np.arange(len(counts))) * float(SECONDS_PER_DAY),
+        'counts': counts
+    }
+
+
+def rolling_rate(counts: np.ndarray, window: int = DEFAULT_ROLLING_WINDOW_DAYS) -> np.ndarray:
+    """Trailing mean of ``counts`` over ``window`` entries (shorter at the start)."""
+    if len(counts) == 0:
+        return np.empty(0)
+    cumulative = np.concatenate(([0], np.cumsum(counts, dtype=np.float64)))
+    ends = np.arange(1, len(counts) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+
+def subreddit_score_percentiles(subreddit_codes: np.ndarray, scores: np.ndarray, n_subreddits: int,
+                                percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                                codes: Optional[np.ndarray] = None) -> Dict:
+    """
+    Score percentiles per subreddit code, computed for all groups in one sort.
+
+    Args:
+        subreddit_codes: Subreddit code per item
+        scores: Score per item
+        n_subreddits: Number of distinct codes
+        percentiles: Percentiles to compute (0-100, linear interpolation)
+        codes: Codes to report (defaults to every code with items)
+
+    Returns:
+        ``codes``, ``counts`` and a ``values`` array of shape (len(codes), len(percentiles))
+    """
+    order = np.lexsort((scores, subreddit_codes))
+    sorted_scores = scores[order].astype(np.float64)
+    counts = np.bincount(subreddit_codes, minlength=n_subreddits)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    if codes is None:
+        codes = np.flatnonzero(counts)
+    codes = np.asarray(codes, dtype=np.int64)
+    group_counts = counts[codes]
+    group_offsets = offsets[codes]
+
+    fractions = np.asarray(percentiles, dtype=np.float64) / 100.0
+    positions = fractions[None, :] * (group_counts[:, None] - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, group_counts[:, None] - 1)
+    weight = positions - lower
+    low_values = sorted_scores[group_offsets[:, None] + lower]
+    high_values = sorted_scores[group_offsets[:, None] + upper]
+    return {
+        'codes': codes,
+        'counts': group_counts,
+        'percentiles': tuple(percentiles),
+        'values': low_values + (high_values - low_values) * weight
+    }
+
+
+def activity_trend(created_utc: np.ndarray) -> Dict:
+    """
+    Linear trend of weekly activity.
+
+    Returns:
+        ``slope`` (items/week per week), ``change`` (relative change across the
+        fitted span) and a ``direction`` label
+    """
+    if len(created_utc) == 0:
+        return {'slope': 0.0, 'change': 0.0, 'direction': 'flat', 'weeks': 0}
+
+    weeks = (created_utc - created_utc.min()) // SECONDS_PER_WEEK
+    weekly = np.bincount(weeks.astype(np.int64)).astype(np.float64)
+    if len(weekly) < 2:
+        return {'slope': 0.0, 'change': 0.0, 'direction': 'flat', 'weeks': int(len(weekly))}
+
+    x = np.arange(len(weekly), dtype=np.float64)
+    slope, intercept = np.polyfit(x, weekly, 1)
+    start = intercept
+    end = intercept + slope * x[-1]
+    change = (end - start) / max(abs(start), weekly.mean(), 1e-9)
+    if change > 0.1:
+        direction = 'increasing'
+    elif change < -0.1:
+        direction = 'decreasing'
+    else:
+        direction = 'flat'
+    return {'slope': float(slope), 'change': float(change), 'direction': direction, 'weeks': int(len(weekly))}
+
+
+def _shifted_templates() -> np.ndarray:
+    """Rows k hold the template as seen in UTC for a user at offset ``TIMEZONE_OFFSETS[k]``."""
+    hours = np.arange(24)
+    # local hour = UTC hour + offset
+    return DIURNAL_TEMPLATE[(hours[None, :] + TIMEZONE_OFFSETS[:, None]) % 24]
+
+
+def estimate_timezones(hour_histograms: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Estimate UTC offsets for many users at once from their UTC posting-hour histograms.
+
+    Each user's circular hourly distribution is correlated (Pearson) with the
+    diurnal template shifted to every whole-hour offset; the best shift wins.
+    Confidence combines the strength of that fit with the sample size.
+
+    Args:
+        hour_histograms: Array of shape (n_users, 24) with item counts per UTC hour
+
+    Returns:
+        ``offsets`` (hours), ``correlation``, ``confidence`` (0-1) and ``items`` arrays of length n_users
+    """
+    counts = np.atleast_2d(np.asarray(hour_histograms, dtype=np.float64))
+    items = counts.sum(axis=1)
+
+    centered = counts - counts.mean(axis=1, keepdims=True)
+    templates = _shifted_templates()
+    templates = templates - templates.mean(axis=1, keepdims=True)
+
+    norms = np.linalg.norm(centered, axis=1, keepdims=True) * np.linalg.norm(templates, axis=1)[None, :]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlations = np.where(norms > 0, centered @ templates.T / norms, 0.0)
+
+    best = correlations.argmax(axis=1)
+    correlation = correlations[np.arange(len(counts)), best]
+    confidence = np.clip(correlation, 0.0, 1.0) * items / (items + TIMEZONE_HALF_CONFIDENCE_ITEMS)
+    return {
+        'offsets': TIMEZONE_OFFSETS[best],
+        'correlation': correlation,
+        'confidence': confidence,
+        'items': items.astype(np.int64)
+    }
+
+
+def format_utc_offset(offset: int) -> str:
+    """Render an hour offset as ``UTC+05:00`` / ``UTC-08:00``."""
+    return f"UTC{'+' if offset >= 0 else '-'}{abs(int(offset)):02d}:00"
+
+
+def estimate_timezone(hour_counts: Sequence[int]) -> Dict:
+    """
+    Estimate one user's timezone from 24 UTC posting-hour counts.
+
+    Returns:
+        ``utc_offset`` (hours), ``label``, ``confidence``, ``correlation`` and ``items``
+    """
+    estimate = estimate_timezones(np.asarray(hour_counts)[None, :])
+    offset = int(estimate['offsets'][0])
+    return {
+        'utc_offset': offset,
+        'label': format_utc_offset(offset),
+        'confidence': float(estimate['confidence'][0]),
+        'correlation': float(estimate['correlation'][0]),
+        'items': int(estimate['items'][0])
+    }
+
+
+def estimate_corpus_timezones(corpus, usernames: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Estimate timezones for a cohort of users stored in a ``RedditCorpus``.
+
+    Args:
+        corpus: Open ``RedditCorpus``
+        usernames: Users to estimate (defaults to everyone in the corpus)
+
+    Returns:
+        One estimate per user with activity, in the ``estimate_timezone`` format plus ``username``
+    """
+    names, histograms = corpus.hourly_histograms(usernames)
+    if not names:
+        return []
+    estimate = estimate_timezones(np.asarray(histograms))
+    return [
+        {
+            'username': name,
+            'utc_offset': int(offset),
+            'label': format_utc_offset(offset),
+            'confidence': float(confidence),
+            'correlation': float(correlation),
+            'items': int(items)
+        }
+        for name, offset, confidence, correlation, items in zip(
+            names, estimate['offsets'], estimate['confidence'], estimate['correlation'], estimate['items'])
+    ]
+
+
+def compute_activity_analytics(data, session_gap: float = DEFAULT_SESSION_GAP,
+                               rolling_window_days: int = DEFAULT_ROLLING_WINDOW_DAYS,
+                               top_subreddits: int = 10) -> Optional[Dict]:
+    """
+    Compute the extended activity analytics for a user.
+
+    Args:
+        data: ``get_user_data`` dict or ``ItemStore``
+        session_gap: Seconds of inactivity that end a session
+        rolling_window_days: Window of the rolling daily activity rate
+        top_subreddits: Number of most active subreddits to report percentiles for
+
+    Returns:
+        Dictionary of analytics, or None when there is no activity
+    """
+    store: ItemStore = as_item_store(data)
+    if len(store) == 0:
+        return None
+
+    # Web-scraped items can lack a timestamp (created_utc 0); left in, one of them would
+    # stretch the daily series back to 1970 and skew the trend, sessions and heatmap
+    dated = store.created_utc > 0
+    created_utc = store.created_utc[dated]
+    heatmap = hour_weekday_heatmap(created_utc)
+    daily = daily_counts(created_utc)
+    _, subreddit_counts = store.subreddit_counts()
+    top_codes = np.argsort(-subreddit_counts, kind='stable')[:top_subreddits]
+    top_codes = top_codes[subreddit_counts[top_codes] > 0]
+    percentiles = subreddit_score_percentiles(store.subreddit_codes, store.scores, len(store.subreddits),
+                                              codes=top_codes)
+    percentiles['subreddits'] = [store.subreddits[code] for code in percentiles['codes']]
+
+    return {
+        'heatmap': heatmap,
+        'sessions': sessionize(created_utc, session_gap),
+        'daily': daily,
+        'rolling_rate': rolling_rate(daily['counts'], rolling_window_days),
+        'rolling_window_days': rolling_window_days,
+        'subreddit_percentiles': percentiles,
+        'trend': activity_trend(created_utc),
+        'timezone': estimate_timezone(heatmap.sum(axis=0)),
+        'undated_items': int(len(store) - dated.sum())
+    }
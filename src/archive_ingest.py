@@ -0,0 +1,248 @@
+"""
+Offline Archive Ingest
+Builds per-user raw data from Pushshift-style monthly dumps (zstd-compressed
+NDJSON of comments and submissions) without live scraping.
+
+Usage:
+    python -m src.archive_ingest RC_2023-01.zst RS_2023-01.zst --users kojied,spez
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from .raw_data_io import RAW_FORMATS, RawDataWriter, dumps, loads, open_compressed, raw_data_filename
+
+
+_AUTHOR_KEY = b'"author":'
+
+# Matched lines buffered per worker before they are appended to the shard files;
+# files are opened only while flushing, so large cohorts never exhaust file handles
+SHARD_FLUSH_BYTES = 8 * 1024 * 1024
+
+
+def _author_of(line: bytes) -> Optional[bytes]:
+    """Pull the lowercased author out of a raw NDJSON line without parsing it."""
+    start = line.find(_AUTHOR_KEY)
+    if start < 0:
+        return None
+    start += len(_AUTHOR_KEY)
+    while line[start:start + 1] == b' ':
+        start += 1
+    if line[start:start + 1] != b'"':
+        return None
+    end = line.find(b'"', start + 1)
+    if end < 0:
+        return None
+    return line[start + 1:end].lower()
+
+
+def normalize_archive_record(record: Dict) -> Dict:
+    """Convert a Pushshift comment or submission into the scraper's item format."""
+    subreddit = record.get('subreddit') or ''
+    permalink = record.get('permalink') or ''
+    created_utc = float(record.get('created_utc') or 0)
+
+    if 'body' in record:
+        if not permalink:
+            link_id = (record.get('link_id') or '')[3:]
+            permalink = f"/r/{subreddit}/comments/{link_id}/_/{record.get('id', '')}/"
+        return {
+            'type': 'comment',
+            'id': record.get('id', ''),
+            'body': record.get('body', ''),
+            'url': f"https://www.reddit.com{permalink}",
+            'subreddit': subreddit,
+            'score': record.get('score') or 0,
+            'created_utc': created_utc,
+            'submission_title': record.get('link_title', '')
+        }
+
+    if not permalink:
+        permalink = f"/r/{subreddit}/comments/{record.get('id', '')}/"
+    return {
+        'type': 'submission',
+        'id': record.get('id', ''),
+        'title': record.get('title', ''),
+        'selftext': record.get('selftext', ''),
+        'url': f"https://www.reddit.com{permalink}",
+        'subreddit': subreddit,
+        'score': record.get('score') or 0,
+        'created_utc': created_utc,
+        'num_comments': record.get('num_comments') or 0
+    }
+
+
+def scan_dump(path: str, targets: Dict[bytes, str], shard_dir: str, dump_index: int = 0) -> Dict[str, int]:
+    """
+    Stream one dump file and append matching items to per-user shard files.
+
+    Matches are buffered up to ``SHARD_FLUSH_BYTES`` and then appended with
+    one short-lived file handle per user, so memory and open files stay
+    bounded however many users are targeted.
+
+    Args:
+        path: Dump file (zstd, gzip or plain NDJSON)
+        targets: Lowercased author bytes mapped to the canonical username
+        shard_dir: Directory receiving ``<username>/<index>_<dump>.ndjson`` shards
+        dump_index: Position of the dump in the ingest; keeps shards of dumps that
+            share a file name (``2023/RC_01.zst``, ``2024/RC_01.zst``) apart
+
+    Returns:
+        Number of matched items per username
+    """
+    counts: Counter = Counter()
+    pending: Dict[str, List[bytes]] = {}
+    pending_bytes = 0
+    shard_name = f"{dump_index:05d}_{os.path.basename(path)}.ndjson"
+
+    def flush():
+        for username, lines in pending.items():
+            user_dir = os.path.join(shard_dir, username)
+            os.makedirs(user_dir, exist_ok=True)
+            with open(os.path.join(user_dir, shard_name), 'ab') as shard:
+                shard.writelines(lines)
+        pending.clear()
+
+    with open_compressed(path) as stream:
+        for line in stream:
+            author = _author_of(line)
+            username = targets.get(author) if author else None
+            if username is None:
+                continue
+
+            encoded = dumps(normalize_archive_record(loads(line))) + b'\n'
+            pending.setdefault(username, []).append(encoded)
+            pending_bytes += len(encoded)
+            counts[username] += 1
+            if pending_bytes >= SHARD_FLUSH_BYTES:
+                flush()
+                pending_bytes = 0
+    flush()
+
+    return dict(counts)
+
+
+def _merge_user_shards(username: str, shard_dir: str, output_dir: str, fmt: str) -> str:
+    """Concatenate a user's shards into one NDJSON raw data file."""
+    path = raw_data_filename(username, output_dir, fmt)
+    user_dir = os.path.join(shard_dir, username)
+
+    with RawDataWriter(path, username, datetime.now().isoformat(), 'archive') as writer:
+        for shard_name in sorted(os.listdir(user_dir)):
+            with open(os.path.join(user_dir, shard_name), 'rb') as shard:
+                for line in shard:
+                    writer.write_item(loads(line))
+
+    return path
+
+
+def ingest_dumps(dump_paths: Iterable[str], usernames: Iterable[str], output_dir: str = "output",
+                 fmt: str = "ndjson.zst", workers: Optional[int] = None, corpus_path: Optional[str] = None,
+                 progress_callback=None) -> Dict[str, str]:
+    """
+    Build raw data files for ``usernames`` from archive dumps.
+
+    Each dump is scanned by its own worker process; matches are spilled to
+    per-user shard files so memory stays bounded regardless of dump size.
+
+    Args:
+        dump_paths: Pushshift-style dump files
+        usernames: Target Reddit usernames (matched case-insensitively)
+        output_dir: Directory for the per-user raw data files
+        fmt: Raw data format for the output files (an NDJSON variant)
+        workers: Number of worker processes (defaults to one per dump, capped at CPU count)
+        corpus_path: Optional SQLite corpus to upsert the results into
+        progress_callback: Optional callback function for progress updates
+
+    Returns:
+        Mapping of username to written raw data file
+    """
+    if fmt == 'json':
+        raise ValueError("Archive ingest writes NDJSON; choose one of ndjson, ndjson.gz, ndjson.zst")
+
+    dump_paths = list(dump_paths)
+    targets = {name.lower().encode('utf-8'): name for name in usernames}
+    if not dump_paths or not targets:
+        return {}
+
+    os.makedirs(output_dir, exist_ok=True)
+    shard_dir = tempfile.mkdtemp(prefix="archive_ingest_", dir=output_dir)
+    workers = workers or min(len(dump_paths), os.cpu_count() or 1)
+    totals: Counter = Counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(scan_dump, path, targets, shard_dir, index): path
+                       for index, path in enumerate(dump_paths)}
+            for future in as_completed(futures):
+                counts = future.result()
+                totals.update(counts)
+                if progress_callback:
+                    progress_callback(f"📦 Scanned {os.path.basename(futures[future])}: "
+                                      f"{sum(counts.values())} matching items")
+
+        written = {}
+        for username in sorted(totals):
+            written[username] = _merge_user_shards(username, shard_dir, output_dir, fmt)
+            if progress_callback:
+                progress_callback(f"💾 u/{username}: {totals[username]} items -> {written[username]}")
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+    if corpus_path:
+        from .corpus_store import RedditCorpus
+        from .raw_data_io import load_raw_data
+
+        with RedditCorpus(corpus_path) as corpus:
+            for path in written.values():
+                corpus.upsert_user_data(load_raw_data(path))
+
+    return written
+
+
+def _read_usernames(args) -> List[str]:
+    usernames = []
+    if args.users:
+        usernames.extend(name.strip() for name in args.users.split(',') if name.strip())
+    if args.users_file:
+        with open(args.users_file, 'r', encoding='utf-8') as f:
+            usernames.extend(line.strip() for line in f if line.strip())
+    return usernames
+
+
+def main():
+    """Command-line entry point for archive ingest."""
+    parser = argparse.ArgumentParser(description="Build per-user raw data from Reddit archive dumps")
+    parser.add_argument('dumps', nargs='+', help='Dump files (RC_*.zst / RS_*.zst or plain NDJSON)')
+    parser.add_argument('--users', help='Comma-separated target usernames')
+    parser.add_argument('--users-file', help='File with one target username per line')
+    parser.add_argument('--output', default='output', help='Output directory (default: output)')
+    parser.add_argument('--format', dest='fmt', default='ndjson.zst',
+                        choices=[fmt for fmt in RAW_FORMATS if fmt != 'json'],
+                        help='Raw data format (default: ndjson.zst)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per dump)')
+    parser.add_argument('--corpus', default=None, help='Also upsert results into this SQLite corpus')
+    args = parser.parse_args()
+
+    usernames = _read_usernames(args)
+    if not usernames:
+        print("❌ Error: provide target users with --users or --users-file")
+        sys.exit(1)
+
+    print(f"📦 Ingesting {len(args.dumps)} dump(s) for {len(usernames)} user(s)...")
+    start = time.perf_counter()
+    written = ingest_dumps(args.dumps, usernames, args.output, args.fmt, args.workers, args.corpus,
+                           progress_callback=lambda message: print(f"   {message}"))
+    print(f"✅ Wrote {len(written)} raw data file(s) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
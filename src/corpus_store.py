@@ -0,0 +1,301 @@
+"""
+SQLite Raw-Data Corpus
+Local, queryable history of everything the scraper has collected.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    first_scraped_at TEXT NOT NULL,
+    last_scraped_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS items (
+    item_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    username TEXT NOT NULL,
+    subreddit TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    body TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    score INTEGER NOT NULL DEFAULT 0,
+    created_utc REAL NOT NULL DEFAULT 0,
+    num_comments INTEGER,
+    last_run_id INTEGER,
+    PRIMARY KEY (type, item_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_items_user_created ON items (username, created_utc);
+CREATE INDEX IF NOT EXISTS idx_items_subreddit ON items (subreddit);
+CREATE INDEX IF NOT EXISTS idx_items_item_id ON items (item_id);
+
+CREATE TABLE IF NOT EXISTS scrape_runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    method TEXT,
+    scraped_at TEXT,
+    recorded_at TEXT NOT NULL,
+    total_submissions INTEGER NOT NULL DEFAULT 0,
+    total_comments INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_scrape_runs_user ON scrape_runs (username, run_id);
+"""
+
+UPSERT_ITEM = """
+INSERT INTO items (item_id, type, username, subreddit, title, body, url,
+                   score, created_utc, num_comments, last_run_id)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (type, item_id) DO UPDATE SET
+    subreddit = excluded.subreddit,
+    title = excluded.title,
+    body = excluded.body,
+    url = excluded.url,
+    score = excluded.score,
+    num_comments = excluded.num_comments,
+    last_run_id = excluded.last_run_id
+"""
+
+ITEM_COLUMNS = "item_id, type, username, subreddit, title, body, url, score, created_utc, num_comments"
+
+
+def corpus_path_for(output_dir: str = "output") -> str:
+    """Corpus location for an output directory (PERSONA_CORPUS_DB overrides it)."""
+    return os.getenv('PERSONA_CORPUS_DB') or os.path.join(output_dir, "reddit_corpus.db")
+
+
+class RedditCorpus:
+    """SQLite-backed store of users, items and scrape runs.
+
+    Items are deduplicated on ``(type, item_id)``; re-scraping a user
+    refreshes scores and text in place and records a new scrape run.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        """Open (and create if needed) the corpus database."""
+        self.db_path = db_path or corpus_path_for()
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def upsert_user_data(self, data: Dict) -> int:
+        """
+        Record a scrape result in the corpus.
+
+        Args:
+            data: Dictionary in the ``RedditScraper.get_user_data`` format
+
+        Returns:
+            The id of the recorded scrape run
+        """
+        username = data['username']
+        now = datetime.now().isoformat()
+        scraped_at = data.get('scraped_at') or now
+
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO users (username, first_scraped_at, last_scraped_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (username) DO UPDATE SET last_scraped_at = excluded.last_scraped_at",
+                (username, scraped_at, scraped_at)
+            )
+            cursor = self.conn.execute(
+                "INSERT INTO scrape_runs (username, method, scraped_at, recorded_at, total_submissions, total_comments) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (username, data.get('method'), scraped_at, now,
+                 len(data.get('submissions', [])), len(data.get('comments', [])))
+            )
+            run_id = cursor.lastrowid
+            self.conn.executemany(UPSERT_ITEM, self._item_rows(data, username, run_id))
+
+        return run_id
+
+    @staticmethod
+    def _item_rows(data: Dict, username: str, run_id: int) -> Iterator[tuple]:
+        for sub in data.get('submissions', []):
+            yield (sub.get('id', ''), 'submission', username, sub.get('subreddit', ''),
+                   sub.get('title', ''), sub.get('selftext', ''), sub.get('url', ''),
+                   sub.get('score', 0), sub.get('created_utc', 0), sub.get('num_comments', 0), run_id)
+        for comment in data.get('comments', []):
+            yield (comment.get('id', ''), 'comment', username, comment.get('subreddit', ''),
+                   comment.get('submission_title', ''), comment.get('body', ''), comment.get('url', ''),
+                   comment.get('score', 0), comment.get('created_utc', 0), None, run_id)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def list_users(self) -> List[str]:
+        """Return every username in the corpus."""
+        rows = self.conn.execute("SELECT username FROM users ORDER BY username")
+        return [row['username'] for row in rows]
+
+    def latest_run(self, username: str) -> Optional[Dict]:
+        """Return the most recent scrape run for ``username``."""
+        row = self.conn.execute(
+            "SELECT * FROM scrape_runs WHERE username = ? ORDER BY run_id DESC LIMIT 1",
+            (username,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def iter_items(self, username: str, since: Optional[float] = None, until: Optional[float] = None,
+                   subreddit: Optional[str] = None, item_type: Optional[str] = None,
+                   limit: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Stream a user's items, newest first, in the scraper's item format.
+
+        Args:
+            username: Reddit username
+            since: Only items created at or after this UTC timestamp
+            until: Only items created before this UTC timestamp
+            subreddit: Only items from this subreddit
+            item_type: ``'submission'`` or ``'comment'``
+            limit: Maximum number of items
+        """
+        clauses = ["username = ?"]
+        params: List = [username]
+        if since is not None:
+            clauses.append("created_utc >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_utc < ?")
+            params.append(until)
+        if subreddit:
+            clauses.append("subreddit = ?")
+            params.append(subreddit)
+        if item_type:
+            clauses.append("type = ?")
+            params.append(item_type)
+
+        query = f"SELECT {ITEM_COLUMNS} FROM items WHERE {' AND '.join(clauses)} ORDER BY created_utc DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        for row in self.conn.execute(query, params):
+            yield self._row_to_item(row)
+
+    @staticmethod
+    def _row_to_item(row: sqlite3.Row) -> Dict:
+        if row['type'] == 'comment':
+            return {
+                'type': 'comment',
+                'id': row['item_id'],
+                'body': row['body'],
+                'url': row['url'],
+                'subreddit': row['subreddit'],
+                'score': row['score'],
+                'created_utc': row['created_utc'],
+                'submission_title': row['title']
+            }
+        return {
+            'type': 'submission',
+            'id': row['item_id'],
+            'title': row['title'],
+            'selftext': row['body'],
+            'url': row['url'],
+            'subreddit': row['subreddit'],
+            'score': row['score'],
+            'created_utc': row['created_utc'],
+            'num_comments': row['num_comments'] or 0
+        }
+
+    def load_user_data(self, username: str, limit: Optional[int] = None, **filters) -> Optional[Dict]:
+        """
+        Load a slice of a user's history in the ``get_user_data`` format.
+
+        Args:
+            username: Reddit username
+            limit: Maximum number of submissions and of comments
+            **filters: ``since``, ``until`` or ``subreddit`` (see ``iter_items``)
+
+        Returns:
+            Dictionary containing user data or None if the user is unknown
+        """
+        run = self.latest_run(username)
+        if not run:
+            return None
+
+        submissions = list(self.iter_items(username, item_type='submission', limit=limit, **filters))
+        comments = list(self.iter_items(username, item_type='comment', limit=limit, **filters))
+
+        return {
+            'username': username,
+            'submissions': submissions,
+            'comments': comments,
+            'total_submissions': len(submissions),
+            'total_comments': len(comments),
+            'scraped_at': run['scraped_at'],
+            'method': run['method'] or 'corpus'
+        }
+
+    def hourly_histograms(self, usernames: Optional[List[str]] = None) -> Tuple[List[str], List[List[int]]]:
+        """
+        Return per-user item counts by UTC hour, for cohort-level analytics.
+
+        Args:
+            usernames: Users to include (defaults to every user)
+
+        Returns:
+            ``(usernames, histograms)`` where each histogram has 24 counts
+        """
+        query = ("SELECT username, CAST((CAST(created_utc AS INTEGER) % 86400) / 3600 AS INTEGER) AS hour, "
+                 "COUNT(*) AS items FROM items")
+        params: List = []
+        if usernames:
+            query += f" WHERE username IN ({', '.join('?' for _ in usernames)})"
+            params.extend(usernames)
+        query += " GROUP BY username, hour ORDER BY username"
+
+        histograms: Dict[str, List[int]] = {}
+        for row in self.conn.execute(query, params):
+            histograms.setdefault(row['username'], [0] * 24)[row['hour']] = row['items']
+        names = list(histograms)
+        return names, [histograms[name] for name in names]
+
+    def subreddit_activity(self, username: str) -> List[Dict]:
+        """Return per-subreddit item counts and score totals for a user."""
+        rows = self.conn.execute(
+            "SELECT subreddit, COUNT(*) AS items, SUM(score) AS total_score, "
+            "MIN(created_utc) AS first_seen, MAX(created_utc) AS last_seen "
+            "FROM items WHERE username = ? GROUP BY subreddit ORDER BY items DESC",
+            (username,)
+        )
+        return [dict(row) for row in rows]
+
+    def users_in_subreddit(self, subreddit: str) -> List[Dict]:
+        """Return users active in ``subreddit`` with their item counts."""
+        rows = self.conn.execute(
+            "SELECT username, COUNT(*) AS items FROM items WHERE subreddit = ? "
+            "GROUP BY username ORDER BY items DESC",
+            (subreddit,)
+        )
+        return [dict(row) for row in rows]
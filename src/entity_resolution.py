@@ -0,0 +1,192 @@
+"""
+Entity Resolution
+Cleans LLM-extracted graph entities before anything is written to Neo4j:
+names are normalized, near-duplicates ("Coding" / "Programming", "Video
+Games" / "Video Gaming") are merged, relationship endpoints are rewritten to
+the surviving ids, and dangling or duplicate edges are dropped.
+"""
+
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional
+
+from .graph_facts import normalize_key
+
+# Entity types that are merged; User and the scraped facts are already unique
+RESOLVED_TYPES = ('Interest', 'Personality_Trait', 'Technology', 'Location', 'Skill')
+
+# Similarity (difflib ratio of normalized names) at which two entities of one type are merged
+FUZZY_MATCH_THRESHOLD = 0.88
+
+# Names shorter than this only merge on an exact normalized match ("Java" vs "Jazz")
+MIN_FUZZY_LENGTH = 5
+
+# Types whose near-duplicate names are fuzzy-merged; personality traits and locations
+# merge only on an exact canonical name or synonym ("Friendly" / "Unfriendly" score 0.9)
+FUZZY_TYPES = ('Interest', 'Technology', 'Skill')
+
+# Prefixes that turn a word into its opposite; names differing only by one never fuzzy-merge
+NEGATING_PREFIXES = ('un', 'in', 'im', 'ir', 'il', 'dis', 'non', 'a')
+
+# Normalized phrases treated as the same concept
+SYNONYMS = {
+    'coding': 'programming',
+    'software development': 'programming',
+    'software engineering': 'programming',
+    'computer programming': 'programming',
+    'video game': 'gaming',
+    'video gaming': 'gaming',
+    'videogame': 'gaming',
+    'game': 'gaming',
+    'ml': 'machine learning',
+    'ai': 'artificial intelligence',
+    'js': 'javascript',
+    'py': 'python',
+    'golang': 'go',
+    'k8s': 'kubernetes',
+    'nyc': 'new york city',
+    'new york': 'new york city',
+    'sf': 'san francisco',
+    'la': 'los angeles',
+    'uk': 'united kingdom',
+    'usa': 'united states',
+    'us': 'united states',
+    'workout': 'fitness',
+    'exercise': 'fitness',
+    'film': 'movie',
+    'tv': 'television'
+}
+
+
+def _singular(word: str) -> str:
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def canonical_name(name: str) -> str:
+    """Comparison form of an entity name: normalized, singular words, synonyms applied."""
+    phrase = ' '.join(_singular(word) for word in normalize_key(name).split('_') if word)
+    return SYNONYMS.get(phrase, phrase)
+
+
+def _entity_name(entity: Dict) -> str:
+    name = entity.get('properties', {}).get('name')
+    if isinstance(name, str) and name.strip():
+        return name
+    return entity['id'].split('_', 1)[-1]
+
+
+def _negates(a: str, b: str) -> bool:
+    """Whether one name is the other with a negating prefix on one word ("reliable" / "unreliable")."""
+    if len(a) < len(b):
+        a, b = b, a
+    extra = len(a) - len(b)
+    if not extra:
+        return False
+    for start in range(len(a) - extra + 1):
+        if (start == 0 or a[start - 1] == ' ') and a[start:start + extra].strip() in NEGATING_PREFIXES \
+                and a[:start] + a[start + extra:] == b:
+            return True
+    return False
+
+
+def _similar(a: str, b: str) -> bool:
+    """Fuzzy match with difflib's cheap upper bounds checked before the full ratio."""
+    if min(len(a), len(b)) < MIN_FUZZY_LENGTH or _negates(a, b):
+        return False
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    return (matcher.real_quick_ratio() >= FUZZY_MATCH_THRESHOLD
+            and matcher.quick_ratio() >= FUZZY_MATCH_THRESHOLD
+            and matcher.ratio() >= FUZZY_MATCH_THRESHOLD)
+
+
+def _merge_properties(target: Dict, source: Dict):
+    """Fill ``target`` from ``source``; numeric confidences keep the higher value."""
+    for key, value in source.items():
+        if key == 'confidence' and isinstance(value, (int, float)) and isinstance(target.get(key), (int, float)):
+            target[key] = max(target[key], value)
+        else:
+            target.setdefault(key, value)
+
+
+def resolve_entities(graph_data: Dict, known_ids: Optional[Iterable[str]] = None) -> Dict:
+    """
+    Merge duplicate entities and clean up relationships in extracted graph data.
+
+    Entities of ``RESOLVED_TYPES`` with the same canonical name, or (for
+    ``FUZZY_TYPES``) names within ``FUZZY_MATCH_THRESHOLD`` of each other that
+    are not negations of one another, collapse into the first one seen.
+    Relationships are rewritten to the surviving ids; those pointing at ids
+    that are neither extracted nor in ``known_ids`` (e.g. the scraped facts),
+    self-loops created by merging, and repeats of the same (from, type, to)
+    are dropped.
+
+    Returns:
+        Graph data in the same format, plus a ``resolution`` dict counting
+        ``merged`` entities and ``dropped`` relationships
+    """
+    entities: List[Dict] = []
+    aliases: Dict[str, str] = {}  # extracted id -> surviving id
+    survivors: Dict[str, Dict] = {}
+    by_canonical: Dict[tuple, Dict] = {}
+    candidates: Dict[str, List[tuple]] = {}
+    merged = 0
+
+    for entity in graph_data.get('entities', []):
+        if not isinstance(entity, dict) or not entity.get('id') or not entity.get('type'):
+            continue
+        entity = dict(entity, properties=dict(entity.get('properties') or {}))
+        if entity['id'] in aliases:
+            _merge_properties(survivors[aliases[entity['id']]]['properties'], entity['properties'])
+            continue
+        if entity['type'] not in RESOLVED_TYPES:
+            aliases[entity['id']] = entity['id']
+            survivors[entity['id']] = entity
+            entities.append(entity)
+            continue
+
+        name = canonical_name(_entity_name(entity))
+        survivor = by_canonical.get((entity['type'], name))
+        if survivor is None and entity['type'] in FUZZY_TYPES:
+            for other_name, other in candidates.get(entity['type'], []):
+                if _similar(name, other_name):
+                    survivor = other
+                    break
+
+        if survivor is None:
+            by_canonical[(entity['type'], name)] = entity
+            survivors[entity['id']] = entity
+            candidates.setdefault(entity['type'], []).append((name, entity))
+            aliases[entity['id']] = entity['id']
+            entities.append(entity)
+        else:
+            _merge_properties(survivor['properties'], entity['properties'])
+            aliases[entity['id']] = survivor['id']
+            merged += 1
+
+    valid_ids = set(survivors) | set(known_ids or ())
+    relationships = []
+    by_edge: Dict[tuple, Dict] = {}
+    dropped = 0
+    for rel in graph_data.get('relationships', []):
+        if not isinstance(rel, dict) or not rel.get('type'):
+            dropped += 1
+            continue
+        source = aliases.get(rel.get('from'), rel.get('from'))
+        target = aliases.get(rel.get('to'), rel.get('to'))
+        if source not in valid_ids or target not in valid_ids or source == target:
+            dropped += 1
+            continue
+        properties = dict(rel.get('properties') or {})
+        existing = by_edge.get((source, rel['type'], target))
+        if existing is not None:
+            _merge_properties(existing['properties'], properties)
+            dropped += 1
+            continue
+        by_edge[(source, rel['type'], target)] = rel = dict(rel, **{'from': source, 'to': target, 'properties': properties})
+        relationships.append(rel)
+
+    return {'entities': entities, 'relationships': relationships,
+            'resolution': {'merged': merged, 'dropped': dropped}}
@@ -0,0 +1,181 @@
+"""
+Deterministic Graph Facts
+Builds the factual part of a user's knowledge graph (User, Subreddit, Post
+and Comment nodes with weighted ACTIVE_IN, AUTHORED and POSTED_IN edges)
+straight from scraped items, so the LLM only has to infer traits and
+interests.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+# Characters of comment text stored on Comment nodes
+COMMENT_EXCERPT_CHARS = 300
+
+# Relationship types produced here (the LLM never emits these)
+FACT_RELATIONSHIP_TYPES = ('ACTIVE_IN', 'AUTHORED', 'POSTED_IN')
+
+# Labels whose nodes are shared by all users and MERGE'd on a normalized ``key``;
+# every other node is private to one user (tagged with ``username``)
+SHARED_LABELS = ('Subreddit', 'Interest')
+
+_KEY_NOISE = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_key(name: str) -> str:
+    """Normalized merge key: lowercase, runs of other characters collapsed to ``_``."""
+    return _KEY_NOISE.sub('_', name.lower()).strip('_')
+
+
+def shared_node_key(entity: Dict) -> Optional[str]:
+    """Merge key of a shared-label entity (from its name, else its id), or None for private nodes."""
+    if entity['type'] not in SHARED_LABELS:
+        return None
+    name = entity.get('properties', {}).get('name') or entity['id'].split('_', 1)[-1]
+    return normalize_key(name) or None
+
+
+def user_node_id(username: str) -> str:
+    """Graph id of the user node."""
+    return f"user_{username}"
+
+
+def subreddit_node_id(subreddit: str) -> str:
+    """Graph id of a subreddit node (subreddit names are case-insensitive)."""
+    return f"subreddit_{normalize_key(subreddit)}"
+
+
+def _content_node(item: Dict) -> Dict:
+    """Post or Comment entity for one scraped item."""
+    if item['type'] == 'comment':
+        return {
+            'id': f"comment_{item['id']}",
+            'type': 'Comment',
+            'properties': {
+                'name': item.get('submission_title') or item['id'],
+                'body': (item.get('body') or '')[:COMMENT_EXCERPT_CHARS],
+                'score': item.get('score', 0),
+                'created_utc': item.get('created_utc', 0),
+                'url': item.get('url', '')
+            }
+        }
+    return {
+        'id': f"post_{item['id']}",
+        'type': 'Post',
+        'properties': {
+            'name': item.get('title', ''),
+            'score': item.get('score', 0),
+            'num_comments': item.get('num_comments', 0),
+            'created_utc': item.get('created_utc', 0),
+            'url': item.get('url', '')
+        }
+    }
+
+
+def build_activity_graph(reddit_data: Dict) -> Dict:
+    """
+    Build graph entities and relationships from scraped items, without an LLM.
+
+    ACTIVE_IN edges carry ``items``, ``posts``, ``comments``, ``total_score``,
+    ``mean_score``, ``first_active``/``last_active`` (UTC) and ``weight`` (the
+    subreddit's share of the user's items).
+
+    Returns:
+        Graph data in the ``{'entities': [...], 'relationships': [...]}`` format
+        used by ``GraphRAGHandler``
+    """
+    username = reddit_data['username']
+    user_id = user_node_id(username)
+    items: List[Dict] = list(reddit_data.get('submissions', [])) + list(reddit_data.get('comments', []))
+
+    entities = []
+    relationships = []
+    activity: Dict[str, Dict] = {}
+    seen_content = set()
+
+    for item in items:
+        subreddit = item.get('subreddit')
+        if not subreddit or not item.get('id'):
+            continue
+
+        stats = activity.get(subreddit)
+        if stats is None:
+            stats = activity[subreddit] = {'items': 0, 'posts': 0, 'comments': 0, 'total_score': 0,
+                                           'first_active': None, 'last_active': None}
+        created_utc = item.get('created_utc') or 0
+        stats['items'] += 1
+        stats['comments' if item['type'] == 'comment' else 'posts'] += 1
+        stats['total_score'] += item.get('score', 0)
+        if created_utc:
+            stats['first_active'] = created_utc if stats['first_active'] is None else min(stats['first_active'], created_utc)
+            stats['last_active'] = created_utc if stats['last_active'] is None else max(stats['last_active'], created_utc)
+
+        node = _content_node(item)
+        if node['id'] in seen_content:
+            continue
+        seen_content.add(node['id'])
+        entities.append(node)
+        relationships.append({'from': user_id, 'to': node['id'], 'type': 'AUTHORED',
+                              'properties': {'created_utc': created_utc}})
+        relationships.append({'from': node['id'], 'to': subreddit_node_id(subreddit), 'type': 'POSTED_IN',
+                              'properties': {}})
+
+    total_items = sum(stats['items'] for stats in activity.values())
+    total_score = sum(stats['total_score'] for stats in activity.values())
+    timestamps = [stats[key] for stats in activity.values() for key in ('first_active', 'last_active') if stats[key]]
+
+    user = {
+        'id': user_id,
+        'type': 'User',
+        'properties': {
+            'name': username,
+            'total_submissions': reddit_data.get('total_submissions', len(reddit_data.get('submissions', []))),
+            'total_comments': reddit_data.get('total_comments', len(reddit_data.get('comments', []))),
+            'total_score': total_score,
+            'subreddit_count': len(activity)
+        }
+    }
+    if timestamps:
+        user['properties']['first_active'] = min(timestamps)
+        user['properties']['last_active'] = max(timestamps)
+
+    subreddits = []
+    for subreddit, stats in sorted(activity.items(), key=lambda entry: (-entry[1]['items'], entry[0].lower())):
+        subreddits.append({'id': subreddit_node_id(subreddit), 'type': 'Subreddit', 'properties': {'name': subreddit}})
+        properties = {key: value for key, value in stats.items() if value is not None}
+        properties['mean_score'] = stats['total_score'] / stats['items']
+        properties['weight'] = stats['items'] / total_items
+        relationships.append({'from': user_id, 'to': subreddit_node_id(subreddit), 'type': 'ACTIVE_IN',
+                              'properties': properties})
+
+    return {'entities': [user] + subreddits + entities, 'relationships': relationships}
+
+
+def merge_graph_data(facts: Dict, inferred: Dict) -> Dict:
+    """
+    Combine deterministic facts with LLM-inferred entities and relationships.
+
+    Inferred properties of the user node (age range, location, ...) are added
+    to the factual user node; inferred entities that duplicate a factual id
+    are dropped, as are inferred subreddit facts (``ACTIVE_IN`` edges).
+    """
+    entities = [dict(entity, properties=dict(entity['properties'])) for entity in facts['entities']]
+    by_id = {entity['id']: entity for entity in entities}
+
+    for entity in inferred.get('entities', []):
+        existing = by_id.get(entity['id'])
+        if existing is None:
+            if entity['type'] == 'Subreddit':
+                continue
+            entities.append(entity)
+            by_id[entity['id']] = entity
+        elif existing['type'] == 'User':
+            for key, value in entity.get('properties', {}).items():
+                existing['properties'].setdefault(key, value)
+
+    relationships = list(facts['relationships'])
+    for rel in inferred.get('relationships', []):
+        if rel['type'] in FACT_RELATIONSHIP_TYPES or rel['from'] not in by_id or rel['to'] not in by_id:
+            continue
+        relationships.append(rel)
+    return {'entities': entities, 'relationships': relationships}
@@ -0,0 +1,117 @@
+"""
+Graph Snapshots
+Gzipped JSON snapshots of a user's knowledge graph (entities and
+relationships plus a schema version), written after every build so the graph
+can be bulk-restored into Neo4j without another LLM extraction.
+"""
+
+import gzip
+import hashlib
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from .raw_data_io import dumps, loads
+
+SNAPSHOT_FORMAT = "reddit-persona-graph"
+
+# Bump when the entity/relationship format changes so old snapshots are rejected
+SNAPSHOT_VERSION = 1
+
+
+class GraphSnapshotError(ValueError):
+    """A file that is not a graph snapshot this version can restore."""
+
+
+def graph_snapshot_path(username: str, output_dir: str = "output") -> str:
+    """Snapshot file for ``username``, next to the persona files."""
+    return os.path.join(output_dir, f"{username}_graph.json.gz")
+
+
+def facts_hash(facts: Dict) -> str:
+    """Fingerprint of the activity facts (``build_activity_graph`` output) a graph was built from."""
+    return hashlib.sha256(dumps(facts)).hexdigest()
+
+
+def save_graph_snapshot(graph_data: Dict, username: str, output_dir: str = "output",
+                        persona_sha256: Optional[str] = None, facts_sha256: Optional[str] = None) -> str:
+    """
+    Write a user's graph to its snapshot file (atomically, so a crash never leaves a torn file).
+
+    Args:
+        graph_data: ``{'entities': [...], 'relationships': [...]}`` as passed to the graph writer
+        username: Reddit username
+        output_dir: Directory for the snapshot
+        persona_sha256: Hash of the persona the graph was built from, to detect stale snapshots
+        facts_sha256: ``facts_hash`` of the activity facts, to detect snapshots older than the scrape
+
+    Returns:
+        Path of the written snapshot
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = graph_snapshot_path(username, output_dir)
+    snapshot = {
+        'format': SNAPSHOT_FORMAT,
+        'schema_version': SNAPSHOT_VERSION,
+        'username': username,
+        'created_at': datetime.now().isoformat(),
+        'persona_sha256': persona_sha256,
+        'facts_sha256': facts_sha256,
+        'entities': graph_data.get('entities', []),
+        'relationships': graph_data.get('relationships', [])
+    }
+    temp_path = f"{path}.tmp"
+    with gzip.open(temp_path, 'wb', compresslevel=6) as f:
+        f.write(dumps(snapshot))
+    os.replace(temp_path, path)
+    return path
+
+
+def load_graph_snapshot(path: str) -> Dict:
+    """
+    Read and validate a snapshot file.
+
+    Returns:
+        The snapshot, with ``username``, ``created_at``, ``persona_sha256``,
+        ``facts_sha256``, ``entities`` and ``relationships``
+
+    Raises:
+        OSError: If the file cannot be read
+        GraphSnapshotError: If it is not a snapshot of the current schema version
+    """
+    try:
+        with gzip.open(path, 'rb') as f:
+            snapshot = loads(f.read())
+    except (gzip.BadGzipFile, EOFError, ValueError) as e:
+        raise GraphSnapshotError(f"{path} is not a readable graph snapshot: {e}") from e
+
+    if not isinstance(snapshot, dict) or snapshot.get('format') != SNAPSHOT_FORMAT:
+        raise GraphSnapshotError(f"{path} is not a graph snapshot")
+    if snapshot.get('schema_version') != SNAPSHOT_VERSION:
+        raise GraphSnapshotError(f"{path} has snapshot schema version {snapshot.get('schema_version')}, "
+                                 f"expected {SNAPSHOT_VERSION}")
+    if not isinstance(snapshot.get('entities'), list) or not isinstance(snapshot.get('relationships'), list):
+        raise GraphSnapshotError(f"{path} is missing its entities or relationships")
+    return snapshot
+
+
+def find_graph_snapshot(username: str, output_dir: str = "output",
+                        persona_sha256: Optional[str] = None,
+                        facts_sha256: Optional[str] = None) -> Optional[Dict]:
+    """
+    The user's snapshot if there is a valid one, built from the persona with
+    ``persona_sha256`` and the activity facts with ``facts_sha256`` (each when given).
+    """
+    path = graph_snapshot_path(username, output_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        snapshot = load_graph_snapshot(path)
+    except (OSError, GraphSnapshotError) as e:
+        print(f"⚠️ Ignoring graph snapshot: {e}")
+        return None
+    if persona_sha256 and snapshot.get('persona_sha256') != persona_sha256:
+        return None
+    if facts_sha256 and snapshot.get('facts_sha256') != facts_sha256:
+        return None
+    return snapshot
@@ -4,18 +4,201 @@ Integrates with Neo4j LLM Graph Builder for graph-based Q&A
 """
 
 import os
+import re
 import sys
 import json
 import requests
 import tempfile
 import subprocess
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from . import metrics
+from .corpus_store import RedditCorpus
+from .entity_resolution import resolve_entities
+from .graph_facts import SHARED_LABELS, build_activity_graph, merge_graph_data, normalize_key, shared_node_key
+from .graph_snapshot import (GraphSnapshotError, facts_hash, find_graph_snapshot, graph_snapshot_path,
+                             load_graph_snapshot, save_graph_snapshot)
+from .persona_parser import EVIDENCE_MARKER, get_parsed_persona, text_hash
+from .persona_schema import find_persona_json, persona_graph_data
 
 load_dotenv()
 
+# Rows sent per UNWIND statement when bulk-loading a graph
+GRAPH_BATCH_SIZE = 1000
+
+# Relationships or nodes removed per transaction when deleting graphs
+GRAPH_DELETE_BATCH_SIZE = 5000
+
+# Persona characters per entity extraction prompt; longer personas are split at section boundaries
+EXTRACTION_CHUNK_CHARS = 6000
+
+# Concurrent extraction calls per graph build (GRAPH_EXTRACTION_WORKERS overrides)
+EXTRACTION_WORKERS = 4
+
+# Extra attempts per chunk after a failed call or unparseable response, with exponential backoff
+EXTRACTION_RETRIES = 2
+EXTRACTION_RETRY_DELAY = 1.0
+
+# Properties kept on shared Subreddit/Interest nodes; anything else an entity carries
+# (confidence, description, ...) is specific to one user and goes on that user's edge
+SHARED_NODE_PROPERTIES = ('name', 'category')
+
+# Bookkeeping properties on the User node, ignored when diffing a stored graph
+GRAPH_META_PROPERTIES = ('graph_version',)
+
+# Context budget for graph Q&A prompts, shared by graph facts and retrieved passages
+# (estimated at ~4 characters per token); QA_CONTEXT_TOKENS overrides
+QA_CONTEXT_TOKENS = 3000
+QA_CHARS_PER_TOKEN = 4
+
+# Passages retrieved per question, and the characters quoted from each
+QA_PASSAGES = 8
+QA_PASSAGE_CHARS = 600
+
+_CITATION = re.compile(r'\[(\d+)\]')
+
+# Labels and relationship types are interpolated into Cypher, so only plain identifiers are allowed
+_CYPHER_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _property_map(properties: Dict) -> Dict:
+    """Keep only values Neo4j can store as properties, so one odd LLM value cannot fail a whole batch."""
+    clean = {}
+    for key, value in properties.items():
+        if isinstance(value, (str, int, float, bool)):
+            clean[key] = value
+        elif isinstance(value, list) and all(isinstance(item, (str, int, float, bool)) for item in value):
+            clean[key] = value
+    return clean
+
+
+def _batches(rows: List[Dict], size: int = GRAPH_BATCH_SIZE) -> Iterator[List[Dict]]:
+    """Split ``rows`` into lists of at most ``size``."""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _pack_blocks(blocks: List[str], max_chars: int) -> List[str]:
+    """Greedily join blocks (each already at most ``max_chars``) into chunks of at most ``max_chars``."""
+    chunks = []
+    current = ''
+    for block in blocks:
+        if current and len(current) + len(block) + 2 > max_chars:
+            chunks.append(current)
+            current = ''
+        current = f"{current}\n\n{block}" if current else block
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_block(heading: str, lines: List[str], max_chars: int) -> List[str]:
+    """Split one section's lines into blocks of at most ``max_chars``, repeating its heading."""
+    blocks = []
+    current = heading
+    for line in lines:
+        if current != heading and len(current) + len(line) + 1 > max_chars:
+            blocks.append(current)
+            current = f"{heading} (continued)"
+        current += '\n' + line[:max_chars - len(heading) - 20]
+    blocks.append(current)
+    return blocks
+
+
+def split_persona_chunks(persona_text: str, max_chars: int = EXTRACTION_CHUNK_CHARS) -> List[str]:
+    """
+    Split a persona into extraction chunks of at most ``max_chars``.
+    
+    Whole ``##`` sections are packed together; a section longer than a chunk
+    is split between lines, and evidence sources are chunked separately.
+    Personas that fit in one chunk are returned unchanged.
+    """
+    if len(persona_text) <= max_chars:
+        return [persona_text]
+    
+    parsed = get_parsed_persona(persona_text)
+    header = f"# {parsed.title}\n\n" if parsed.title else ''
+    max_chars -= len(header)
+    blocks = []
+    for section in parsed.sections:
+        blocks.extend(_split_block(f"## {section.title}", section.lines, max_chars))
+    if parsed.evidence_text:
+        blocks.extend(_split_block(EVIDENCE_MARKER, parsed.evidence_text.splitlines()[1:], max_chars))
+    if not blocks:
+        blocks = _split_block('', [line for line in persona_text.splitlines() if line.strip()], max_chars)
+    
+    return [header + chunk for chunk in _pack_blocks(blocks, max_chars)]
+
+
+def _shared_label_predicate(var: str) -> str:
+    """Cypher predicate that holds when ``var`` is a shared (Subreddit or Interest) node."""
+    return '(' + ' OR '.join(f"{var}:{label}" for label in SHARED_LABELS) + ')'
+
+
+def _rows_by_label(keyed: Dict) -> Dict[str, List]:
+    """Group ``{(label, ref): value}`` into ``{label: [value or ref, ...]}`` (refs when values are None)."""
+    grouped = defaultdict(list)
+    for (label, ref), value in keyed.items():
+        grouped[label].append(ref if value is None else value)
+    return grouped
+
+
+def _edge_rows_by_type(edges: Dict) -> Dict[Tuple[str, str, str], List[Dict]]:
+    """Group keyed edges into UNWIND rows per (type, from label, to label)."""
+    grouped = defaultdict(list)
+    for (rel_type, from_label, from_ref, to_label, to_ref), properties in edges.items():
+        grouped[(rel_type, from_label, to_label)].append({'from': from_ref, 'to': to_ref, 'properties': properties})
+    return grouped
+
+
+def _diff_rows(stored: Dict, new: Dict) -> Tuple[Dict, Dict, List]:
+    """Split keyed rows into inserts, updates (changed properties) and the keys to delete."""
+    inserts = {key: properties for key, properties in new.items() if key not in stored}
+    updates = {key: properties for key, properties in new.items() if key in stored and stored[key] != properties}
+    deletes = [key for key in stored if key not in new]
+    return inserts, updates, deletes
+
+
+def _truncate_lines(text: str, max_chars: int) -> str:
+    """Keep the leading whole lines of ``text`` that fit in ``max_chars``."""
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind('\n', 0, max_chars + 1)
+    return text[:cut] if cut > 0 else ''
+
+
+def _fuse_context(graph_context: str, passages: List[Dict], max_chars: int) -> Tuple[str, List[Dict]]:
+    """
+    Fit graph context and retrieved passages into one character budget.
+    
+    The graph context is guaranteed half of the budget and passages (best
+    first, each cut to ``QA_PASSAGE_CHARS``) the rest; whatever one side
+    leaves unused goes to the other.
+    
+    Returns:
+        ``(graph_context, passages)`` trimmed to fit, each passage with its
+        quoted ``text``
+    """
+    passage_budget = max_chars - min(len(graph_context), max_chars // 2)
+    fitted = []
+    used = 0
+    for passage in passages:
+        text = ' '.join(passage['text'].split())
+        if len(text) > QA_PASSAGE_CHARS:
+            text = text[:QA_PASSAGE_CHARS].rsplit(' ', 1)[0] + ' …'
+        cost = len(text) + len(passage.get('url', '')) + 40  # header line with number, subreddit and URL
+        if used + cost > passage_budget:
+            break
+        fitted.append(dict(passage, text=text))
+        used += cost
+    return _truncate_lines(graph_context, max_chars - used), fitted
+
 
 class GraphRAGHandler:
     """Handle GraphRAG operations for persona Q&A."""
@@ -29,6 +212,8 @@ class GraphRAGHandler:
         
         # Initialize Gemini for Q&A
         if self.gemini_api_key:
+            import google.generativeai as genai
+            
             genai.configure(api_key=self.gemini_api_key)
             self.model = genai.GenerativeModel('models/gemini-2.0-flash-exp')
         else:
@@ -37,15 +222,46 @@ class GraphRAGHandler:
         # Track graph state per user
         self.user_graphs = {}  # {username: {'created': bool, 'data': dict}}
         
+        # Graph snapshots are written next to the persona files
+        self.snapshot_dir = os.getenv('GRAPH_SNAPSHOT_DIR') or 'output'
+        
+        # Passage indexes are built next to the raw data files (see RedditScraper.save_raw_data)
+        self.passage_dir = os.getenv('PASSAGE_INDEX_DIR') or 'output'
+        self.qa_context_tokens = int(os.getenv('QA_CONTEXT_TOKENS') or QA_CONTEXT_TOKENS)
+        
+        # Neo4j driver shared by all queries (see _get_driver)
+        self._driver = None
+        self._driver_lock = threading.Lock()
+        
+    def _get_driver(self):
+        """Return the shared Neo4j driver, creating it on first use (it pools connections)."""
+        with self._driver_lock:
+            if self._driver is None:
+                from neo4j import GraphDatabase
+                
+                self._driver = GraphDatabase.driver(self.neo4j_uri, auth=(self.neo4j_user, self.neo4j_password))
+            return self._driver
+    
+    def close(self):
+        """Close the shared Neo4j driver."""
+        with self._driver_lock:
+            if self._driver is not None:
+                self._driver.close()
+                self._driver = None
+    
+    def _run_query(self, session, query_type: str, query: str, parameters: Optional[Dict] = None):
+        """Run a Cypher query, recording its count and latency by query type."""
+        with metrics.track_neo4j_query(query_type):
+            return session.run(query, parameters=parameters)
+    
     def check_graph_exists_in_neo4j(self, username: str) -> bool:
         """Check if graph exists in Neo4j for the given user."""
         try:
-            from neo4j import GraphDatabase
-            
-            driver = GraphDatabase.driver(self.neo4j_uri, auth=(self.neo4j_user, self.neo4j_password))
+            driver = self._get_driver()
             
             with driver.session() as session:
-                result = session.run(
+                result = self._run_query(
+                    session, 'graph_exists',
                     "MATCH (n) WHERE n.username = $username RETURN count(n) as node_count",
                     parameters={"username": username}
                 )
@@ -65,8 +281,6 @@ class GraphRAGHandler:
                         del self.user_graphs[username]
                     return False
             
-            driver.close()
-            
         except Exception as e:
             print(f"Error checking graph existence in Neo4j: {e}")
             return False
@@ -90,18 +304,28 @@ class GraphRAGHandler:
     def check_neo4j_connection(self) -> bool:
         """Check if Neo4j is accessible."""
         try:
-            from neo4j import GraphDatabase
-            driver = GraphDatabase.driver(self.neo4j_uri, auth=(self.neo4j_user, self.neo4j_password))
+            driver = self._get_driver()
             with driver.session() as session:
-                session.run("RETURN 1")
-            driver.close()  
+                self._run_query(session, 'ping', "RETURN 1")
             return True
         except Exception as e:
             print(f"Neo4j connection failed: {e}")
             return False
     
-    def create_graph_from_persona(self, persona_text: str, username: str, reddit_data: Optional[Dict] = None) -> bool:
-        """Create knowledge graph from persona text."""
+    def create_graph_from_persona(self, persona_text: str, username: str, reddit_data: Optional[Dict] = None,
+                                  incremental: bool = False, use_snapshot: bool = True) -> bool:
+        """
+        Create knowledge graph from persona text.
+        
+        Args:
+            persona_text: Persona to build from (the saved persona file if empty)
+            username: Reddit username
+            reddit_data: Scraped data (the stored corpus if omitted)
+            incremental: Diff against the user's stored graph and write only the
+                changes, instead of deleting and recreating it
+            use_snapshot: Restore from the user's graph snapshot, with no LLM
+                calls, when it was built from this same persona and activity
+        """
         try:
             # Try to load existing persona file first
             if not persona_text:
@@ -111,26 +335,52 @@ class GraphRAGHandler:
                     return False
                 persona_text = loaded_persona
             
-            # Create minimal reddit_data if not provided
+            # Fall back to the stored corpus, then to minimal reddit_data
             if not reddit_data:
-                reddit_data = self._create_minimal_reddit_data(username)
+                reddit_data = self._load_corpus_reddit_data(username) or self._create_minimal_reddit_data(username)
+            
+            # Subreddit activity, posts and comments come straight from the scraped items
+            facts = build_activity_graph(dict(reddit_data, username=username))
             
-            # Create temporary file with persona data
-            persona_file = self._create_persona_file(persona_text, username, reddit_data)
+            # A snapshot is reused only if neither the persona nor the scraped activity changed since
+            persona_sha256 = text_hash(persona_text)
+            facts_sha256 = facts_hash(facts)
+            snapshot = None
+            if use_snapshot and not incremental:
+                snapshot = find_graph_snapshot(username, self.snapshot_dir, persona_sha256, facts_sha256)
             
-            # Extract entities and relationships from persona
-            entities_and_relations = self._extract_entities_and_relations(persona_text, username, reddit_data)
+            if snapshot:
+                print(f"♻️ Restoring graph for {username} from its snapshot ({snapshot['created_at']}); no extraction needed")
+                entities_and_relations = {'entities': snapshot['entities'], 'relationships': snapshot['relationships']}
+            else:
+                entities_and_relations = self._build_graph_data(persona_text, username, reddit_data, facts)
+                if entities_and_relations is None:
+                    return False
             
-            if not entities_and_relations:
+            # Create graph in Neo4j, or apply just the changes to the stored one
+            update = None
+            if incremental:
+                try:
+                    update = self._update_neo4j_graph(entities_and_relations, username)
+                except Exception as e:
+                    print(f"⚠️ Incremental graph update failed ({e}); rebuilding the graph for {username}")
+            if update is None and not self._create_neo4j_graph(entities_and_relations, username):
                 return False
             
-            # Create graph in Neo4j
-            self._create_neo4j_graph(entities_and_relations, username)
+            # Keep the built graph so it can be restored without re-extraction
+            if not snapshot:
+                try:
+                    path = save_graph_snapshot(entities_and_relations, username, self.snapshot_dir,
+                                               persona_sha256, facts_sha256)
+                    print(f"💾 Graph snapshot saved: {path}")
+                except OSError as e:
+                    print(f"⚠️ Could not save graph snapshot: {e}")
             
             # Update user-specific graph state
             self.user_graphs[username] = {
                 'created': True,
-                'data': entities_and_relations
+                'data': entities_and_relations,
+                'last_update': update
             }
             
             return True
@@ -139,6 +389,71 @@ class GraphRAGHandler:
             print(f"Error creating graph: {e}")
             return False
     
+    def _build_graph_data(self, persona_text: str, username: str, reddit_data: Dict, facts: Dict) -> Optional[Dict]:
+        """Combine activity facts with inferred (structured or LLM-extracted, then resolved) entities."""
+        # Create temporary file with persona data
+        persona_file = self._create_persona_file(persona_text, username, reddit_data)
+        
+        # Structured personas already carry their inferred graph; otherwise extract it with the LLM
+        persona_json = find_persona_json(persona_text, username)
+        if persona_json:
+            print(f"🧩 Using graph entities from the structured persona for user: {username}")
+            inferred = persona_graph_data(persona_json, username)
+        else:
+            inferred = self._extract_entities_and_relations(persona_text, username, reddit_data)
+        
+        if not inferred:
+            if len(facts['entities']) <= 1:
+                return None
+            print(f"⚠️ No inferred traits or interests for {username}; building the activity graph only")
+            inferred = {'entities': [], 'relationships': []}
+        
+        # Merge near-duplicate entities and drop dangling edges before any database work
+        inferred = resolve_entities(inferred, known_ids=(entity['id'] for entity in facts['entities']))
+        resolution = inferred.pop('resolution')
+        if resolution['merged'] or resolution['dropped']:
+            print(f"🧹 Entity resolution: merged {resolution['merged']} duplicate entities, "
+                  f"dropped {resolution['dropped']} dangling or duplicate relationships")
+        
+        return merge_graph_data(facts, inferred)
+    
+    def restore_graph_from_snapshot(self, username: str, path: Optional[str] = None) -> bool:
+        """
+        Recreate a user's graph from a snapshot file through the batched write path, with no LLM calls.
+        
+        Args:
+            username: Reddit username
+            path: Snapshot file (default: the user's snapshot in ``snapshot_dir``)
+            
+        Returns:
+            True if the graph was written
+        """
+        path = path or graph_snapshot_path(username, self.snapshot_dir)
+        try:
+            snapshot = load_graph_snapshot(path)
+        except (OSError, GraphSnapshotError) as e:
+            print(f"❌ Cannot restore graph for {username}: {e}")
+            return False
+        
+        print(f"♻️ Restoring graph for {username} from {path} ({len(snapshot['entities'])} entities, "
+              f"{len(snapshot['relationships'])} relationships)")
+        graph_data = {'entities': snapshot['entities'], 'relationships': snapshot['relationships']}
+        if not self._create_neo4j_graph(graph_data, username):
+            return False
+        self.user_graphs[username] = {'created': True, 'data': graph_data, 'last_update': None}
+        return True
+    
+    def _load_corpus_reddit_data(self, username: str, limit: int = 100) -> Optional[Dict]:
+        """Load the most recent slice of a user's history from the SQLite corpus."""
+        try:
+            with RedditCorpus() as corpus:
+                data = corpus.load_user_data(username, limit=limit)
+            metrics.record_cache('corpus', data is not None)
+            return data
+        except Exception as e:
+            print(f"Error loading corpus data for {username}: {e}")
+            return None
+    
     def _create_minimal_reddit_data(self, username: str) -> Dict:
         """Create minimal reddit_data structure for existing persona files."""
         return {
@@ -201,15 +516,60 @@ SUBREDDIT ACTIVITY:
         return str(file_path)
     
     def _extract_entities_and_relations(self, persona_text: str, username: str, reddit_data: Dict) -> Optional[Dict]:
-        """Extract entities and relationships using LLM."""
+        """
+        Extract entities and relationships using LLM.
+        
+        Long personas are split at section boundaries into chunks of at most
+        ``EXTRACTION_CHUNK_CHARS`` that are extracted concurrently, each with
+        its own retries. Results of the chunks that succeed are combined
+        (duplicates are merged later by entity resolution); None only when
+        every chunk failed.
+        """
         if not self.model:
             return None
         
-        extraction_prompt = f"""
-You are an expert knowledge graph builder. Extract entities and relationships from this Reddit user persona to create a knowledge graph.
+        chunks = split_persona_chunks(persona_text)
+        workers = min(len(chunks), int(os.getenv('GRAPH_EXTRACTION_WORKERS') or EXTRACTION_WORKERS))
+        print(f"🤖 Calling Gemini API for entity extraction for user: {username} "
+              f"({len(chunks)} chunk{'s' if len(chunks) != 1 else ''}, {workers} parallel)")
+        
+        def extract(index: int) -> Optional[Dict]:
+            prompt = self._extraction_prompt(chunks[index], username, reddit_data, index + 1, len(chunks))
+            return self._extract_chunk(prompt, index + 1, len(chunks))
+        
+        if len(chunks) == 1:
+            results = [extract(0)]
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                results = list(executor.map(extract, range(len(chunks))))
+        
+        succeeded = [result for result in results if result]
+        if not succeeded:
+            print(f"❌ Entity extraction failed for every chunk")
+            return None
+        if len(succeeded) < len(chunks):
+            print(f"⚠️ Entity extraction succeeded for {len(succeeded)} of {len(chunks)} chunks; using partial results")
+        
+        graph_data = {
+            'entities': [entity for result in succeeded for entity in result.get('entities', [])],
+            'relationships': [rel for result in succeeded for rel in result.get('relationships', [])]
+        }
+        print(f"📊 Found {len(graph_data['entities'])} entities")
+        print(f"🔗 Found {len(graph_data['relationships'])} relationships")
+        return graph_data
+    
+    def _extraction_prompt(self, chunk: str, username: str, reddit_data: Dict, part: int = 1, total: int = 1) -> str:
+        """Entity extraction prompt for one persona chunk."""
+        part_note = ''
+        if total > 1:
+            part_note = (f" (part {part} of {total}; extract only what this part supports, "
+                         f"and always use \"user_{username}\" for the user)")
+        
+        return f"""
+You are an expert knowledge graph builder. Extract the inferred entities and relationships (interests, traits, skills, locations) from this Reddit user persona to create a knowledge graph. Subreddit activity, posts and comments are added from the scraped data, so do not extract them.
 
-PERSONA DATA:
-{persona_text}
+PERSONA DATA{part_note}:
+{chunk}
 
 REDDIT DATA:
 - Username: {username}
@@ -228,7 +588,6 @@ ENTITY TYPES:
 - User: The Reddit user themselves
 - Interest: Hobbies, topics, activities they care about
 - Personality_Trait: Character traits and behavioral patterns
-- Subreddit: Reddit communities they're active in
 - Technology: Programming languages, tools, frameworks
 - Location: Geographic locations mentioned
 - Skill: Professional or personal competencies
@@ -236,7 +595,6 @@ ENTITY TYPES:
 RELATIONSHIP TYPES:
 - HAS_INTEREST: User -> Interest
 - HAS_TRAIT: User -> Personality_Trait
-- ACTIVE_IN: User -> Subreddit
 - SKILLED_IN: User -> Technology/Skill
 - LIVES_IN: User -> Location
 - RELATED_TO: Interest -> Interest
@@ -280,111 +638,134 @@ Return ONLY valid JSON in this exact format:
 
 CRITICAL: Every entity must have a unique "id" field, and every relationship must reference valid entity IDs.
 """
+    
+    def _extract_chunk(self, prompt: str, part: int, total: int) -> Optional[Dict]:
+        """Run one extraction prompt, retrying failed calls and unparseable responses."""
+        for attempt in range(EXTRACTION_RETRIES + 1):
+            try:
+                with metrics.track_llm_call('graph_extraction') as call:
+                    # JSON mode: the response is bare JSON, no code fences to strip
+                    response = call['response'] = self.model.generate_content(
+                        prompt, generation_config={'response_mime_type': 'application/json'})
+                
+                graph_data = json.loads(response.text)
+                if not isinstance(graph_data, dict):
+                    raise ValueError(f"expected a JSON object, got {type(graph_data).__name__}")
+                graph_data = {
+                    'entities': [entity for entity in graph_data.get('entities') or [] if isinstance(entity, dict)],
+                    'relationships': [rel for rel in graph_data.get('relationships') or [] if isinstance(rel, dict)]
+                }
+                print(f"✅ Chunk {part}/{total}: {len(graph_data['entities'])} entities, "
+                      f"{len(graph_data['relationships'])} relationships")
+                return graph_data
+                
+            except Exception as e:
+                if attempt == EXTRACTION_RETRIES:
+                    print(f"❌ Chunk {part}/{total}: entity extraction failed after {attempt + 1} attempts: {e}")
+                    return None
+                delay = EXTRACTION_RETRY_DELAY * 2 ** attempt
+                print(f"⚠️ Chunk {part}/{total}: entity extraction failed ({e}); retrying in {delay:.0f}s")
+                time.sleep(delay)
+        return None
+    
+    def _graph_rows(self, graph_data: Dict, username: str) -> Dict:
+        """
+        Resolve entities and relationships into keyed rows, as they are stored in Neo4j.
         
-        try:
-            print(f"🤖 Calling Gemini API for entity extraction for user: {username}")
-            print(f"📝 Prompt length: {len(extraction_prompt)} characters")
-            
-            response = self.model.generate_content(extraction_prompt)
-            
-            print(f"✅ Gemini API response received")
-            print(f"📄 Response length: {len(response.text)} characters")
-            
-            # Clean and parse JSON response
-            json_text = response.text.strip()
-            print(f"🔍 Raw response preview: {json_text[:200]}...")
-            
-            if json_text.startswith('```json'):
-                json_text = json_text[7:-3]
-            elif json_text.startswith('```'):
-                json_text = json_text[3:-3]
-            
-            graph_data = json.loads(json_text)
-            
-            print(f"✅ Successfully parsed JSON response")
-            print(f"📊 Found {len(graph_data.get('entities', []))} entities")
-            print(f"🔗 Found {len(graph_data.get('relationships', []))} relationships")
-            
-            # Debug: Print first few entities and relationships
-            if graph_data.get('entities'):
-                print(f"🎯 Sample entity: {graph_data['entities'][0]}")
-            if graph_data.get('relationships'):
-                print(f"🔗 Sample relationship: {graph_data['relationships'][0]}")
-            
-            return graph_data
-            
-        except Exception as e:
-            print(f"❌ Error extracting entities: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+        Subreddit and Interest entities become shared nodes keyed by their
+        normalized ``key``; user-specific properties they carry (confidence,
+        description, ...) move onto the user's edge to them.
+        
+        Returns:
+            Dict with ``private`` ({(label, id): properties}), ``shared``
+            ({(label, key): properties}), ``edges`` ({(type, from_label, from_ref,
+            to_label, to_ref): properties}) and ``skipped`` (unusable relationships)
+        """
+        node_labels = {}
+        node_refs = {}  # entity id -> id (private nodes) or key (shared nodes)
+        private = {}
+        shared = {}
+        shared_details = {}
+        for entity in graph_data.get('entities', []):
+            if not _CYPHER_NAME.match(entity['type']):
+                print(f"⚠️ Skipping entity with invalid type: {entity['type']!r}")
+                continue
+            properties = _property_map(entity.get('properties', {}))
+            key = shared_node_key(entity)
+            if key:
+                shared_properties = {name: properties[name] for name in SHARED_NODE_PROPERTIES if name in properties}
+                shared_properties['id'] = f"{entity['type'].lower()}_{key}"
+                shared.setdefault((entity['type'], key), shared_properties)
+                shared_details[entity['id']] = {name: value for name, value in properties.items()
+                                                if name not in SHARED_NODE_PROPERTIES}
+                node_refs[entity['id']] = key
+            elif entity['type'] in SHARED_LABELS:
+                print(f"⚠️ Skipping {entity['type']} entity without a usable name: {entity['id']!r}")
+                continue
+            else:
+                properties['username'] = username  # Add username for filtering
+                properties['id'] = entity['id']  # Ensure id is set
+                private[(entity['type'], entity['id'])] = properties
+                node_refs[entity['id']] = entity['id']
+            node_labels[entity['id']] = entity['type']
+        
+        edges = {}
+        skipped = 0
+        for rel in graph_data.get('relationships', []):
+            from_label = node_labels.get(rel['from'])
+            to_label = node_labels.get(rel['to'])
+            if not from_label or not to_label or not _CYPHER_NAME.match(rel['type']):
+                skipped += 1
+                print(f"❌ Skipping relationship: {rel['from']} -> {rel['type']} -> {rel['to']}")
+                continue
+            properties = _property_map(rel.get('properties', {}))
+            if from_label == 'User':
+                for name, value in shared_details.get(rel['to'], {}).items():
+                    properties.setdefault(name, value)
+            edges.setdefault((rel['type'], from_label, node_refs[rel['from']], to_label, node_refs[rel['to']]), properties)
+        
+        return {'private': private, 'shared': shared, 'edges': edges, 'skipped': skipped}
     
-    def _create_neo4j_graph(self, graph_data: Dict, username: str):
-        """Create graph in Neo4j database."""
+    def _create_neo4j_graph(self, graph_data: Dict, username: str) -> bool:
+        """
+        Create graph in Neo4j database, bulk-loading nodes and relationships with UNWIND.
+        
+        Returns True once the graph is written (errors are printed, not raised).
+        
+        Subreddit and Interest nodes are shared by all users and MERGE'd on their
+        normalized ``key``; every other node belongs to ``username``. Every
+        relationship carries ``username``, so one user's edges into shared nodes
+        can be removed without touching anyone else's.
+        """
         try:
-            from neo4j import GraphDatabase
-            
-            driver = GraphDatabase.driver(self.neo4j_uri, auth=(self.neo4j_user, self.neo4j_password))
+            driver = self._get_driver()
+            entities = graph_data.get('entities', [])
+            relationships = graph_data.get('relationships', [])
             
             print(f"🗄️ Creating Neo4j graph for user: {username}")
-            print(f"📊 Processing {len(graph_data.get('entities', []))} entities and {len(graph_data.get('relationships', []))} relationships")
+            print(f"📊 Processing {len(entities)} entities and {len(relationships)} relationships")
+            
+            rows = self._graph_rows(graph_data, username)
+            node_total = len(rows['private']) + len(rows['shared'])
             
             with driver.session() as session:
+                version = (self._graph_version(session, username) or 0) + 1
+                
                 # Clear existing data for this user
                 print(f"🗑️ Clearing existing data for user: {username}")
-                session.run("MATCH (n) WHERE n.username = $username DETACH DELETE n", parameters={"username": username})
+                self._delete_user_graph(session, [username])
                 
                 # Create entities
-                print(f"🎯 Creating {len(graph_data.get('entities', []))} entities...")
-                entities_created = 0
-                for entity in graph_data.get('entities', []):
-                    entity_type = entity['type']
-                    properties = entity['properties'].copy()
-                    properties['username'] = username  # Add username for filtering
-                    properties['id'] = entity['id']  # Ensure id is set
-                    
-                    # Create entity node - using parameterized query to avoid SQL injection
-                    query = f"CREATE (n:{entity_type}) SET n = $properties"
-                    session.run(query, parameters={"properties": properties})
-                    entities_created += 1
-                
-                print(f"✅ Created {entities_created} entities")
+                print(f"🎯 Creating {node_total} entities...")
+                self._ensure_schema(session, rows['private'], rows['shared'])
+                self._create_nodes(session, rows['private'], rows['shared'])
+                print(f"✅ Created {node_total} entities")
                 
                 # Create relationships
-                print(f"🔗 Creating {len(graph_data.get('relationships', []))} relationships...")
-                relationships_created = 0
-                relationships_failed = 0
-                
-                for rel in graph_data.get('relationships', []):
-                    from_id = rel['from']
-                    to_id = rel['to']
-                    rel_type = rel['type']
-                    rel_props = rel.get('properties', {})
-                    
-                    # Create relationship - using parameterized query
-                    query = f"""
-                    MATCH (a {{id: $from_id, username: $username}})
-                    MATCH (b {{id: $to_id, username: $username}})
-                    CREATE (a)-[r:{rel_type}]->(b)
-                    SET r = $rel_props
-                    RETURN a, r, b
-                    """
-                    
-                    result = session.run(query, parameters={
-                        "from_id": from_id, 
-                        "to_id": to_id, 
-                        "username": username, 
-                        "rel_props": rel_props
-                    })
-                    
-                    # Check if relationship was created
-                    if result.single():
-                        relationships_created += 1
-                        print(f"✅ Created relationship: {from_id} -> {rel_type} -> {to_id}")
-                    else:
-                        relationships_failed += 1
-                        print(f"❌ Failed to create relationship: {from_id} -> {rel_type} -> {to_id}")
-                        print(f"   (Check if entities with IDs {from_id} and {to_id} exist)")
+                print(f"🔗 Creating {len(rows['edges'])} relationships...")
+                relationships_created = self._create_edges(session, rows['edges'], username)
+                relationships_failed = rows['skipped'] + len(rows['edges']) - relationships_created
+                self._set_graph_version(session, username, version)
                 
                 print(f"✅ Created {relationships_created} relationships")
                 if relationships_failed > 0:
@@ -392,24 +773,375 @@ CRITICAL: Every entity must have a unique "id" field, and every relationship mus
                 
                 # Verify the graph was created
                 verify_query = "MATCH (n) WHERE n.username = $username RETURN count(n) as node_count"
-                result = session.run(verify_query, parameters={"username": username})
+                result = self._run_query(session, 'count_nodes', verify_query, parameters={"username": username})
                 record = result.single()
                 node_count = record['node_count'] if record else 0
-                print(f"🔍 Graph verification: {node_count} nodes created for user {username}")
+                print(f"🔍 Graph verification: {node_count} private nodes created for user {username}")
                 
                 # Count relationships
-                rel_query = "MATCH (a)-[r]->(b) WHERE a.username = $username AND b.username = $username RETURN count(r) as rel_count"
-                result = session.run(rel_query, parameters={"username": username})
+                rel_query = "MATCH ()-[r]->() WHERE r.username = $username RETURN count(r) as rel_count"
+                result = self._run_query(session, 'count_relationships', rel_query, parameters={"username": username})
                 record = result.single()
                 rel_count = record['rel_count'] if record else 0
                 print(f"🔍 Graph verification: {rel_count} relationships created for user {username}")
-            
-            driver.close()
+            return True
             
         except Exception as e:
             print(f"❌ Error creating Neo4j graph: {e}")
             import traceback
             traceback.print_exc()
+            return False
+    
+    def _update_neo4j_graph(self, graph_data: Dict, username: str) -> Optional[Dict]:
+        """
+        Apply only the differences between the stored graph and ``graph_data``.
+        
+        Nodes are diffed by (label, id) and relationships by (type, endpoints);
+        inserts, property updates and deletes run in one transaction, which
+        also bumps the graph version on the User node.
+        
+        Returns:
+            Counts (``nodes_added``, ``nodes_updated``, ``nodes_deleted``,
+            ``relationships_added``, ``relationships_updated``,
+            ``relationships_deleted``) and the resulting ``version``, or None
+            when the user has no stored graph yet
+        """
+        driver = self._get_driver()
+        rows = self._graph_rows(graph_data, username)
+        
+        with driver.session() as session:
+            version = self._graph_version(session, username)
+            if version is None:
+                return None
+            
+            stored = self._stored_graph_rows(session, username)
+            node_inserts, node_updates, node_deletes = _diff_rows(stored['private'], rows['private'])
+            edge_inserts, edge_updates, edge_deletes = _diff_rows(stored['edges'], rows['edges'])
+            
+            # Shared nodes only need MERGE-ing when none of the user's stored edges reaches them
+            reached = {(edge[1], edge[2]) for edge in stored['edges']} | {(edge[3], edge[4]) for edge in stored['edges']}
+            shared_inserts = {key: properties for key, properties in rows['shared'].items() if key not in reached}
+            
+            summary = {
+                'nodes_added': len(node_inserts),
+                'nodes_updated': len(node_updates),
+                'nodes_deleted': len(node_deletes),
+                'relationships_added': len(edge_inserts),
+                'relationships_updated': len(edge_updates),
+                'relationships_deleted': len(edge_deletes),
+                'version': version
+            }
+            if not any(value for key, value in summary.items() if key != 'version'):
+                print(f"✅ Graph for {username} is up to date (version {version})")
+                return summary
+            
+            self._ensure_schema(session, node_inserts, shared_inserts)
+            with session.begin_transaction() as tx:
+                self._delete_edges(tx, edge_deletes, username)
+                for label, ids in _rows_by_label(dict.fromkeys(node_deletes)).items():
+                    for batch in _batches(ids):
+                        self._run_query(tx, 'delete_nodes', f"""
+                            UNWIND $ids AS id
+                            MATCH (n:{label} {{username: $username, id: id}})
+                            DETACH DELETE n
+                            """, parameters={"ids": batch, "username": username})
+                
+                self._create_nodes(tx, node_inserts, shared_inserts)
+                for label, label_rows in _rows_by_label(node_updates).items():
+                    for batch in _batches(label_rows):
+                        self._run_query(tx, 'update_nodes', f"""
+                            UNWIND $rows AS row
+                            MATCH (n:{label} {{username: $username, id: row.id}})
+                            SET n = row
+                            """, parameters={"rows": batch, "username": username})
+                
+                for (rel_type, from_label, to_label), edge_rows in _edge_rows_by_type(edge_updates).items():
+                    for batch in _batches(edge_rows):
+                        self._run_query(tx, 'update_relationships', f"""
+                            UNWIND $rows AS row
+                            MATCH (a:{from_label} {self._node_match(from_label, 'row.from')})
+                                  -[r:{rel_type} {{username: $username}}]->
+                                  (b:{to_label} {self._node_match(to_label, 'row.to')})
+                            SET r = row.properties, r.username = $username
+                            """, parameters={"rows": batch, "username": username})
+                added = self._create_edges(tx, edge_inserts, username)
+                if added < len(edge_inserts):
+                    print(f"⚠️ Failed to create {len(edge_inserts) - added} relationships")
+                
+                # Shared nodes that lost their last edge go away, as in a full cleanup
+                self._delete_orphaned_shared(tx, {(edge[1], edge[2]) for edge in edge_deletes} |
+                                                 {(edge[3], edge[4]) for edge in edge_deletes})
+                self._set_graph_version(tx, username, version + 1)
+                tx.commit()
+        
+        summary['version'] = version + 1
+        print(f"🧮 Updated graph for {username} to version {summary['version']}: "
+              f"+{summary['nodes_added']}/~{summary['nodes_updated']}/-{summary['nodes_deleted']} nodes, "
+              f"+{summary['relationships_added']}/~{summary['relationships_updated']}/-{summary['relationships_deleted']} relationships")
+        return summary
+    
+    def _ensure_schema(self, session, private: Dict, shared: Dict):
+        """Create the lookup indexes and uniqueness constraints for the labels about to be written."""
+        for label in {label for label, _ in private}:
+            self._run_query(session, 'create_index',
+                            f"CREATE INDEX IF NOT EXISTS FOR (n:{label}) ON (n.username, n.id)")
+        for label in {label for label, _ in shared}:
+            self._run_query(session, 'create_constraint',
+                            f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:{label}) REQUIRE n.key IS UNIQUE")
+    
+    def _create_nodes(self, session, private: Dict, shared: Dict):
+        """CREATE the user's private nodes and MERGE shared ones, one UNWIND per label and batch."""
+        for label, rows in _rows_by_label(private).items():
+            for batch in _batches(rows):
+                self._run_query(session, 'create_nodes', f"UNWIND $rows AS row CREATE (n:{label}) SET n = row",
+                                parameters={"rows": batch})
+        for label, keys in _rows_by_label(dict.fromkeys(shared)).items():
+            batch_rows = [{'key': key, 'properties': shared[(label, key)]} for key in keys]
+            for batch in _batches(batch_rows):
+                self._run_query(session, 'merge_nodes',
+                                f"UNWIND $rows AS row MERGE (n:{label} {{key: row.key}}) ON CREATE SET n += row.properties",
+                                parameters={"rows": batch})
+    
+    def _create_edges(self, session, edges: Dict, username: str) -> int:
+        """CREATE the user's relationships; returns how many were created."""
+        created = 0
+        for (rel_type, from_label, to_label), rows in _edge_rows_by_type(edges).items():
+            query = f"""
+            UNWIND $rows AS row
+            MATCH (a:{from_label} {self._node_match(from_label, 'row.from')})
+            MATCH (b:{to_label} {self._node_match(to_label, 'row.to')})
+            CREATE (a)-[r:{rel_type}]->(b)
+            SET r = row.properties, r.username = $username
+            RETURN count(r) AS created
+            """
+            for batch in _batches(rows):
+                result = self._run_query(session, 'create_relationships', query,
+                                         parameters={"rows": batch, "username": username})
+                record = result.single()
+                created += record['created'] if record else 0
+        return created
+    
+    def _delete_edges(self, session, edge_keys: List[Tuple], username: str):
+        """Delete the user's relationships identified by (type, from_label, from_ref, to_label, to_ref)."""
+        for (rel_type, from_label, to_label), rows in _edge_rows_by_type(dict.fromkeys(edge_keys)).items():
+            for batch in _batches(rows):
+                self._run_query(session, 'delete_relationships', f"""
+                    UNWIND $rows AS row
+                    MATCH (a:{from_label} {self._node_match(from_label, 'row.from')})
+                          -[r:{rel_type} {{username: $username}}]->
+                          (b:{to_label} {self._node_match(to_label, 'row.to')})
+                    DELETE r
+                    """, parameters={"rows": batch, "username": username})
+    
+    def _delete_orphaned_shared(self, session, endpoints) -> int:
+        """Delete the shared nodes among ``(label, key)`` endpoints that no longer have any relationship."""
+        shared = {endpoint: None for endpoint in endpoints if endpoint[0] in SHARED_LABELS}
+        deleted = 0
+        for label, keys in _rows_by_label(shared).items():
+            for batch in _batches(keys):
+                result = self._run_query(session, 'delete_orphaned_nodes', f"""
+                    UNWIND $keys AS key
+                    MATCH (g:{label} {{key: key}})
+                    WHERE NOT (g)--()
+                    DELETE g
+                    RETURN count(g) AS deleted
+                    """, parameters={"keys": batch})
+                record = result.single()
+                deleted += record['deleted'] if record else 0
+        return deleted
+    
+    def _graph_version(self, session, username: str) -> Optional[int]:
+        """Version of the user's stored graph: None without a User node, 0 if it predates versioning."""
+        result = self._run_query(session, 'graph_version',
+                                 "MATCH (u:User {username: $username}) RETURN u.graph_version AS version LIMIT 1",
+                                 parameters={"username": username})
+        record = result.single()
+        if record is None:
+            return None
+        return record['version'] or 0
+    
+    def _set_graph_version(self, session, username: str, version: int):
+        """Record the graph version on the user's User node."""
+        self._run_query(session, 'set_graph_version',
+                        "MATCH (u:User {username: $username}) SET u.graph_version = $version",
+                        parameters={"username": username, "version": version})
+    
+    def _stored_graph_rows(self, session, username: str) -> Dict:
+        """Read the user's stored private nodes and relationships in the keyed form of ``_graph_rows``."""
+        private = {}
+        result = self._run_query(session, 'stored_nodes',
+                                 "MATCH (n {username: $username}) RETURN labels(n)[0] AS label, properties(n) AS properties",
+                                 parameters={"username": username})
+        for record in result:
+            properties = {key: value for key, value in record['properties'].items() if key not in GRAPH_META_PROPERTIES}
+            private[(record['label'], properties.get('id'))] = properties
+        
+        # Edges leave a private node, enter one from a shared node, or join two shared nodes
+        returns = """
+            RETURN type(r) AS type, labels(a)[0] AS from_label, coalesce(a.key, a.id) AS from_ref,
+                   labels(b)[0] AS to_label, coalesce(b.key, b.id) AS to_ref, properties(r) AS properties
+        """
+        query = f"""
+            MATCH (a {{username: $username}})-[r]->(b) {returns}
+            UNION ALL
+            MATCH (a)-[r]->(b {{username: $username}}) WHERE {_shared_label_predicate('a')} {returns}
+            UNION ALL
+            MATCH (a)-[r {{username: $username}}]->(b)
+            WHERE {_shared_label_predicate('a')} AND {_shared_label_predicate('b')} {returns}
+        """
+        edges = {}
+        for record in self._run_query(session, 'stored_relationships', query, parameters={"username": username}):
+            properties = {key: value for key, value in record['properties'].items() if key != 'username'}
+            edges.setdefault((record['type'], record['from_label'], record['from_ref'],
+                              record['to_label'], record['to_ref']), properties)
+        return {'private': private, 'edges': edges}
+    
+    @staticmethod
+    def _node_match(label: str, ref: str) -> str:
+        """Cypher property map locating a node: shared nodes by ``key``, private ones by owner and ``id``."""
+        if label in SHARED_LABELS:
+            return f"{{key: {ref}}}"
+        return f"{{username: $username, id: {ref}}}"
+    
+    def _delete_user_graph(self, session, usernames: List[str], batch_size: int = GRAPH_DELETE_BATCH_SIZE,
+                           progress_callback=None) -> Dict[str, int]:
+        """
+        Remove users' private nodes and all of their edges in bounded transactions.
+        
+        Each statement deletes at most ``batch_size`` relationships or nodes and
+        commits on its own, so a huge graph never has to fit in one
+        transaction's memory and locks are released between batches. Every
+        relationship of a private node (including hub edges such as the
+        User's AUTHORED edges) is drained before the node itself is deleted.
+        Shared Subreddit and Interest nodes are kept while other users still
+        link to them and deleted once nothing references them.
+        
+        Returns:
+            Counts of deleted ``relationships``, ``nodes`` and ``shared_nodes``
+        """
+        report = progress_callback or (lambda message: print(f"   {message}"))
+        parameters = {"usernames": list(usernames), "limit": batch_size}
+        totals = {'relationships': 0, 'nodes': 0, 'shared_nodes': 0}
+        touched = set()
+        
+        def drain(query_type: str, query: str, kind: str, label: str):
+            while True:
+                result = self._run_query(session, query_type, query, parameters=parameters)
+                record = result.single()
+                deleted = record['deleted'] if record else 0
+                touched.update(tuple(endpoint) for endpoint in (record['touched'] if record else []))
+                totals[kind] += deleted
+                if deleted:
+                    report(f"🗑️ Deleted {deleted} {label} ({totals[kind]} {kind} so far)")
+                if deleted < batch_size:
+                    return
+        
+        touched_return = "RETURN count(r) AS deleted, collect(DISTINCT [labels(g)[0], g.key]) AS touched"
+        drain('delete_shared_edges', f"""
+            MATCH (a)-[r]->(g)
+            WHERE r.username IN $usernames AND {_shared_label_predicate('a')} AND {_shared_label_predicate('g')}
+            WITH r, g LIMIT $limit
+            DELETE r
+            {touched_return}
+            """, 'relationships', 'relationships between shared nodes')
+        
+        # Private nodes are found through their (username, id) index, one label at a time
+        labels = [record['label'] for record in self._run_query(session, 'list_labels', "CALL db.labels() YIELD label RETURN label")]
+        private_labels = [label for label in labels if label not in SHARED_LABELS and _CYPHER_NAME.match(label)]
+        for label in private_labels:
+            drain('delete_shared_links', f"""
+                MATCH (n:{label})-[r]-(g)
+                WHERE n.username IN $usernames AND n.id IS NOT NULL AND {_shared_label_predicate('g')}
+                WITH r, g LIMIT $limit
+                DELETE r
+                {touched_return}
+                """, 'relationships', f'{label} relationships to shared nodes')
+            # Edges between two private nodes match from both ends, hence DISTINCT
+            drain('delete_private_edges', f"""
+                MATCH (n:{label})-[r]-()
+                WHERE n.username IN $usernames AND n.id IS NOT NULL
+                WITH DISTINCT r LIMIT $limit
+                DELETE r
+                RETURN count(r) AS deleted, [] AS touched
+                """, 'relationships', f'{label} relationships')
+        
+        # Nodes have no relationships left, so a plain DELETE keeps each batch bounded
+        for label in private_labels:
+            drain('delete_user_nodes', f"""
+                MATCH (n:{label})
+                WHERE n.username IN $usernames AND n.id IS NOT NULL
+                WITH n LIMIT $limit
+                DELETE n
+                RETURN count(n) AS deleted, [] AS touched
+                """, 'nodes', f'{label} nodes')
+        
+        totals['shared_nodes'] = self._delete_orphaned_shared(session, touched)
+        if totals['shared_nodes']:
+            report(f"🗑️ Deleted {totals['shared_nodes']} shared nodes no longer linked to any user")
+        return totals
+    
+    def delete_user_graphs(self, usernames: List[str], batch_size: int = GRAPH_DELETE_BATCH_SIZE,
+                           progress_callback=None) -> Dict[str, int]:
+        """
+        Purge the knowledge graphs of one or many users in bounded batches.
+        
+        Args:
+            usernames: Users whose graphs to delete
+            batch_size: Maximum relationships or nodes deleted per transaction
+            progress_callback: Optional callback function for progress updates
+            
+        Returns:
+            Counts of deleted ``relationships``, ``nodes`` and ``shared_nodes``
+        """
+        driver = self._get_driver()
+        with driver.session() as session:
+            totals = self._delete_user_graph(session, usernames, batch_size, progress_callback)
+        
+        for username in usernames:
+            self.user_graphs.pop(username, None)
+        return totals
+    
+    def find_users_in_subreddit(self, subreddit: str, limit: int = 20) -> List[Dict]:
+        """
+        Users with a graph who are active in a subreddit, most active first.
+        
+        Returns:
+            Dicts with ``username``, ``items`` and ``weight`` (share of that user's activity)
+        """
+        try:
+            driver = self._get_driver()
+            with driver.session() as session:
+                result = self._run_query(session, 'users_in_subreddit', """
+                    MATCH (:Subreddit {key: $key})<-[r:ACTIVE_IN]-(:User)
+                    RETURN r.username AS username, r.items AS items, r.weight AS weight
+                    ORDER BY items DESC LIMIT $limit
+                    """, parameters={"key": normalize_key(subreddit), "limit": limit})
+                return [record.data() for record in result]
+        except Exception as e:
+            print(f"Error finding users in subreddit: {e}")
+            return []
+    
+    def find_similar_users(self, username: str, limit: int = 10) -> List[Dict]:
+        """
+        Other users sharing subreddits or interests with ``username``.
+        
+        Returns:
+            Dicts with ``username``, ``shared`` (count) and ``examples`` (up to five shared names)
+        """
+        try:
+            driver = self._get_driver()
+            with driver.session() as session:
+                result = self._run_query(session, 'similar_users', """
+                    MATCH (:User {username: $username})-[:ACTIVE_IN|HAS_INTEREST]->(g)<-[r:ACTIVE_IN|HAS_INTEREST]-(:User)
+                    WHERE r.username <> $username
+                    WITH r.username AS username, collect(DISTINCT g.name) AS names
+                    RETURN username, size(names) AS shared, names[..5] AS examples
+                    ORDER BY shared DESC LIMIT $limit
+                    """, parameters={"username": username, "limit": limit})
+                return [record.data() for record in result]
+        except Exception as e:
+            print(f"Error finding similar users: {e}")
+            return []
     
     def query_graph(self, question: str, username: str) -> str:
         """Query the knowledge graph to answer questions."""
@@ -420,35 +1152,48 @@ CRITICAL: Every entity must have a unique "id" field, and every relationship mus
             print(f"🔍 Querying graph for user: {username}")
             print(f"❓ Question: {question}")
             
-            # Get relevant graph data
+            # Get relevant graph data and the user's own posts and comments that match the question
             graph_context = self._get_graph_context(question, username)
+            passages = self._get_passages(question, username)
+            graph_context, passages = _fuse_context(graph_context, passages,
+                                                    self.qa_context_tokens * QA_CHARS_PER_TOKEN)
+            
+            print(f"📊 Retrieved graph context ({len(graph_context)} characters) and {len(passages)} passages")
             
-            print(f"📊 Retrieved graph context ({len(graph_context)} characters)")
+            passage_context = "\n\n".join(
+                f"[{i}] {passage['type']} in r/{passage['subreddit']} ({passage['url']})\n{passage['text']}"
+                for i, passage in enumerate(passages, 1)
+            ) or "No matching posts or comments."
             
             # Generate answer using LLM with graph context
             answer_prompt = f"""
-You are a helpful assistant that can answer questions about a Reddit user's persona based on their knowledge graph.
+You are a helpful assistant that can answer questions about a Reddit user's persona based on their knowledge graph and their own posts and comments.
 
 KNOWLEDGE GRAPH CONTEXT:
 {graph_context}
 
+USER'S POSTS AND COMMENTS:
+{passage_context}
+
 USER QUESTION: {question}
 
 Instructions:
-1. Use the knowledge graph data to provide accurate, specific answers
+1. Use the knowledge graph data and the posts and comments to provide accurate, specific answers
 2. Reference specific entities and relationships when relevant
-3. If the information isn't in the graph, say so clearly
-4. Provide insights based on the user's interests, traits, and activity patterns
-5. Be conversational and helpful
+3. Cite the posts and comments you rely on by their number, e.g. [2]
+4. If the information isn't in the graph or the posts and comments, say so clearly
+5. Provide insights based on the user's interests, traits, and activity patterns
+6. Be conversational and helpful
 
-Answer the question based on the knowledge graph:
+Answer the question based on the knowledge graph and the posts and comments:
 """
             
             print(f"🤖 Calling Gemini API for Q&A...")
-            response = self.model.generate_content(answer_prompt)
+            with metrics.track_llm_call('graph_qa') as call:
+                response = call['response'] = self.model.generate_content(answer_prompt)
             print(f"✅ Received Q&A response ({len(response.text)} characters)")
             
-            return response.text
+            return self._with_sources(response.text, passages)
             
         except Exception as e:
             print(f"❌ Error querying graph: {str(e)}")
@@ -456,21 +1201,46 @@ Answer the question based on the knowledge graph:
             traceback.print_exc()
             return f"Error querying graph: {str(e)}"
     
+    def _get_passages(self, question: str, username: str) -> List[Dict]:
+        """Top BM25 passages from the user's scraped items (empty when they have no raw data)."""
+        try:
+            from .passage_index import ensure_passage_index
+            
+            index = ensure_passage_index(username, self.passage_dir)
+            return index.search(question, QA_PASSAGES) if index is not None else []
+        except Exception as e:
+            print(f"⚠️ Passage retrieval failed: {e}")
+            return []
+    
+    def _with_sources(self, answer: str, passages: List[Dict]) -> str:
+        """Append the URLs of the passages the answer cites as ``[n]``."""
+        cited = sorted({int(n) for n in _CITATION.findall(answer) if 0 < int(n) <= len(passages)})
+        if not cited:
+            return answer
+        sources = "\n".join(f"[{n}] {passages[n - 1]['url']}" for n in cited)
+        return f"{answer.rstrip()}\n\n**Sources:**\n{sources}"
+    
     def _get_graph_context(self, question: str, username: str) -> str:
         """Get relevant graph context for the question."""
         try:
-            from neo4j import GraphDatabase
-            
-            driver = GraphDatabase.driver(self.neo4j_uri, auth=(self.neo4j_user, self.neo4j_password))
+            driver = self._get_driver()
             
             with driver.session() as session:
-                # Get all entities and relationships for the user
+                # Get the user's entities and relationships (individual posts and comments
+                # would crowd out the persona, so only their subreddit totals are included);
+                # shared Subreddit/Interest nodes are reached through the user's own edges
                 query = """
                 MATCH (n {username: $username})
-                OPTIONAL MATCH (n)-[r]->(m {username: $username})
+                WHERE NOT n:Post AND NOT n:Comment
+                OPTIONAL MATCH (n)-[r {username: $username}]->(m)
+                WHERE NOT m:Post AND NOT m:Comment
+                RETURN n, r, m
+                UNION ALL
+                MATCH (n)-[r {username: $username}]->(m)
+                WHERE (n:Subreddit OR n:Interest) AND (m:Subreddit OR m:Interest)
                 RETURN n, r, m
                 """
-                result = session.run(query, parameters={"username": username})
+                result = self._run_query(session, 'graph_context', query, parameters={"username": username})
                 
                 context_parts = []
                 for record in result:
@@ -487,7 +1257,6 @@ Answer the question based on the knowledge graph:
                         rel_info = f"Relationship: {node.get('name', node.get('id', 'Unknown'))} -> {rel.type} -> {target.get('name', target.get('id', 'Unknown'))}"
                         context_parts.append(rel_info)
                 
-                driver.close()
                 return "\n".join(context_parts[:50])  # Limit context size
                 
         except Exception as e:
@@ -515,18 +1284,8 @@ Answer the question based on the knowledge graph:
     def cleanup_graph(self, username: str):
         """Clean up graph data for a specific user."""
         try:
-            from neo4j import GraphDatabase
-            
-            driver = GraphDatabase.driver(self.neo4j_uri, auth=(self.neo4j_user, self.neo4j_password))
-            
-            with driver.session() as session:
-                session.run("MATCH (n) WHERE n.username = $username DETACH DELETE n", parameters={"username": username})
-            
-            driver.close()
-            
-            # Remove from user graphs tracking
-            if username in self.user_graphs:
-                del self.user_graphs[username]
+            # Deleted in bounded batches; also drops the user from user graphs tracking
+            self.delete_user_graphs([username])
             
         except Exception as e:
             print(f"Error cleaning up graph: {e}")
@@ -0,0 +1,170 @@
+"""
+Interest Classifier
+Scores a user's interests across their whole history without an LLM, using a
+configurable taxonomy of keywords and subreddit priors. All keywords are
+compiled into one word-boundary regex so each text is scanned once.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'interest_taxonomy.json')
+
+# Score added per item posted in one of a category's subreddits
+SUBREDDIT_PRIOR_WEIGHT = 1.0
+
+# Interests scoring below this are treated as noise
+MIN_INTEREST_SCORE = 3.0
+
+
+def taxonomy_path() -> str:
+    """Taxonomy file to use: ``INTEREST_TAXONOMY`` if set, else the bundled one."""
+    return os.getenv('INTEREST_TAXONOMY') or DEFAULT_TAXONOMY_PATH
+
+
+def load_taxonomy(path: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Load and validate a taxonomy file.
+
+    The file maps category ids to ``{"label": ..., "keywords": [...], "subreddits": [...]}``.
+    Keywords may be phrases; matching is case-insensitive, on word boundaries,
+    and accepts simple plurals.
+
+    Raises:
+        ValueError: If a category is missing its label or has no keywords and no subreddits
+    """
+    with open(path or taxonomy_path(), 'r', encoding='utf-8') as f:
+        taxonomy = json.load(f)
+
+    for category, spec in taxonomy.items():
+        if not spec.get('label') or not (spec.get('keywords') or spec.get('subreddits')):
+            raise ValueError(f"Taxonomy category '{category}' needs a label and keywords or subreddits")
+    return taxonomy
+
+
+def _normalize_keyword(keyword: str) -> str:
+    return ' '.join(keyword.lower().split())
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex alternation for ``words`` with shared prefixes factored out.
+
+    A flat ``a|b|c`` alternation retries every keyword at every position; the
+    trie form only follows branches whose prefix actually matches.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node: Dict) -> str:
+        ends_here = '' in node
+        branches = []
+        # Greedy: longer continuations are tried before stopping here
+        for char in sorted(key for key in node if key):
+            token = r'\s+' if char == ' ' else re.escape(char)
+            branches.append(token + render(node[char]))
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if ends_here else body
+
+    return render(trie)
+
+
+class InterestClassifier:
+    """Keyword and subreddit-prior interest scorer for one taxonomy."""
+
+    def __init__(self, taxonomy: Dict[str, Dict]):
+        """Compile the matcher for ``taxonomy`` (see ``load_taxonomy``)."""
+        self.taxonomy = taxonomy
+        self._keyword_category: Dict[str, str] = {}
+        self._subreddit_category: Dict[str, str] = {}
+        for category, spec in taxonomy.items():
+            for keyword in spec.get('keywords', []):
+                if keyword.strip():
+                    self._keyword_category.setdefault(_normalize_keyword(keyword), category)
+            for subreddit in spec.get('subreddits', []):
+                self._subreddit_category.setdefault(subreddit.lower(), category)
+
+        self._pattern = None
+        if self._keyword_category:
+            self._pattern = re.compile(r'\b(' + _trie_pattern(self._keyword_category) + r")(?:e?s|'s)?\b")
+
+    def keyword_counts(self, texts: Iterable[str]) -> Counter:
+        """Count keyword matches (normalized, without plural suffix) across ``texts``."""
+        counts: Counter = Counter()
+        if self._pattern is None:
+            return counts
+        for text in texts:
+            if text:
+                counts.update(self._pattern.findall(text.lower()))
+        return counts
+
+    def score(self, texts: Iterable[str], subreddit_counts: Iterable[Tuple[str, int]]) -> List[Dict]:
+        """
+        Score every taxonomy category.
+
+        Args:
+            texts: Item texts to scan
+            subreddit_counts: ``(subreddit, item_count)`` pairs for the user
+
+        Returns:
+            Categories with any evidence, highest score first. Each has
+            ``category``, ``label``, ``score``, ``keyword_hits``, ``top_keywords``,
+            ``subreddit_items`` and ``subreddits``.
+        """
+        results: Dict[str, Dict] = {}
+
+        def entry(category: str) -> Dict:
+            if category not in results:
+                results[category] = {'category': category, 'label': self.taxonomy[category]['label'],
+                                     'score': 0.0, 'keyword_hits': 0, 'top_keywords': Counter(),
+                                     'subreddit_items': 0, 'subreddits': []}
+            return results[category]
+
+        for match, count in self.keyword_counts(texts).items():
+            keyword = _normalize_keyword(match)
+            category = self._keyword_category.get(keyword)
+            if category:
+                result = entry(category)
+                result['keyword_hits'] += count
+                result['top_keywords'][keyword] += count
+
+        for subreddit, count in subreddit_counts:
+            category = self._subreddit_category.get(subreddit.lower())
+            if category and count:
+                result = entry(category)
+                result['subreddit_items'] += int(count)
+                result['subreddits'].append(subreddit)
+
+        ranked = []
+        for result in results.values():
+            result['score'] = result['keyword_hits'] + SUBREDDIT_PRIOR_WEIGHT * result['subreddit_items']
+            result['top_keywords'] = [keyword for keyword, _ in result['top_keywords'].most_common(5)]
+            ranked.append(result)
+        ranked.sort(key=lambda result: (-result['score'], result['category']))
+        return ranked
+
+    def classify_store(self, store, min_score: float = MIN_INTEREST_SCORE) -> List[Dict]:
+        """Score the whole history in an ``ItemStore``, keeping interests with at least ``min_score``."""
+        names, counts = store.subreddit_counts()
+        ranked = self.score(store.iter_texts(), zip(names, counts.tolist()))
+        return [result for result in ranked if result['score'] >= min_score]
+
+
+@lru_cache(maxsize=8)
+def _cached_classifier(path: str, mtime: float) -> InterestClassifier:
+    return InterestClassifier(load_taxonomy(path))
+
+
+def get_classifier(path: Optional[str] = None) -> InterestClassifier:
+    """Return a compiled classifier for the taxonomy file, reusing it until the file changes."""
+    path = path or taxonomy_path()
+    return _cached_classifier(path, os.path.getmtime(path))
@@ -0,0 +1,248 @@
+"""
+Columnar Item Store
+Compact, column-oriented representation of scraped Reddit items.
+"""
+
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+# String fields kept in the shared text buffer, in slot order
+STRING_FIELDS = ('id', 'url', 'title', 'text')
+_SLOTS = len(STRING_FIELDS)
+_ID, _URL, _TITLE, _TEXT = range(_SLOTS)
+
+KIND_NAMES = ('submission', 'comment')
+SUBMISSION = 0
+COMMENT = 1
+
+
+class ItemStore:
+    """Columnar store for Reddit submissions and comments.
+
+    Numeric fields live in NumPy arrays, subreddit names are interned into
+    integer codes and every string field shares one text buffer addressed
+    by offsets. Submissions keep their ``title``/``selftext`` in the
+    title/text slots; comments keep ``submission_title``/``body``.
+    """
+
+    def __init__(self, kinds: np.ndarray, scores: np.ndarray, created_utc: np.ndarray,
+                 num_comments: np.ndarray, subreddit_codes: np.ndarray, subreddits: List[str],
+                 buffer: str, offsets: np.ndarray, meta: Optional[Dict] = None):
+        """Initialize the store from prepared columns (see ``from_reddit_data``)."""
+        self.kinds = kinds
+        self.scores = scores
+        self.created_utc = created_utc
+        self.num_comments = num_comments
+        self.subreddit_codes = subreddit_codes
+        self.subreddits = subreddits
+        self._buffer = buffer
+        self._offsets = offsets
+        self.meta = meta or {}
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_items(cls, items: Iterable[Dict], meta: Optional[Dict] = None) -> 'ItemStore':
+        """Build a store from an iterable of item dicts in the scraper format."""
+        kinds = []
+        scores = []
+        created = []
+        num_comments = []
+        codes = []
+        vocab: Dict[str, int] = {}
+        subreddits: List[str] = []
+        pieces: List[str] = []
+        lengths: List[int] = []
+
+        for item in items:
+            is_comment = item.get('type') == 'comment'
+            kinds.append(COMMENT if is_comment else SUBMISSION)
+            scores.append(item.get('score') or 0)
+            created.append(item.get('created_utc') or 0)
+            num_comments.append(-1 if is_comment else (item.get('num_comments') or 0))
+
+            # Items without a subreddit keep '' (its own code) rather than a made-up name
+            subreddit = item.get('subreddit') or ''
+            code = vocab.get(subreddit)
+            if code is None:
+                code = len(subreddits)
+                vocab[subreddit] = code
+                subreddits.append(sys.intern(subreddit))
+            codes.append(code)
+
+            if is_comment:
+                strings = (item.get('id', ''), item.get('url', ''),
+                           item.get('submission_title', ''), item.get('body', ''))
+            else:
+                strings = (item.get('id', ''), item.get('url', ''),
+                           item.get('title', ''), item.get('selftext', ''))
+            for value in strings:
+                value = value or ''
+                pieces.append(value)
+                lengths.append(len(value))
+
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        if lengths:
+            np.cumsum(lengths, out=offsets[1:])
+
+        return cls(
+            kinds=np.asarray(kinds, dtype=np.uint8),
+            scores=np.asarray(scores, dtype=np.int64),
+            created_utc=np.asarray(created, dtype=np.float64),
+            num_comments=np.asarray(num_comments, dtype=np.int32),
+            subreddit_codes=np.asarray(codes, dtype=np.int32),
+            subreddits=subreddits,
+            buffer=''.join(pieces),
+            offsets=offsets,
+            meta=meta,
+        )
+
+    @classmethod
+    def from_reddit_data(cls, reddit_data: Dict) -> 'ItemStore':
+        """Build a store from the dict returned by ``RedditScraper.get_user_data``."""
+        meta = {key: value for key, value in reddit_data.items()
+                if key not in ('submissions', 'comments')}
+        items = _chain(reddit_data.get('submissions', []), reddit_data.get('comments', []))
+        return cls.from_items(items, meta=meta)
+
+    # ------------------------------------------------------------------
+    # Conversion back to the dict format
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def _string(self, index: int, slot: int) -> str:
+        position = index * _SLOTS + slot
+        return self._buffer[self._offsets[position]:self._offsets[position + 1]]
+
+    def item(self, index: int) -> Dict:
+        """Return item ``index`` as a dict in the scraper format."""
+        subreddit = self.subreddits[self.subreddit_codes[index]]
+        if self.kinds[index] == COMMENT:
+            return {
+                'type': 'comment',
+                'id': self._string(index, _ID),
+                'body': self._string(index, _TEXT),
+                'url': self._string(index, _URL),
+                'subreddit': subreddit,
+                'score': int(self.scores[index]),
+                'created_utc': float(self.created_utc[index]),
+                'submission_title': self._string(index, _TITLE)
+            }
+        return {
+            'type': 'submission',
+            'id': self._string(index, _ID),
+            'title': self._string(index, _TITLE),
+            'selftext': self._string(index, _TEXT),
+            'url': self._string(index, _URL),
+            'subreddit': subreddit,
+            'score': int(self.scores[index]),
+            'created_utc': float(self.created_utc[index]),
+            'num_comments': int(self.num_comments[index])
+        }
+
+    def iter_items(self, indices: Optional[Iterable[int]] = None) -> Iterator[Dict]:
+        """Yield items as dicts, optionally restricted to ``indices``."""
+        for index in (range(len(self)) if indices is None else indices):
+            yield self.item(int(index))
+
+    def to_reddit_data(self) -> Dict:
+        """Convert back to the ``get_user_data`` dict format."""
+        submissions = list(self.iter_items(self.submission_indices()))
+        comments = list(self.iter_items(self.comment_indices()))
+        data = dict(self.meta)
+        data.update({
+            'submissions': submissions,
+            'comments': comments,
+            'total_submissions': len(submissions),
+            'total_comments': len(comments)
+        })
+        return data
+
+    # ------------------------------------------------------------------
+    # Column accessors
+    # ------------------------------------------------------------------
+
+    def submission_indices(self) -> np.ndarray:
+        """Indices of submissions, in scrape order."""
+        return np.flatnonzero(self.kinds == SUBMISSION)
+
+    def comment_indices(self) -> np.ndarray:
+        """Indices of comments, in scrape order."""
+        return np.flatnonzero(self.kinds == COMMENT)
+
+    def kind_name(self, index: int) -> str:
+        """Return ``'submission'`` or ``'comment'`` for item ``index``."""
+        return KIND_NAMES[self.kinds[index]]
+
+    def subreddit(self, index: int) -> str:
+        """Return the subreddit name of item ``index``."""
+        return self.subreddits[self.subreddit_codes[index]]
+
+    def title(self, index: int) -> str:
+        """Submission title (or parent submission title for comments)."""
+        return self._string(index, _TITLE)
+
+    def text(self, index: int) -> str:
+        """Submission selftext or comment body."""
+        return self._string(index, _TEXT)
+
+    def url(self, index: int) -> str:
+        """Permalink of item ``index``."""
+        return self._string(index, _URL)
+
+    def item_id(self, index: int) -> str:
+        """Reddit id of item ``index``."""
+        return self._string(index, _ID)
+
+    def combined_text(self, index: int) -> str:
+        """Analysis text: ``title selftext`` for submissions, ``body`` for comments."""
+        if self.kinds[index] == COMMENT:
+            return self.text(index)
+        return f"{self.title(index)} {self.text(index)}"
+
+    def iter_texts(self) -> Iterator[str]:
+        """Yield the analysis text of every item."""
+        for index in range(len(self)):
+            yield self.combined_text(index)
+
+    def text_blob(self, separator: str = ' ') -> str:
+        """Concatenate the analysis text of every item."""
+        return separator.join(self.iter_texts())
+
+    def subreddit_counts(self) -> Tuple[List[str], np.ndarray]:
+        """Return subreddit names and per-subreddit item counts (items without a subreddit count as 0)."""
+        counts = np.bincount(self.subreddit_codes, minlength=len(self.subreddits))
+        if '' in self.subreddits:
+            counts[self.subreddits.index('')] = 0
+        return self.subreddits, counts
+
+    def top_subreddits(self, n: int = 5) -> List[Tuple[str, int]]:
+        """Return the ``n`` most active subreddits as ``(name, count)`` pairs."""
+        names, counts = self.subreddit_counts()
+        order = np.argsort(-counts, kind='stable')[:n]
+        return [(names[code], int(counts[code])) for code in order if counts[code] > 0]
+
+    def nbytes(self) -> int:
+        """Approximate memory footprint of the columns in bytes."""
+        arrays = (self.kinds, self.scores, self.created_utc, self.num_comments,
+                  self.subreddit_codes, self._offsets)
+        return sum(array.nbytes for array in arrays) + sys.getsizeof(self._buffer)
+
+
+def _chain(*iterables: Iterable[Dict]) -> Iterator[Dict]:
+    for iterable in iterables:
+        yield from iterable
+
+
+def as_item_store(data) -> ItemStore:
+    """Return ``data`` as an ``ItemStore``, converting a ``reddit_data`` dict if needed."""
+    if isinstance(data, ItemStore):
+        return data
+    return ItemStore.from_reddit_data(data)
@@ -0,0 +1,256 @@
+"""
+Metrics Registry
+Process-wide counters and latency histograms with Prometheus text export.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict) -> Tuple[str, ...]:
+    unknown = set(labels) - set(labelnames)
+    if unknown:
+        raise ValueError(f"Unknown metric labels: {', '.join(sorted(unknown))}")
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = []
+    for name, value in zip(labelnames, values):
+        escaped = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Increase the counter by ``amount``."""
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        """Return the current value for ``labels``."""
+        return self._values.get(_label_key(self.labelnames, labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value:g}" for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values (e.g. latencies in seconds)."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """Record one observation."""
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * len(self.buckets), 0, 0.0]
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of a block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        """Return the number of observations for ``labels``."""
+        series = self._series.get(_label_key(self.labelnames, labels))
+        return series[1] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*series[0]], series[1], series[2])) for key, series in self._series.items())
+        lines = []
+        for key, (bucket_counts, count, total) in items:
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                le = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {bucket_count}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of named metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, tuple(labelnames), **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        """Return the counter ``name``, creating it on first use."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        """Return the histogram ``name``, creating it on first use."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> str:
+        """Write the Prometheus text rendering to ``path``."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        return path
+
+
+REGISTRY = MetricsRegistry()
+
+# Reddit scraping
+HTTP_REQUESTS = REGISTRY.counter(
+    'reddit_http_requests_total', 'Reddit HTTP requests by listing and status code', ('listing', 'status'))
+HTTP_LATENCY = REGISTRY.histogram(
+    'reddit_http_request_seconds', 'Reddit HTTP request latency', ('listing',))
+RATE_LIMIT_SLEEP = REGISTRY.counter(
+    'reddit_rate_limit_sleep_seconds_total', 'Seconds spent sleeping for Reddit rate limits')
+
+# LLM calls
+LLM_CALLS = REGISTRY.counter(
+    'llm_calls_total', 'LLM calls by call site and outcome', ('site', 'outcome'))
+LLM_LATENCY = REGISTRY.histogram(
+    'llm_call_seconds', 'LLM call latency by call site', ('site',))
+LLM_TOKENS = REGISTRY.counter(
+    'llm_tokens_total', 'LLM tokens by call site and kind (prompt/completion)', ('site', 'kind'))
+
+# Neo4j
+NEO4J_QUERIES = REGISTRY.counter(
+    'neo4j_queries_total', 'Neo4j queries by query type', ('query_type',))
+NEO4J_LATENCY = REGISTRY.histogram(
+    'neo4j_query_seconds', 'Neo4j query latency by query type', ('query_type',))
+
+# Caches
+CACHE_REQUESTS = REGISTRY.counter(
+    'cache_requests_total', 'Cache lookups by cache and result (hit/miss)', ('cache', 'result'))
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache hit or miss."""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+@contextmanager
+def track_llm_call(site: str):
+    """Time an LLM call; set ``call['response']`` inside the block to count tokens.
+
+    Usage::
+
+        with track_llm_call('persona') as call:
+            call['response'] = model.generate_content(prompt)
+    """
+    call: Dict = {'response': None}
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        LLM_CALLS.inc(site=site, outcome='error')
+        raise
+    else:
+        LLM_CALLS.inc(site=site, outcome='ok')
+        usage = getattr(call['response'], 'usage_metadata', None)
+        if usage is not None:
+            LLM_TOKENS.inc(getattr(usage, 'prompt_token_count', 0) or 0, site=site, kind='prompt')
+            LLM_TOKENS.inc(getattr(usage, 'candidates_token_count', 0) or 0, site=site, kind='completion')
+    finally:
+        LLM_LATENCY.observe(time.perf_counter() - start, site=site)
+
+
+@contextmanager
+def track_neo4j_query(query_type: str):
+    """Count and time a Neo4j query."""
+    NEO4J_QUERIES.inc(query_type=query_type)
+    with NEO4J_LATENCY.time(query_type=query_type):
+        yield
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1', registry: Optional[MetricsRegistry] = None):
+    """Serve ``/metrics`` from a daemon thread; returns the server (call ``shutdown()`` to stop)."""
+    # http.server is only needed here; keep it off the CLI's import path
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry or REGISTRY
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,314 @@
+"""
+Passage Index
+BM25 inverted index over a user's submissions and comments, built when a
+scrape is saved and stored as NumPy arrays that are memory-mapped on load,
+so GraphRAG answers can quote the user's own words with their URLs.
+"""
+
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+INDEX_FORMAT = "reddit-persona-bm25"
+INDEX_VERSION = 1
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Characters of an item kept as its passage (and indexed)
+MAX_PASSAGE_CHARS = 2000
+
+# Loads of an index that keeps being replaced by rebuilds before giving up
+LOAD_ATTEMPTS = 5
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that the
+their theirs them themselves then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+_ARRAYS = ('term_offsets', 'doc_ids', 'term_freqs', 'doc_lengths', 'text_offsets')
+
+# One rebuild at a time per index directory (queries may trigger them from several threads)
+_build_locks: Dict[str, threading.Lock] = {}
+_build_locks_guard = threading.Lock()
+
+
+def _fold(token: str) -> str:
+    """Fold plurals and possessives so "games" and "game's" match "game"."""
+    if token.endswith("'s"):
+        token = token[:-2]
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, plurals folded, without stopwords or one-letter words."""
+    tokens = (_fold(token) for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS)
+    return [token for token in tokens if len(token) > 1 and token not in STOPWORDS]
+
+
+def passage_index_dir(username: str, output_dir: str = "output") -> str:
+    """Directory holding a user's index files."""
+    return os.path.join(output_dir, f"{username}_passages")
+
+
+def _passage(item: Dict) -> str:
+    """Searchable text of one item: title and body (comments include the thread title)."""
+    if item.get('type') == 'comment':
+        title = item.get('submission_title') or ''
+        body = item.get('body') or ''
+    else:
+        title = item.get('title') or ''
+        body = item.get('selftext') or ''
+    text = f"{title}\n{body}".strip() if title else body.strip()
+    return text[:MAX_PASSAGE_CHARS]
+
+
+class PassageIndex:
+    """BM25 search over one user's items; arrays may be memory-mapped."""
+
+    def __init__(self, terms: List[str], term_offsets: np.ndarray, doc_ids: np.ndarray, term_freqs: np.ndarray,
+                 doc_lengths: np.ndarray, text_offsets: np.ndarray, texts: bytes, documents: List[Dict],
+                 username: str = ''):
+        """Wrap prepared index arrays (see ``build`` and ``load``)."""
+        self.username = username
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.term_offsets = term_offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.text_offsets = text_offsets
+        self.texts = texts
+        self.documents = documents
+
+        # Per-document BM25 length normalization, computed once
+        avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 1.0
+        self._norm = (BM25_K1 * (1 - BM25_B + BM25_B * np.asarray(doc_lengths, dtype=np.float32)
+                                 / max(avg_length, 1.0))).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @classmethod
+    def build(cls, items: Iterable[Dict], username: str = '') -> 'PassageIndex':
+        """Tokenize and index ``items`` (scraper item dicts)."""
+        term_ids: Dict[str, int] = {}
+        posting_terms: List[int] = []
+        posting_docs: List[int] = []
+        posting_freqs: List[int] = []
+        doc_lengths: List[int] = []
+        texts: List[bytes] = []
+        documents: List[Dict] = []
+
+        for item in items:
+            text = _passage(item)
+            doc_id = len(documents)
+            tokens = tokenize(text)
+            for term, count in Counter(tokens).items():
+                posting_terms.append(term_ids.setdefault(term, len(term_ids)))
+                posting_docs.append(doc_id)
+                posting_freqs.append(min(count, 65535))
+            doc_lengths.append(len(tokens))
+            texts.append(text.encode('utf-8'))
+            documents.append({
+                'id': item.get('id', ''),
+                'type': item.get('type', 'submission'),
+                'subreddit': item.get('subreddit', ''),
+                'url': item.get('url', ''),
+                'score': item.get('score', 0),
+                'created_utc': item.get('created_utc', 0)
+            })
+
+        terms_array = np.asarray(posting_terms, dtype=np.int64)
+        order = np.lexsort((np.asarray(posting_docs, dtype=np.int64), terms_array))
+        term_offsets = np.zeros(len(term_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms_array, minlength=len(term_ids)), out=term_offsets[1:])
+        text_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in texts], out=text_offsets[1:])
+
+        return cls(terms=sorted(term_ids, key=term_ids.get),
+                   term_offsets=term_offsets,
+                   doc_ids=np.asarray(posting_docs, dtype=np.int32)[order],
+                   term_freqs=np.asarray(posting_freqs, dtype=np.uint16)[order],
+                   doc_lengths=np.asarray(doc_lengths, dtype=np.int32),
+                   text_offsets=text_offsets,
+                   texts=b''.join(texts),
+                   documents=documents,
+                   username=username)
+
+    def search(self, query: str, k: int = 8) -> List[Dict]:
+        """
+        Top BM25 matches for ``query``.
+
+        Returns:
+            Up to ``k`` item dicts (``id``, ``type``, ``subreddit``, ``url``,
+            ``score``, ``created_utc``) with ``text`` and ``bm25``, best first
+        """
+        n_docs = len(self.documents)
+        query_terms = {self.term_ids[token] for token in tokenize(query) if token in self.term_ids}
+        if not n_docs or not query_terms:
+            return []
+
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for term in query_terms:
+            start, end = int(self.term_offsets[term]), int(self.term_offsets[term + 1])
+            docs = self.doc_ids[start:end]
+            freqs = self.term_freqs[start:end].astype(np.float32)
+            idf = math.log(1 + (n_docs - (end - start) + 0.5) / ((end - start) + 0.5))
+            # Doc ids are unique within one posting list, so fancy-index += is exact
+            scores[docs] += idf * freqs * (BM25_K1 + 1) / (freqs + self._norm[docs])
+
+        k = min(k, n_docs)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [dict(self.documents[i], text=self.text(i), bm25=float(scores[i])) for i in top if scores[i] > 0]
+
+    def text(self, index: int) -> str:
+        """Passage text of document ``index``."""
+        return bytes(self.texts[int(self.text_offsets[index]):int(self.text_offsets[index + 1])]).decode('utf-8')
+
+    def save(self, directory: str) -> str:
+        """
+        Write the index as ``.npy`` arrays plus a passages blob and a JSON manifest.
+
+        The files are written to a sibling directory that then replaces
+        ``directory``, so indexes already memory-mapped from the old files
+        keep reading them and a reader never sees a half-written index.
+        """
+        parent, name = os.path.split(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".{name}.", dir=parent)
+        try:
+            for array in _ARRAYS:
+                np.save(os.path.join(staging, f"{array}.npy"), np.asarray(getattr(self, array)))
+            with open(os.path.join(staging, 'passages.bin'), 'wb') as f:
+                f.write(self.texts)
+            with open(os.path.join(staging, 'documents.json'), 'w', encoding='utf-8') as f:
+                json.dump(self.documents, f, ensure_ascii=False)
+            with open(os.path.join(staging, 'index.json'), 'w', encoding='utf-8') as f:
+                json.dump({'format': INDEX_FORMAT, 'version': INDEX_VERSION, 'username': self.username,
+                           'documents': len(self.documents), 'terms': self.terms}, f, ensure_ascii=False)
+
+            # Move the old index aside, then rename the new one into place
+            os.chmod(staging, 0o755)
+            retired = f"{staging}.old"
+            try:
+                os.rename(directory, retired)
+            except FileNotFoundError:
+                pass
+            os.rename(staging, directory)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        shutil.rmtree(retired, ignore_errors=True)
+        return directory
+
+    @classmethod
+    def load(cls, directory: str) -> 'PassageIndex':
+        """
+        Open a saved index with its arrays and passages memory-mapped.
+
+        Raises:
+            FileNotFoundError: If the index is missing, or was replaced by a rebuild while loading
+            OSError: If the index files cannot be read
+            ValueError: If the directory holds an index of another format or version
+        """
+        # Rebuilds swap in a whole new directory, so an unchanged inode means every file came from one build
+        inode = os.stat(directory).st_ino
+        with open(os.path.join(directory, 'index.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != INDEX_FORMAT or manifest.get('version') != INDEX_VERSION:
+            raise ValueError(f"{directory} is not a version {INDEX_VERSION} passage index")
+        with open(os.path.join(directory, 'documents.json'), 'r', encoding='utf-8') as f:
+            documents = json.load(f)
+
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in _ARRAYS}
+        passages_path = os.path.join(directory, 'passages.bin')
+        texts = np.memmap(passages_path, dtype=np.uint8, mode='r') if os.path.getsize(passages_path) else b''
+        if os.stat(directory).st_ino != inode:
+            raise FileNotFoundError(f"{directory} was replaced while it was loading")
+        return cls(terms=manifest['terms'], texts=texts, documents=documents, username=manifest.get('username', ''),
+                   **arrays)
+
+
+def _build_lock(directory: str) -> threading.Lock:
+    """The lock serializing rebuilds of the index in ``directory``."""
+    with _build_locks_guard:
+        return _build_locks.setdefault(os.path.abspath(directory), threading.Lock())
+
+
+def build_passage_index(reddit_data: Dict, output_dir: str = "output") -> str:
+    """Index a scrape's submissions and comments and save it; returns the index directory."""
+    items = list(reddit_data.get('submissions', [])) + list(reddit_data.get('comments', []))
+    index = PassageIndex.build(items, reddit_data['username'])
+    directory = passage_index_dir(reddit_data['username'], output_dir)
+    with _build_lock(directory):
+        return index.save(directory)
+
+
+@lru_cache(maxsize=16)
+def _cached_index(directory: str, mtime: float) -> PassageIndex:
+    return PassageIndex.load(directory)
+
+
+def get_passage_index(username: str, output_dir: str = "output") -> Optional[PassageIndex]:
+    """The user's saved index, loaded once per process until it is rebuilt; None if there is none."""
+    directory = passage_index_dir(username, output_dir)
+    manifest = os.path.join(directory, 'index.json')
+    lock = _build_lock(directory)
+    for _ in range(LOAD_ATTEMPTS):
+        try:
+            return _cached_index(directory, os.path.getmtime(manifest))
+        except FileNotFoundError:
+            if lock.locked():
+                # A rebuild is swapping its directory in; wait for it, then load the new index
+                with lock:
+                    pass
+            elif not os.path.exists(manifest):
+                return None
+    return None
+
+
+def ensure_passage_index(username: str, output_dir: str = "output") -> Optional[PassageIndex]:
+    """
+    The user's index, (re)built from their newest raw-data file when it is missing or older.
+
+    Returns:
+        The index, or None if the user has neither an index nor raw data
+    """
+    from .raw_data_io import find_raw_data_file, iter_raw_items
+
+    directory = passage_index_dir(username, output_dir)
+    manifest = os.path.join(directory, 'index.json')
+
+    def stale(raw_path: Optional[str]) -> bool:
+        return bool(raw_path) and (not os.path.exists(manifest)
+                                   or os.path.getmtime(raw_path) > os.path.getmtime(manifest))
+
+    if stale(find_raw_data_file(username, output_dir)):
+        with _build_lock(directory):
+            # Another thread may have rebuilt it while this one waited
+            raw_path = find_raw_data_file(username, output_dir)
+            if stale(raw_path):
+                PassageIndex.build(iter_raw_items(raw_path), username).save(directory)
+    return get_passage_index(username, output_dir)
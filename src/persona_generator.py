@@ -3,31 +3,83 @@ LLM Persona Generator using Google Gemini API
 This module handles generating user personas from Reddit data using Gemini.
 """
 
-import google.generativeai as genai
+import hashlib
 import os
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, Optional, Union
 from dotenv import load_dotenv
 import json
-import re
+
+from . import metrics, profiling
+from .persona_parser import get_parsed_persona, save_parsed_persona
+from .persona_schema import (PERSONA_SCHEMA, SCHEMA_VERSION, find_persona_json, parse_persona_json,
+                             remember_persona_json, render_persona_markdown, save_persona_json)
+from .stream_consumers import build_analysis_context
+
+if TYPE_CHECKING:
+    from .item_store import ItemStore
 
 load_dotenv()
 
+MODEL_NAME = 'models/gemini-2.5-flash'
+
+# Keys returned by ``extract_persona_sections`` and the headings (current
+# template first, then older ones) each is read from
+PERSONA_SECTION_TITLES = {
+    'overview': ('Overview', 'Personality Overview'),
+    'interests': ('Interests & Hobbies', 'Identified Interests'),
+    'personality': ('Personality Traits', 'Core Identity'),
+    'communication': ('Communication Style',),
+    'demographics': ('Demographics', 'User Profile'),
+    'values': ('Values & Beliefs',),
+    'knowledge': ('Knowledge Areas & Expertise',),
+    'behavior': ('Online Behavior Patterns', 'Behavioral Patterns'),
+    'summary': ('Summary Assessment', 'Summary', 'Persona Summary'),
+    'limitations': ('Limitations & Notes', 'Enhancement Available')
+}
+
 
 class PersonaGenerator:
     """Generate user personas using Google Gemini API."""
     
-    def __init__(self):
-        """Initialize the Gemini API client."""
+    def __init__(self, structured: Optional[bool] = None):
+        """
+        Initialize the Gemini API client.
+        
+        Args:
+            structured: Request schema-constrained JSON (rendered to markdown locally)
+                instead of free-form markdown; defaults to PERSONA_OUTPUT_FORMAT=json
+        """
+        if structured is None:
+            structured = os.getenv('PERSONA_OUTPUT_FORMAT', 'markdown').lower() == 'json'
+        self.structured = structured
         self.api_key = os.getenv('GEMINI_API_KEY')
         if self.api_key:
+            import google.generativeai as genai
+            
             genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('models/gemini-2.5-flash')
+            self.model = genai.GenerativeModel(MODEL_NAME)
         else:
             self.model = None
             print("Warning: Gemini API key not found. Persona generation will be limited.")
     
+    def check_api(self) -> bool:
+        """Check that the configured key can reach the Gemini model (network call)."""
+        if not self.model:
+            return False
+        try:
+            import google.generativeai as genai
+            
+            genai.get_model(MODEL_NAME)
+            return True
+        except Exception as e:
+            print(f"Gemini API check failed: {e}")
+            return False
+    
     def create_persona_prompt(self, formatted_data: str, username: str) -> str:
         """Create a detailed prompt for persona generation."""
+        if self.structured:
+            return self.create_structured_persona_prompt(formatted_data, username)
+        
         prompt = f"""
 You are an expert user researcher and data analyst. Analyze the following Reddit user data for u/{username} and create a comprehensive, user-friendly persona.
 
@@ -52,7 +104,7 @@ INSTRUCTIONS:
 ## 👤 User Profile
 
 **Age Range:** [Estimated age range based on references and communication style]
-**Location:** [Inferred location based on posts/comments]
+**Location:** [Inferred location based on posts/comments, consistent with the estimated timezone if one is given]
 **Lifestyle:** [Brief description of their lifestyle]
 **Primary Interests:** [Top 3-4 main interests]
 
@@ -143,13 +195,66 @@ Remember: Make this feel like a real person, not a dry analysis. Focus on creati
 """
         return prompt
     
-    def generate_persona(self, reddit_data: Dict, progress_callback=None) -> Optional[str]:
+    def create_structured_persona_prompt(self, formatted_data: str, username: str) -> str:
+        """Create the prompt for JSON output constrained by ``PERSONA_SCHEMA``."""
+        prompt = f"""
+You are an expert user researcher and data analyst. Analyze the following Reddit user data for u/{username} and create a comprehensive, user-friendly persona.
+
+INSTRUCTIONS:
+1. Analyze the user's posts, comments, and activity patterns
+2. Create a persona that feels like a real person: demographics, interests, personality, communication style, values, goals, frustrations and behavioral patterns
+3. Make it engaging and human-readable, like a character profile
+4. For sensitive inferences, use appropriate confidence qualifiers
+5. Respond with JSON matching the response schema:
+   - profile.location: inferred location, consistent with the estimated timezone if one is given
+   - primary_interests: 3 items; secondary_interests: 2; core_values, motivations and frustrations: 3 each
+   - quote: a quote that would represent this user's perspective, based on their communication style
+   - evidence: the key sources for major inferences (topic, the submissions/comments referenced, and their URL when available)
+   - graph.entities: inferred knowledge-graph entities (Interest, Personality_Trait, Technology, Location, Skill) with unique ids such as "interest_programming" or "trait_analytical"; subreddit activity is added from the data separately
+   - graph.relationships: from "user_{username}" (HAS_INTEREST, HAS_TRAIT, SKILLED_IN, LIVES_IN) or between entities (RELATED_TO, REQUIRES), referencing entity ids, each with a confidence from 0.0 to 1.0
+
+DATA TO ANALYZE:
+
+{formatted_data}
+
+Remember: Make this feel like a real person, not a dry analysis. Focus on creating an engaging, relatable persona while staying true to the evidence.
+"""
+        return prompt
+    
+    def _generation_options(self) -> Dict:
+        """Extra ``generate_content`` arguments for the configured output mode."""
+        if not self.structured:
+            return {}
+        return {'generation_config': {'response_mime_type': 'application/json', 'response_schema': PERSONA_SCHEMA}}
+    
+    def _render_structured_response(self, response_text: str, username: str) -> str:
+        """Validate a JSON persona, render it as markdown and remember the JSON for saving and graphs."""
+        persona_json = parse_persona_json(response_text)
+        persona_text = render_persona_markdown(persona_json, username)
+        remember_persona_json(persona_text, persona_json)
+        return persona_text
+    
+    def prompt_hash(self, prompt: str) -> str:
+        """
+        Fingerprint of a prompt and everything else that shapes the answer: the model (the
+        fallback persona counts as one), the output format and, for JSON output, the schema version.
+        """
+        model = MODEL_NAME if self.model else 'fallback'
+        output_format = f"json-v{SCHEMA_VERSION}" if self.structured else 'markdown'
+        return hashlib.sha256(f"{model}\n{output_format}\n{prompt}".encode('utf-8')).hexdigest()
+    
+    def generate_persona(self, reddit_data: Dict, progress_callback=None,
+                         formatted_data: Optional[str] = None, allow_fallback: bool = True) -> Optional[str]:
         """
         Generate a user persona from Reddit data using Gemini.
         
         Args:
             reddit_data: Dictionary containing scraped Reddit data
             progress_callback: Optional callback function for progress updates
+            formatted_data: Pre-built analysis text (e.g. from an AnalysisContextBuilder
+                fed during the scrape); built from reddit_data when omitted
+            allow_fallback: Return the basic persona when a Gemini call fails
+                (otherwise None); without an API key the basic persona is always used
             
         Returns:
             Generated persona text or None if failed
@@ -167,9 +272,8 @@ Remember: Make this feel like a real person, not a dry analysis. Focus on creati
                 progress_callback("📊 Preparing data for AI analysis...")
             
             # Prepare data for analysis
-            from .reddit_scraper import RedditScraper
-            scraper = RedditScraper()
-            formatted_data = scraper.prepare_data_for_analysis(reddit_data)
+            if formatted_data is None:
+                formatted_data = build_analysis_context(reddit_data)
             
             if progress_callback:
                 progress_callback("📝 Creating analysis prompt...")
@@ -181,66 +285,60 @@ Remember: Make this feel like a real person, not a dry analysis. Focus on creati
                 progress_callback("🧠 Generating persona with AI...")
             
             # Generate response
-            response = self.model.generate_content(prompt)
+            with profiling.span("Gemini generate_content"), metrics.track_llm_call('persona') as call:
+                response = call['response'] = self.model.generate_content(prompt, **self._generation_options())
             
             if response and response.text:
+                persona_text = response.text
+                if self.structured:
+                    persona_text = self._render_structured_response(persona_text, reddit_data['username'])
                 if progress_callback:
                     progress_callback("✅ AI persona generation complete!")
-                return response.text
+                return persona_text
             else:
                 if progress_callback:
                     progress_callback("⚠️ AI generation failed, creating fallback persona...")
                 print("No response generated from Gemini API")
-                return self.generate_fallback_persona(reddit_data)
+                return self.generate_fallback_persona(reddit_data) if allow_fallback else None
                 
         except Exception as e:
             if progress_callback:
                 progress_callback(f"❌ AI generation error: {str(e)[:50]}...")
             print(f"Error generating persona with Gemini: {e}")
-            return self.generate_fallback_persona(reddit_data)
+            return self.generate_fallback_persona(reddit_data) if allow_fallback else None
+    
+    @staticmethod
+    def _describe_interest(interest: Dict) -> str:
+        """Summarize the evidence behind a classified interest."""
+        evidence = []
+        if interest['keyword_hits']:
+            evidence.append(f"{interest['keyword_hits']} mentions ({', '.join(interest['top_keywords'][:3])})")
+        if interest['subreddit_items']:
+            communities = ', '.join(f"r/{sub}" for sub in interest['subreddits'][:3])
+            evidence.append(f"{interest['subreddit_items']} posts/comments in {communities}")
+        return '; '.join(evidence)
     
-    def generate_fallback_persona(self, reddit_data: Dict) -> str:
+    def generate_fallback_persona(self, reddit_data: Union[Dict, 'ItemStore']) -> str:
         """Generate a user-friendly persona without LLM when API is unavailable."""
-        username = reddit_data['username']
-        submissions = reddit_data['submissions']
-        comments = reddit_data['comments']
+        from .interest_classifier import get_classifier
+        from .item_store import as_item_store
+        
+        store = as_item_store(reddit_data)
+        username = store.meta['username']
+        submission_indices = store.submission_indices()
+        comment_indices = store.comment_indices()
         
         # Basic statistics
-        total_submissions = len(submissions)
-        total_comments = len(comments)
+        total_submissions = len(submission_indices)
+        total_comments = len(comment_indices)
         
         # Get top subreddits
-        subreddits = {}
-        for item in submissions + comments:
-            subreddit = item.get('subreddit', 'unknown')
-            subreddits[subreddit] = subreddits.get(subreddit, 0) + 1
-        
-        top_subreddits = sorted(subreddits.items(), key=lambda x: x[1], reverse=True)[:5]
-        
-        # Analyze content for basic insights
-        all_text = []
-        for comment in comments[:10]:
-            all_text.append(comment.get('body', ''))
-        for submission in submissions[:5]:
-            all_text.append(submission.get('title', ''))
-            all_text.append(submission.get('selftext', ''))
+        _, subreddit_counts = store.subreddit_counts()
+        active_subreddits = int((subreddit_counts > 0).sum())
+        top_subreddits = store.top_subreddits(5)
         
-        combined_text = ' '.join(all_text).lower()
-        
-        # Basic persona inference
-        interests = []
-        if any(word in combined_text for word in ['game', 'gaming', 'play']):
-            interests.append("🎮 Gaming")
-        if any(word in combined_text for word in ['tech', 'programming', 'code', 'software']):
-            interests.append("💻 Technology")
-        if any(word in combined_text for word in ['food', 'cooking', 'restaurant']):
-            interests.append("🍽️ Food & Dining")
-        if any(word in combined_text for word in ['travel', 'trip', 'vacation']):
-            interests.append("✈️ Travel")
-        if any(word in combined_text for word in ['music', 'song', 'band']):
-            interests.append("🎵 Music")
-        if any(word in combined_text for word in ['movie', 'film', 'show', 'tv']):
-            interests.append("🎬 Entertainment")
+        # Score interests over the whole history (keywords + subreddit priors)
+        interests = get_classifier().classify_store(store)
         
         # Generate user-friendly persona
         persona = f"""# Reddit User Persona: u/{username}
@@ -248,7 +346,7 @@ Remember: Make this feel like a real person, not a dry analysis. Focus on creati
 ## 👤 User Profile
 
 **Activity Level:** {total_submissions} posts, {total_comments} comments
-**Community Engagement:** Active in {len(subreddits)} different subreddits
+**Community Engagement:** Active in {active_subreddits} different subreddits
 **Primary Communities:** {', '.join([f"r/{sub}" for sub, _ in top_subreddits[:3]])}
 
 ## 🎯 Core Identity
@@ -266,7 +364,7 @@ Based on their posting patterns, they appear to be a regular contributor who eng
         
         if interests:
             for interest in interests[:4]:
-                persona += f"- **{interest}**: Shows engagement through posts and comments\n"
+                persona += f"- **{interest['label']}**: {self._describe_interest(interest)}\n"
         else:
             persona += "- **Community Engagement**: Active participant in Reddit discussions\n"
             persona += "- **Diverse Topics**: Engages with multiple subject areas\n"
@@ -283,7 +381,7 @@ Based on their posting patterns, they appear to be a regular contributor who eng
 ## 📊 Activity Summary
 
 **Total Contributions:** {total_submissions + total_comments} posts and comments
-**Community Diversity:** Active in {len(subreddits)} different subreddits
+**Community Diversity:** Active in {active_subreddits} different subreddits
 **Engagement Level:** {'High' if total_submissions + total_comments > 50 else 'Moderate' if total_submissions + total_comments > 20 else 'Light'} activity level
 
 ## 🔍 Recent Activity Highlights
@@ -291,25 +389,26 @@ Based on their posting patterns, they appear to be a regular contributor who eng
 """
         
         # Add some sample content
-        if comments:
+        if total_comments:
             persona += "**Recent Comments:**\n"
-            for i, comment in enumerate(comments[:3], 1):
-                content = comment.get('body', '')[:150]
-                if len(comment.get('body', '')) > 150:
+            for i, index in enumerate(comment_indices[:3], 1):
+                body = store.text(index)
+                content = body[:150]
+                if len(body) > 150:
                     content += "..."
-                persona += f"{i}. In r/{comment.get('subreddit', 'unknown')}: \"{content}\"\n"
-                persona += f"   📎 [View Source]({comment.get('url', '')})\n\n"
+                persona += f"{i}. In r/{store.subreddit(index)}: \"{content}\"\n"
+                persona += f"   📎 [View Source]({store.url(index)})\n\n"
         
-        if submissions:
+        if total_submissions:
             persona += "**Recent Posts:**\n"
-            for i, submission in enumerate(submissions[:3], 1):
-                title = submission.get('title', '')
-                persona += f"{i}. \"{title}\" in r/{submission.get('subreddit', 'unknown')}\n"
-                persona += f"   📎 [View Source]({submission.get('url', '')})\n\n"
+            for i, index in enumerate(submission_indices[:3], 1):
+                title = store.title(index)
+                persona += f"{i}. \"{title}\" in r/{store.subreddit(index)}\n"
+                persona += f"   📎 [View Source]({store.url(index)})\n\n"
         
         persona += f"""## 🎭 Persona Summary
 
-u/{username} appears to be an engaged Reddit user who actively participates in community discussions across {len(subreddits)} different subreddits. Their activity pattern suggests someone who enjoys exploring diverse topics and contributing to conversations.
+u/{username} appears to be an engaged Reddit user who actively participates in community discussions across {active_subreddits} different subreddits. Their activity pattern suggests someone who enjoys exploring diverse topics and contributing to conversations.
 
 ## 📝 Enhancement Available
 
@@ -321,7 +420,7 @@ This is a basic analysis generated without advanced AI processing. For a more de
 3. Re-run the analysis for comprehensive insights
 
 ---
-*Generated on {reddit_data.get('scraped_at', 'Unknown date')} using {reddit_data.get('method', 'unknown method')}*
+*Generated on {store.meta.get('scraped_at', 'Unknown date')} using {store.meta.get('method', 'unknown method')}*
 """
         
         return persona
@@ -331,43 +430,18 @@ This is a basic analysis generated without advanced AI processing. For a more de
         os.makedirs(output_dir, exist_ok=True)
         filename = f"{output_dir}/{username}_persona.txt"
         
-        with open(filename, 'w', encoding='utf-8') as f:
+        with profiling.span("write persona file"), open(filename, 'w', encoding='utf-8') as f:
             f.write(persona_text)
+        save_parsed_persona(persona_text, filename)
+        
+        # Structured personas also keep their JSON source (used for graphs)
+        persona_json = find_persona_json(persona_text)
+        if persona_json:
+            save_persona_json(persona_text, persona_json, username, output_dir)
         
         return filename
     
     def extract_persona_sections(self, persona_text: str) -> Dict:
         """Extract different sections from the persona for structured display."""
-        sections = {
-            'overview': '',
-            'interests': '',
-            'personality': '',
-            'communication': '',
-            'demographics': '',
-            'values': '',
-            'knowledge': '',
-            'behavior': '',
-            'summary': '',
-            'limitations': ''
-        }
-        
-        # Simple regex patterns to extract sections
-        patterns = {
-            'overview': r'## Overview\s*(.*?)(?=##|$)',
-            'interests': r'### Interests & Hobbies\s*(.*?)(?=###|##|$)',
-            'personality': r'### Personality Traits\s*(.*?)(?=###|##|$)',
-            'communication': r'### Communication Style\s*(.*?)(?=###|##|$)',
-            'demographics': r'### Demographics.*?\s*(.*?)(?=###|##|$)',
-            'values': r'### Values & Beliefs\s*(.*?)(?=###|##|$)',
-            'knowledge': r'### Knowledge Areas & Expertise\s*(.*?)(?=###|##|$)',
-            'behavior': r'### Online Behavior Patterns\s*(.*?)(?=###|##|$)',
-            'summary': r'## Summary Assessment\s*(.*?)(?=##|$)',
-            'limitations': r'## Limitations & Notes\s*(.*?)(?=##|$)'
-        }
-        
-        for key, pattern in patterns.items():
-            match = re.search(pattern, persona_text, re.DOTALL | re.IGNORECASE)
-            if match:
-                sections[key] = match.group(1).strip()
-        
-        return sections
+        parsed = get_parsed_persona(persona_text)
+        return {key: parsed.section_text(*titles) for key, titles in PERSONA_SECTION_TITLES.items()}
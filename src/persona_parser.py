@@ -0,0 +1,256 @@
+"""
+Persona Parser
+Parses persona markdown in a single pass into a structured object (sections,
+key/value fields, bullet lists and evidence sources) shared by the web
+display, CSV export and section extraction. Parsed personas are cached in
+memory and next to the persona file.
+"""
+
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Bump when the parsed structure changes so stale cache files are re-parsed
+PARSER_VERSION = 1
+
+EVIDENCE_MARKER = 'EVIDENCE SOURCES:'
+
+_FIELD = re.compile(r'^(?:[-*]\s+)?\*\*(?P<key>[^*]+?)\*\*\s*:?\s*(?P<value>.*)$')
+_BULLET = re.compile(r'^(?:[-*]|\d+[.)])\s+(?P<text>.+)$')
+_URL = re.compile(r'https?://[^\s)\]>]+')
+_MARKDOWN_LINK = re.compile(r'\[[^\]]*\]\((https?://[^)\s]+)\)')
+_TITLE_NOISE = re.compile(r'[^0-9a-z&]+')
+
+
+def normalize_title(title: str) -> str:
+    """Heading text without emoji, punctuation or case, for lookups."""
+    return _TITLE_NOISE.sub(' ', title.lower()).strip()
+
+
+def _field(line: str) -> Optional[Tuple[str, str]]:
+    match = _FIELD.match(line)
+    if not match:
+        return None
+    key = match.group('key').strip().rstrip(':').strip()
+    return (key, match.group('value').strip()) if key else None
+
+
+def _evidence_source(line: str) -> Dict:
+    """Split a ``Topic - reference`` evidence line; ``url`` is the first link in it, if any."""
+    bullet = _BULLET.match(line)
+    body = bullet.group('text') if bullet else line
+    link = _MARKDOWN_LINK.search(body) or _URL.search(body)
+    url = ''
+    if link:
+        url = (link.group(1) if link.re is _MARKDOWN_LINK else link.group(0)).rstrip('.,;')
+
+    topic, separator, reference = body.partition(' - ')
+    if not separator:
+        topic, reference = (body[:link.start()], body[link.start():]) if link else (body, '')
+    return {'topic': topic.strip(' *:'), 'reference': reference.strip(), 'url': url}
+
+
+class PersonaSection:
+    """One ``##`` (or nested ``###``) persona section."""
+
+    def __init__(self, title: str, level: int):
+        """Start an empty section called ``title`` at heading ``level``."""
+        self.title = title
+        self.level = level
+        self.lines: List[str] = []
+        self.fields: Dict[str, str] = {}
+        self.bullets: List[str] = []
+        self.subsections: List['PersonaSection'] = []
+
+    @property
+    def text(self) -> str:
+        """Section body as markdown (nested headings included)."""
+        return '\n'.join(self.lines)
+
+    def add_line(self, line: str):
+        """Record one non-empty body line and any field or bullet it holds."""
+        self.lines.append(line)
+        field = _field(line)
+        if field:
+            self.fields.setdefault(*field)
+        bullet = _BULLET.match(line)
+        if bullet:
+            self.bullets.append(bullet.group('text'))
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable form."""
+        return {
+            'title': self.title,
+            'level': self.level,
+            'lines': self.lines,
+            'fields': self.fields,
+            'bullets': self.bullets,
+            'subsections': [sub.to_dict() for sub in self.subsections]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PersonaSection':
+        """Rebuild a section from ``to_dict`` output."""
+        section = cls(data['title'], data['level'])
+        section.lines = data['lines']
+        section.fields = data['fields']
+        section.bullets = data['bullets']
+        section.subsections = [cls.from_dict(sub) for sub in data['subsections']]
+        return section
+
+
+class ParsedPersona:
+    """Structured view of a persona document."""
+
+    def __init__(self, title: str = '', sections: Optional[List[PersonaSection]] = None,
+                 evidence_text: str = '', evidence_sources: Optional[List[Dict]] = None, text_sha256: str = ''):
+        """Wrap already-parsed parts (see ``parse_persona``)."""
+        self.title = title
+        self.sections = sections or []
+        self.evidence_text = evidence_text
+        self.evidence_sources = evidence_sources or []
+        self.text_sha256 = text_sha256
+        self._index: Dict[str, PersonaSection] = {}
+        for section in self.iter_sections():
+            self._index.setdefault(normalize_title(section.title), section)
+
+    def iter_sections(self) -> Iterator[PersonaSection]:
+        """Yield every section, each ``##`` section followed by its ``###`` subsections."""
+        for section in self.sections:
+            yield section
+            yield from section.subsections
+
+    def section(self, *titles: str) -> Optional[PersonaSection]:
+        """First section (at any level) matching one of ``titles``, ignoring emoji and case."""
+        for title in titles:
+            found = self._index.get(normalize_title(title))
+            if found:
+                return found
+        return None
+
+    def section_text(self, *titles: str) -> str:
+        """Body of the first matching section, or an empty string."""
+        found = self.section(*titles)
+        return found.text if found else ''
+
+    def field_rows(self) -> List[Tuple[str, str, str]]:
+        """``(section, attribute, value)`` rows for every key/value field, in document order."""
+        rows = []
+        for section in self.sections:
+            for key, value in section.fields.items():
+                rows.append((section.title, key, value))
+        return rows
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable form."""
+        return {
+            'parser_version': PARSER_VERSION,
+            'text_sha256': self.text_sha256,
+            'title': self.title,
+            'sections': [section.to_dict() for section in self.sections],
+            'evidence_text': self.evidence_text,
+            'evidence_sources': self.evidence_sources
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ParsedPersona':
+        """Rebuild a parsed persona from ``to_dict`` output."""
+        return cls(data['title'], [PersonaSection.from_dict(section) for section in data['sections']],
+                   data['evidence_text'], data['evidence_sources'], data['text_sha256'])
+
+
+def text_hash(persona_text: str) -> str:
+    """Fingerprint used to validate cached parses."""
+    return hashlib.sha256(persona_text.encode('utf-8')).hexdigest()
+
+
+def parse_persona(persona_text: str) -> ParsedPersona:
+    """
+    Parse persona markdown in one pass over its lines.
+
+    ``#`` gives the title, ``##`` starts a section and ``###`` a subsection
+    (whose lines also count towards the parent section). ``**Key:** value``
+    and ``- **Key**: value`` lines become fields, list items become bullets,
+    and everything after ``EVIDENCE SOURCES:`` is collected as sources.
+    """
+    title = ''
+    sections: List[PersonaSection] = []
+    section: Optional[PersonaSection] = None
+    subsection: Optional[PersonaSection] = None
+    sources: List[Dict] = []
+    in_evidence = False
+
+    for raw_line in persona_text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        if in_evidence:
+            sources.append(_evidence_source(line))
+        elif line.startswith(EVIDENCE_MARKER):
+            in_evidence = True
+        elif line.startswith('### ') and section:
+            subsection = PersonaSection(line[4:].strip(), 3)
+            section.subsections.append(subsection)
+            section.lines.append(line)
+        elif line.startswith('## '):
+            section = PersonaSection(line[3:].strip(), 2)
+            subsection = None
+            sections.append(section)
+        elif line.startswith('# ') and not title:
+            title = line[2:].strip()
+        elif line == '---':
+            continue
+        elif section:
+            section.add_line(line)
+            if subsection:
+                subsection.add_line(line)
+
+    # Evidence is kept verbatim so it renders exactly as written
+    evidence_text = persona_text[persona_text.find(EVIDENCE_MARKER):].strip() if in_evidence else ''
+    return ParsedPersona(title, sections, evidence_text, sources, text_hash(persona_text))
+
+
+@lru_cache(maxsize=64)
+def get_parsed_persona(persona_text: str) -> ParsedPersona:
+    """Parse ``persona_text`` once per process; repeated calls with the same text are free."""
+    return parse_persona(persona_text)
+
+
+def parsed_persona_path(persona_path: str) -> str:
+    """Cache file stored next to ``<user>_persona.txt``."""
+    base, _ = os.path.splitext(persona_path)
+    return f"{base}.parsed.json"
+
+
+def save_parsed_persona(persona_text: str, persona_path: str) -> ParsedPersona:
+    """Parse ``persona_text`` and write the cache file next to ``persona_path``."""
+    parsed = get_parsed_persona(persona_text)
+    with open(parsed_persona_path(persona_path), 'w', encoding='utf-8') as f:
+        json.dump(parsed.to_dict(), f, ensure_ascii=False, indent=2)
+    return parsed
+
+
+def load_parsed_persona(persona_path: str, persona_text: Optional[str] = None) -> ParsedPersona:
+    """
+    Load the parsed form of a saved persona, re-parsing when the cache is missing or stale.
+
+    Args:
+        persona_path: Path to ``<user>_persona.txt``
+        persona_text: Persona text, if already read (avoids reading the file again)
+    """
+    if persona_text is None:
+        with open(persona_path, 'r', encoding='utf-8') as f:
+            persona_text = f.read()
+
+    try:
+        with open(parsed_persona_path(persona_path), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('parser_version') == PARSER_VERSION and cached.get('text_sha256') == text_hash(persona_text):
+            return ParsedPersona.from_dict(cached)
+    except (OSError, ValueError, KeyError):
+        pass
+    return save_parsed_persona(persona_text, persona_path)
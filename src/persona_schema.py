@@ -0,0 +1,391 @@
+"""
+Structured Persona Schema
+Response schema for JSON persona output, plus validation, markdown rendering
+and graph conversion, so one Gemini call yields both the persona and its
+knowledge-graph entities without parsing free-form text.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+SCHEMA_VERSION = 1
+
+# Inferred node labels and relationship types the LLM may emit (used as Cypher
+# labels); subreddit activity comes from the scraped items, see ``graph_facts``
+ENTITY_TYPES = ('Interest', 'Personality_Trait', 'Technology', 'Location', 'Skill')
+RELATIONSHIP_TYPES = ('HAS_INTEREST', 'HAS_TRAIT', 'SKILLED_IN', 'LIVES_IN', 'RELATED_TO', 'REQUIRES')
+
+_STRING = {'type': 'string'}
+_STRINGS = {'type': 'array', 'items': _STRING}
+_NAMED_ITEMS = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {'name': _STRING, 'description': _STRING},
+        'required': ['name', 'description']
+    }
+}
+
+# Gemini response schema (OpenAPI subset: no free-form objects, so graph
+# entity properties are spelled out)
+PERSONA_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'profile': {
+            'type': 'object',
+            'properties': {
+                'age_range': _STRING,
+                'location': _STRING,
+                'lifestyle': _STRING,
+                'primary_interests': _STRINGS
+            },
+            'required': ['age_range', 'location', 'lifestyle', 'primary_interests']
+        },
+        'personality_overview': _STRING,
+        'communication_style': _STRING,
+        'primary_interests': _NAMED_ITEMS,
+        'secondary_interests': _NAMED_ITEMS,
+        'core_values': _NAMED_ITEMS,
+        'perspectives': _STRING,
+        'motivations': _STRINGS,
+        'seeking': _STRING,
+        'frustrations': _STRINGS,
+        'challenges': _STRING,
+        'behavior': {
+            'type': 'object',
+            'properties': {
+                'activity_level': _STRING,
+                'engagement_style': _STRING,
+                'content_preference': _STRING,
+                'helpfulness': _STRING,
+                'expertise_sharing': _STRING,
+                'community_involvement': _STRING
+            },
+            'required': ['activity_level', 'engagement_style', 'content_preference',
+                         'helpfulness', 'expertise_sharing', 'community_involvement']
+        },
+        'activity_summary': {
+            'type': 'object',
+            'properties': {
+                'most_active_in': _STRINGS,
+                'total_posts': {'type': 'integer'},
+                'total_comments': {'type': 'integer'},
+                'account_age_estimate': _STRING
+            },
+            'required': ['most_active_in', 'total_posts', 'total_comments', 'account_age_estimate']
+        },
+        'quote': _STRING,
+        'summary': _STRING,
+        'evidence': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {'topic': _STRING, 'reference': _STRING, 'url': _STRING},
+                'required': ['topic', 'reference']
+            }
+        },
+        'graph': {
+            'type': 'object',
+            'properties': {
+                'entities': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'id': _STRING,
+                            'type': {'type': 'string', 'enum': list(ENTITY_TYPES)},
+                            'name': _STRING,
+                            'category': _STRING,
+                            'description': _STRING,
+                            'confidence': {'type': 'number'}
+                        },
+                        'required': ['id', 'type', 'name']
+                    }
+                },
+                'relationships': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'from': _STRING,
+                            'to': _STRING,
+                            'type': {'type': 'string', 'enum': list(RELATIONSHIP_TYPES)},
+                            'strength': _STRING,
+                            'confidence': {'type': 'number'}
+                        },
+                        'required': ['from', 'to', 'type']
+                    }
+                }
+            },
+            'required': ['entities', 'relationships']
+        }
+    },
+    'required': ['profile', 'personality_overview', 'communication_style', 'primary_interests',
+                 'core_values', 'motivations', 'frustrations', 'behavior', 'activity_summary',
+                 'quote', 'summary', 'evidence', 'graph']
+}
+
+_JSON_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool
+}
+
+
+class PersonaSchemaError(ValueError):
+    """Structured persona output that does not match ``PERSONA_SCHEMA``."""
+
+
+def validate_against(value, schema: Dict, path: str = '$'):
+    """
+    Check ``value`` against a (Gemini-subset) JSON schema.
+
+    Raises:
+        PersonaSchemaError: On the first mismatch, naming its JSON path
+    """
+    expected = _JSON_TYPES[schema['type']]
+    if not isinstance(value, expected) or (schema['type'] in ('integer', 'number') and isinstance(value, bool)):
+        raise PersonaSchemaError(f"{path}: expected {schema['type']}, got {type(value).__name__}")
+
+    if 'enum' in schema and value not in schema['enum']:
+        raise PersonaSchemaError(f"{path}: {value!r} is not one of {', '.join(schema['enum'])}")
+    if schema['type'] == 'object':
+        for key in schema.get('required', []):
+            if key not in value:
+                raise PersonaSchemaError(f"{path}: missing '{key}'")
+        for key, subschema in schema.get('properties', {}).items():
+            if key in value:
+                validate_against(value[key], subschema, f"{path}.{key}")
+    elif schema['type'] == 'array':
+        for i, item in enumerate(value):
+            validate_against(item, schema['items'], f"{path}[{i}]")
+
+
+def parse_persona_json(response_text: str) -> Dict:
+    """
+    Decode and validate a structured persona response.
+
+    Raises:
+        PersonaSchemaError: If the text is not JSON or does not match the schema
+    """
+    try:
+        data = json.loads(response_text)
+    except ValueError as e:
+        raise PersonaSchemaError(f"Response is not valid JSON: {e}") from e
+    validate_against(data, PERSONA_SCHEMA)
+    return data
+
+
+def _named_items(items: List[Dict]) -> str:
+    return ''.join(f"- **{item['name']}**: {item['description']}\n" for item in items)
+
+
+def _bullets(items: List[str]) -> str:
+    return ''.join(f"- {item}\n" for item in items)
+
+
+def render_persona_markdown(data: Dict, username: str) -> str:
+    """Render a validated structured persona in the markdown persona template."""
+    profile = data['profile']
+    behavior = data['behavior']
+    activity = data['activity_summary']
+
+    markdown = f"""# Reddit User Persona: u/{username}
+
+## 👤 User Profile
+
+**Age Range:** {profile['age_range']}
+**Location:** {profile['location']}
+**Lifestyle:** {profile['lifestyle']}
+**Primary Interests:** {', '.join(profile['primary_interests'])}
+
+## 🎯 Core Identity
+
+### Personality Overview
+{data['personality_overview']}
+
+### Communication Style
+{data['communication_style']}
+
+## 🎮 Interests & Hobbies
+
+### Primary Interests
+{_named_items(data['primary_interests'])}"""
+
+    if data.get('secondary_interests'):
+        markdown += f"\n### Secondary Interests\n{_named_items(data['secondary_interests'])}"
+
+    markdown += f"""
+## 💭 Values & Beliefs
+
+### Core Values
+{_named_items(data['core_values'])}"""
+
+    if data.get('perspectives'):
+        markdown += f"\n### Perspectives\n{data['perspectives']}\n"
+
+    markdown += f"""
+## 🎯 Goals & Motivations
+
+### What Drives Them
+{_bullets(data['motivations'])}"""
+
+    if data.get('seeking'):
+        markdown += f"\n### What They're Seeking\n{data['seeking']}\n"
+
+    markdown += f"""
+## 😤 Frustrations & Pain Points
+
+### Common Frustrations
+{_bullets(data['frustrations'])}"""
+
+    if data.get('challenges'):
+        markdown += f"\n### Challenges They Face\n{data['challenges']}\n"
+
+    markdown += f"""
+## 🔍 Behavioral Patterns
+
+### Online Behavior
+- **Activity Level**: {behavior['activity_level']}
+- **Engagement Style**: {behavior['engagement_style']}
+- **Content Preference**: {behavior['content_preference']}
+
+### Communication Patterns
+- **Helpfulness**: {behavior['helpfulness']}
+- **Expertise Sharing**: {behavior['expertise_sharing']}
+- **Community Involvement**: {behavior['community_involvement']}
+
+## 📊 Activity Summary
+
+**Most Active In**: {', '.join(activity['most_active_in'])}
+**Total Posts**: {activity['total_posts']}
+**Total Comments**: {activity['total_comments']}
+**Account Age Estimate**: {activity['account_age_estimate']}
+
+## 🎭 Persona Quote
+"{data['quote'].strip().strip('"')}"
+
+## 📝 Summary
+{data['summary']}
+
+---
+
+EVIDENCE SOURCES:
+"""
+    for source in data['evidence']:
+        reference = source['reference']
+        if source.get('url') and source['url'] not in reference:
+            reference = f"{reference} ({source['url']})" if reference else source['url']
+        markdown += f"{source['topic']} - {reference}\n"
+    return markdown
+
+
+def persona_graph_data(data: Dict, username: str) -> Dict:
+    """
+    Convert the persona's ``graph`` block to the entity/relationship format used by the graph builder.
+
+    The user node is always present as ``user_<username>``; relationships that
+    reference unknown entity ids are dropped.
+    """
+    profile = data['profile']
+    user_id = f"user_{username}"
+    entities = [{
+        'id': user_id,
+        'type': 'User',
+        'properties': {
+            'name': username,
+            'age_range': profile['age_range'],
+            'location': profile['location'],
+            'description': data['summary']
+        }
+    }]
+    known_ids = {user_id}
+
+    for entity in data['graph']['entities']:
+        if entity['id'] in known_ids:
+            continue
+        properties = {key: entity[key] for key in ('name', 'category', 'description', 'confidence') if key in entity}
+        entities.append({'id': entity['id'], 'type': entity['type'], 'properties': properties})
+        known_ids.add(entity['id'])
+
+    relationships = []
+    for rel in data['graph']['relationships']:
+        source = user_id if rel['from'] in ('user', username) else rel['from']
+        if source not in known_ids or rel['to'] not in known_ids:
+            continue
+        properties = {key: rel[key] for key in ('strength', 'confidence') if key in rel}
+        relationships.append({'from': source, 'to': rel['to'], 'type': rel['type'], 'properties': properties})
+
+    return {'entities': entities, 'relationships': relationships}
+
+
+# ----------------------------------------------------------------------
+# Linking rendered markdown back to its structured source
+# ----------------------------------------------------------------------
+
+_MAX_REMEMBERED = 64
+_remembered: 'OrderedDict[str, Dict]' = OrderedDict()
+_remembered_lock = threading.Lock()
+
+
+def markdown_hash(persona_text: str) -> str:
+    """Fingerprint tying a structured persona to the markdown rendered from it."""
+    return hashlib.sha256(persona_text.encode('utf-8')).hexdigest()
+
+
+def remember_persona_json(persona_text: str, data: Dict):
+    """Keep ``data`` in memory as the structured source of ``persona_text``."""
+    with _remembered_lock:
+        _remembered[markdown_hash(persona_text)] = data
+        _remembered.move_to_end(markdown_hash(persona_text))
+        while len(_remembered) > _MAX_REMEMBERED:
+            _remembered.popitem(last=False)
+
+
+def persona_json_path(username: str, output_dir: str = "output") -> str:
+    """Sidecar file holding the structured persona next to ``<user>_persona.txt``."""
+    return os.path.join(output_dir, f"{username}_persona.json")
+
+
+def save_persona_json(persona_text: str, data: Dict, username: str, output_dir: str = "output") -> str:
+    """Write the structured persona sidecar, tagged with the hash of its rendered markdown."""
+    path = persona_json_path(username, output_dir)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'schema_version': SCHEMA_VERSION,
+            'username': username,
+            'markdown_sha256': markdown_hash(persona_text),
+            'persona': data
+        }, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def find_persona_json(persona_text: str, username: Optional[str] = None, output_dir: str = "output") -> Optional[Dict]:
+    """
+    Structured source of ``persona_text``, if it was generated in structured mode.
+
+    Looks in memory first, then in the user's sidecar file; a sidecar written
+    for different markdown (e.g. an older persona) is ignored.
+    """
+    digest = markdown_hash(persona_text)
+    with _remembered_lock:
+        if digest in _remembered:
+            return _remembered[digest]
+
+    if not username:
+        return None
+    try:
+        with open(persona_json_path(username, output_dir), 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if stored.get('schema_version') != SCHEMA_VERSION or stored.get('markdown_sha256') != digest:
+        return None
+    return stored.get('persona')
@@ -0,0 +1,380 @@
+"""
+Persona Service
+Long-running local HTTP API that keeps the Reddit, Gemini and Neo4j clients
+warm between requests, coalesces duplicate in-flight requests and bounds
+concurrency.
+
+Endpoints (JSON in, JSON out):
+    GET  /health                                     client status and load
+    GET  /metrics                                    Prometheus metrics
+    POST /scrape   {"username", "limit", "refresh"}  scrape and save raw data
+    POST /persona  {"username", "limit", "refresh"}  scrape (cached) and generate a persona
+    POST /qa       {"username", "question"}          GraphRAG Q&A (builds the graph on first use)
+
+Usage:
+    python main.py --serve --port 8080
+"""
+
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from . import metrics
+from .graphrag_handler import GraphRAGHandler
+from .persona_generator import PersonaGenerator
+from .reddit_scraper import RedditScraper
+
+MAX_BODY_BYTES = 1 << 20
+
+
+class ServiceBusy(Exception):
+    """Raised when a concurrency slot does not free up in time."""
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into a single execution.
+
+    The first caller runs the function; callers arriving while it is in
+    flight wait for and share its result (or exception).
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error: Optional[BaseException] = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, 'SingleFlight._Call'] = {}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run ``func`` once per in-flight ``key``; returns ``(result, shared)``."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running."""
+        with self._lock:
+            return len(self._calls)
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, name: str, ttl: float, max_entries: int = 256):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache(self.name, entry is not None)
+        return entry[1] if entry is not None else None
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PersonaService:
+    """Warm clients plus shared caches behind scrape, persona and Q&A operations."""
+
+    def __init__(self, output_dir: str = "output", max_scrapes: int = 4, max_llm_calls: int = 2,
+                 queue_timeout: float = 60.0, cache_ttl: float = 900.0, raw_format: Optional[str] = None,
+                 structured: Optional[bool] = None):
+        """
+        Create the clients once (including the PRAW health probe).
+
+        Args:
+            output_dir: Directory for raw data and persona files
+            max_scrapes: Concurrent scrapes allowed
+            max_llm_calls: Concurrent Gemini-backed operations allowed (persona, graph, Q&A)
+            queue_timeout: Seconds a request waits for a slot before failing with 503
+            cache_ttl: Seconds scraped data and personas stay cached
+            raw_format: Raw data file format (see ``RedditScraper.save_raw_data``)
+            structured: JSON persona mode (see ``PersonaGenerator``)
+        """
+        self.output_dir = output_dir
+        self.queue_timeout = queue_timeout
+        self.raw_format = raw_format
+        self.started_at = time.time()
+
+        self.scraper = RedditScraper()
+        self.generator = PersonaGenerator(structured)
+        self.graph = GraphRAGHandler()
+
+        self._limits = {
+            'scrape': threading.BoundedSemaphore(max_scrapes),
+            'llm': threading.BoundedSemaphore(max_llm_calls),
+        }
+        self._limit_sizes = {'scrape': max_scrapes, 'llm': max_llm_calls}
+        # A praw.Reddit instance must not be shared between threads, so each concurrent
+        # scrape borrows its own scraper (at most max_scrapes are ever created)
+        self._scrapers: 'queue.LifoQueue[RedditScraper]' = queue.LifoQueue()
+        self._scrapers.put(self.scraper)
+
+        self._flights = SingleFlight()
+        self._reddit_data = TTLCache('service_reddit_data', cache_ttl)
+        self._personas = TTLCache('service_persona', cache_ttl)
+        # Latest persona text per user, used to build graphs for Q&A
+        self._persona_texts: Dict[str, str] = {}
+
+    @contextmanager
+    def _slot(self, kind: str):
+        """Hold one concurrency slot of ``kind``."""
+        semaphore = self._limits[kind]
+        if not semaphore.acquire(timeout=self.queue_timeout):
+            raise ServiceBusy(f"Too many concurrent {kind} requests; try again later")
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    @contextmanager
+    def _borrow_scraper(self):
+        """Hold a scraper no other thread is using, creating one when all are busy."""
+        try:
+            scraper = self._scrapers.get_nowait()
+        except queue.Empty:
+            scraper = RedditScraper()
+        try:
+            yield scraper
+        finally:
+            self._scrapers.put(scraper)
+
+    # ------------------------------------------------------------------
+    # Operations
+    # ------------------------------------------------------------------
+
+    def scrape(self, username: str, limit: int = 100, refresh: bool = False) -> Dict:
+        """Return a user's data, scraping (and saving raw data) unless it is cached."""
+        key = (username.lower(), limit)
+        if not refresh:
+            cached = self._reddit_data.get(key)
+            if cached is not None:
+                return cached
+
+        def run():
+            with self._slot('scrape'), self._borrow_scraper() as scraper:
+                data = scraper.get_user_data(username, limit=limit)
+            if not data:
+                raise LookupError(f"No data found for u/{username}")
+            data['raw_data_file'] = self.scraper.save_raw_data(data, self.output_dir, fmt=self.raw_format)
+            self._reddit_data.put(key, data)
+            return data
+
+        data, _ = self._flights.do(('scrape',) + key, run)
+        return data
+
+    def persona(self, username: str, limit: int = 100, refresh: bool = False) -> Dict:
+        """Return a user's persona, generating and saving it unless it is cached."""
+        key = (username.lower(), limit)
+        if not refresh:
+            cached = self._personas.get(key)
+            if cached is not None:
+                return cached
+
+        def run():
+            reddit_data = self.scrape(username, limit, refresh)
+            with self._slot('llm'):
+                persona_text = self.generator.generate_persona(reddit_data)
+            if not persona_text:
+                raise RuntimeError(f"Persona generation failed for u/{username}")
+            result = {
+                'username': username,
+                'persona': persona_text,
+                'persona_file': self.generator.save_persona(persona_text, username, self.output_dir),
+                'raw_data_file': reddit_data.get('raw_data_file'),
+                'method': reddit_data['method'],
+                'total_submissions': reddit_data['total_submissions'],
+                'total_comments': reddit_data['total_comments']
+            }
+            self._personas.put(key, result)
+            self._persona_texts[username.lower()] = persona_text
+            return result
+
+        result, _ = self._flights.do(('persona',) + key, run)
+        return result
+
+    def ask(self, username: str, question: str) -> Dict:
+        """Answer a question about a user from their knowledge graph, building it on first use."""
+        if not self.graph.is_graph_created(username):
+            def build():
+                # Without a persona from this service, the graph handler loads the saved persona file
+                persona_text = self._persona_texts.get(username.lower())
+                with self._slot('llm'):
+                    if not self.graph.create_graph_from_persona(persona_text, username):
+                        raise LookupError(f"Could not build a knowledge graph for u/{username}; "
+                                          f"generate a persona first")
+                return True
+
+            self._flights.do(('graph', username.lower()), build)
+
+        def answer():
+            with self._slot('llm'):
+                return self.graph.query_graph(question, username)
+
+        text, shared = self._flights.do(('qa', username.lower(), question.strip()), answer)
+        return {'username': username, 'question': question, 'answer': text, 'shared': shared}
+
+    def health(self) -> Dict:
+        """Client configuration and current load."""
+        return {
+            'status': 'ok',
+            'uptime_seconds': time.time() - self.started_at,
+            'reddit': 'praw' if self.scraper.reddit else 'web_scraping',
+            'gemini': bool(self.generator.model),
+            'neo4j_uri': self.graph.neo4j_uri,
+            'in_flight': self._flights.in_flight(),
+            'limits': dict(self._limit_sizes),
+            'cached_users': len(self._reddit_data),
+            'cached_personas': len(self._personas)
+        }
+
+    def close(self):
+        """Release client resources."""
+        self.graph.close()
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    service: PersonaService = None
+
+    def _send_json(self, status: int, body: Dict):
+        payload = json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        return body
+
+    @staticmethod
+    def _username(body: Dict) -> str:
+        user_input = body.get('username') or body.get('url')
+        if not user_input:
+            raise ValueError("'username' is required")
+        return RedditScraper.extract_username_from_url(str(user_input))
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/health':
+            self._send_json(200, self.service.health())
+        elif path == '/metrics':
+            payload = metrics.REGISTRY.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        else:
+            self._send_json(404, {'error': f"Unknown endpoint {path}"})
+
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        try:
+            body = self._read_json()
+            if path == '/scrape':
+                data = self.service.scrape(self._username(body), int(body.get('limit', 100)),
+                                           bool(body.get('refresh')))
+                result = {key: data.get(key) for key in ('username', 'total_submissions', 'total_comments',
+                                                         'scraped_at', 'method', 'raw_data_file')}
+                if body.get('include_items'):
+                    result['submissions'] = data['submissions']
+                    result['comments'] = data['comments']
+                self._send_json(200, result)
+            elif path == '/persona':
+                self._send_json(200, self.service.persona(self._username(body), int(body.get('limit', 100)),
+                                                          bool(body.get('refresh'))))
+            elif path == '/qa':
+                question = body.get('question')
+                if not question:
+                    raise ValueError("'question' is required")
+                self._send_json(200, self.service.ask(self._username(body), str(question)))
+            else:
+                self._send_json(404, {'error': f"Unknown endpoint {path}"})
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {'error': str(e)})
+        except LookupError as e:
+            self._send_json(404, {'error': str(e)})
+        except ServiceBusy as e:
+            self._send_json(503, {'error': str(e)})
+        except Exception as e:
+            print(f"❌ Error handling {path}: {e}")
+            self._send_json(500, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} {format % args}")
+
+
+def create_server(service: PersonaService, host: str = '127.0.0.1', port: int = 8080) -> ThreadingHTTPServer:
+    """Bind the HTTP API for ``service`` (call ``serve_forever()`` to run it)."""
+    handler = type('PersonaServiceHandler', (_ServiceHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(host: str = '127.0.0.1', port: int = 8080, **service_options):
+    """Run the persona service until interrupted."""
+    print("🔧 Warming up clients...")
+    service = PersonaService(**service_options)
+    server = create_server(service, host, port)
+    print(f"🚀 Persona service listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopping persona service.")
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,173 @@
+"""
+Stage Profiling
+Nested wall-clock timing spans for a persona run, driven by the existing
+``progress_callback`` call sites, with optional cProfile integration.
+"""
+
+import io
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+# Profiler receiving spans from library code (see ``span``); a context variable, so
+# concurrent runs (Streamlit sessions, service threads) each see only their own
+_active_profiler: ContextVar[Optional['StageProfiler']] = ContextVar('active_profiler', default=None)
+
+
+def span(name: str):
+    """Time a block under the active profiler; a no-op when none is active."""
+    profiler = _active_profiler.get()
+    if profiler is None:
+        return nullcontext()
+    return profiler.span(name)
+
+
+class StageProfiler:
+    """Record nested timing spans and render them as a JSON trace or summary table.
+
+    Top-level stages are opened with ``span()``; inside a stage, every
+    message sent through a callback from ``wrap_callback()`` closes the
+    previous step and opens a new one named after the message.
+    """
+
+    def __init__(self, enabled: bool = True, use_cprofile: bool = False):
+        """Create a profiler; a disabled profiler records nothing."""
+        self.enabled = enabled
+        self.spans: List[Dict] = []
+        self._stack: List[Dict] = []
+        self._step: Optional[Dict] = None
+        self._origin = time.perf_counter()
+        self._cprofile = None
+        if enabled and use_cprofile:
+            import cProfile
+
+            self._cprofile = cProfile.Profile()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def _open(self, name: str, kind: str) -> Dict:
+        parent = self._stack[-1] if self._stack else None
+        record = {
+            'name': name,
+            'kind': kind,
+            'depth': len(self._stack),
+            'parent': parent['name'] if parent else None,
+            'start': time.perf_counter() - self._origin,
+            'end': None,
+            'duration': None
+        }
+        self.spans.append(record)
+        return record
+
+    @staticmethod
+    def _close(record: Dict, now: float):
+        record['end'] = now
+        record['duration'] = now - record['start']
+
+    def _close_step(self):
+        if self._step is not None:
+            self._close(self._step, time.perf_counter() - self._origin)
+            self._stack.remove(self._step)
+            self._step = None
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a block as a nested span."""
+        if not self.enabled:
+            yield
+            return
+
+        record = self._open(name, 'stage')
+        self._stack.append(record)
+        try:
+            yield record
+        finally:
+            if self._step is not None and self._step['depth'] > record['depth']:
+                self._close_step()
+            self._stack.remove(record)
+            self._close(record, time.perf_counter() - self._origin)
+
+    def wrap_callback(self, callback=None):
+        """Return a progress callback that also marks step boundaries."""
+        if not self.enabled:
+            return callback
+
+        def profiled_callback(message):
+            self._close_step()
+            self._step = self._open(message, 'step')
+            self._stack.append(self._step)
+            if callback:
+                callback(message)
+
+        return profiled_callback
+
+    @contextmanager
+    def activate(self):
+        """Make this profiler the target of module-level ``span()`` calls (and run cProfile)."""
+        if not self.enabled:
+            yield self
+            return
+
+        token = _active_profiler.set(self)
+        if self._cprofile:
+            self._cprofile.enable()
+        try:
+            yield self
+        finally:
+            if self._cprofile:
+                self._cprofile.disable()
+            self._close_step()
+            _active_profiler.reset(token)
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def total_time(self) -> float:
+        """Wall-clock time covered by top-level spans."""
+        return sum(record['duration'] or 0 for record in self.spans if record['depth'] == 0)
+
+    def to_trace(self) -> Dict:
+        """Return the recorded spans as a JSON-serializable trace."""
+        return {
+            'total_seconds': self.total_time(),
+            'spans': self.spans
+        }
+
+    def write_trace(self, path: str) -> str:
+        """Write the JSON trace (and cProfile stats next to it, if enabled)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_trace(), f, indent=2, ensure_ascii=False)
+
+        if self._cprofile:
+            self._cprofile.dump_stats(os.path.splitext(path)[0] + '.prof')
+        return path
+
+    def summary_table(self, top_functions: int = 15) -> str:
+        """Render spans (and the top cProfile functions, if enabled) as a text table."""
+        total = self.total_time() or 1e-9
+        lines = [f"{'Stage':<60} {'Seconds':>9} {'%':>6}", "-" * 77]
+        for record in self.spans:
+            name = ("  " * record['depth'] + record['name'])[:60]
+            duration = record['duration'] or 0.0
+            lines.append(f"{name:<60} {duration:>9.3f} {100 * duration / total:>5.1f}%")
+        lines.append("-" * 77)
+        lines.append(f"{'Total':<60} {total:>9.3f}")
+
+        if self._cprofile:
+            import pstats
+
+            stream = io.StringIO()
+            pstats.Stats(self._cprofile, stream=stream).sort_stats('cumulative').print_stats(top_functions)
+            lines.append("")
+            lines.append(stream.getvalue().strip())
+
+        return "\n".join(lines)
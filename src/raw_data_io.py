@@ -0,0 +1,256 @@
+"""
+Raw Data I/O
+Streaming NDJSON raw-data format with optional zstd/gzip compression.
+
+Files start with one header line holding the scrape metadata, followed by
+one item per line in the scraper's item format. Legacy pretty-printed
+``*_raw_data.json`` files are detected automatically on read.
+"""
+
+import gzip
+import io
+import json
+import os
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional compression
+    zstandard = None
+
+
+FORMAT_NAME = "reddit-persona-ndjson"
+FORMAT_VERSION = 1
+
+# Supported values for ``RedditScraper.save_raw_data(fmt=...)``
+RAW_FORMATS = ('json', 'ndjson', 'ndjson.gz', 'ndjson.zst')
+
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+_GZIP_MAGIC = b'\x1f\x8b'
+_META_KEYS = ('username', 'scraped_at', 'method')
+
+
+# ----------------------------------------------------------------------
+# JSON codec
+# ----------------------------------------------------------------------
+
+def dumps(obj) -> bytes:
+    """Serialize ``obj`` to compact UTF-8 JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """Parse JSON from ``bytes`` or ``str`` (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# ----------------------------------------------------------------------
+# Compressed streams
+# ----------------------------------------------------------------------
+
+def raw_data_filename(username: str, output_dir: str = "output", fmt: str = "json") -> str:
+    """Return the raw-data path for ``username`` in format ``fmt``."""
+    if fmt not in RAW_FORMATS:
+        raise ValueError(f"Unsupported raw data format: {fmt} (expected one of {', '.join(RAW_FORMATS)})")
+    return os.path.join(output_dir, f"{username}_raw_data.{fmt}")
+
+
+def find_raw_data_file(username: str, output_dir: str = "output") -> Optional[str]:
+    """Return the newest existing raw-data file for ``username``, in any format."""
+    candidates = [raw_data_filename(username, output_dir, fmt) for fmt in RAW_FORMATS]
+    existing = [path for path in candidates if os.path.exists(path)]
+    if not existing:
+        return None
+    return max(existing, key=os.path.getmtime)
+
+
+def _open_write(path: str):
+    """Open ``path`` for binary writing, compressing by file extension."""
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed; use the .ndjson.gz format instead")
+        handle = open(path, 'wb')
+        return zstandard.ZstdCompressor(level=3).stream_writer(handle, closefd=True)
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wb', compresslevel=6)
+    return open(path, 'wb')
+
+
+def open_compressed(path: str):
+    """Open ``path`` for buffered binary reading, detecting zstd/gzip by magic bytes."""
+    with open(path, 'rb') as probe:
+        magic = probe.read(4)
+
+    if magic.startswith(_ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        handle = open(path, 'rb')
+        reader = zstandard.ZstdDecompressor(max_window_size=2 ** 31).stream_reader(handle, closefd=True)
+        return io.BufferedReader(reader, buffer_size=1 << 20)
+    if magic.startswith(_GZIP_MAGIC):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb', buffering=1 << 20)
+
+
+# ----------------------------------------------------------------------
+# Writing
+# ----------------------------------------------------------------------
+
+class RawDataWriter:
+    """Streaming writer for the NDJSON raw-data format.
+
+    Usage::
+
+        with RawDataWriter(path, username='kojied', method='praw') as writer:
+            for item in items:
+                writer.write_item(item)
+    """
+
+    def __init__(self, path: str, username: str, scraped_at: Optional[str] = None,
+                 method: Optional[str] = None):
+        """Open ``path`` and write the header line."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.count = 0
+        self._stream = _open_write(path)
+        header = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'username': username,
+            'scraped_at': scraped_at,
+            'method': method
+        }
+        self._stream.write(dumps(header) + b'\n')
+
+    def write_item(self, item: Dict):
+        """Append one item."""
+        self._stream.write(dumps(item) + b'\n')
+        self.count += 1
+
+    def write_items(self, items: Iterable[Dict]):
+        """Append every item from ``items``."""
+        for item in items:
+            self.write_item(item)
+
+    def close(self):
+        """Flush and close the underlying stream."""
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_raw_data(data: Dict, path: str) -> str:
+    """Write a ``get_user_data`` dict to ``path``; the format follows the extension."""
+    if path.endswith('.json'):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return path
+
+    with RawDataWriter(path, data['username'], data.get('scraped_at'), data.get('method')) as writer:
+        writer.write_items(data.get('submissions', []))
+        writer.write_items(data.get('comments', []))
+    return path
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+
+def _is_ndjson_header(line: bytes) -> bool:
+    line = line.strip()
+    if not line.startswith(b'{') or not line.endswith(b'}'):
+        return False
+    try:
+        header = loads(line)
+    except ValueError:
+        return False
+    return isinstance(header, dict) and header.get('format') == FORMAT_NAME
+
+
+def open_raw_data(path: str) -> Tuple[Dict, Iterator[Dict]]:
+    """
+    Open a raw-data file of any supported format.
+
+    Args:
+        path: Path to a legacy JSON or NDJSON (optionally compressed) file
+
+    Returns:
+        ``(header, items)`` where ``header`` holds username, scraped_at and
+        method, and ``items`` lazily yields submissions and comments
+    """
+    stream = open_compressed(path)
+    first_line = stream.readline()
+
+    if _is_ndjson_header(first_line):
+        header = loads(first_line)
+
+        def iter_items() -> Iterator[Dict]:
+            try:
+                for line in stream:
+                    if line.strip():
+                        yield loads(line)
+            finally:
+                stream.close()
+
+        return {key: header.get(key) for key in _META_KEYS}, iter_items()
+
+    # Legacy pretty-printed JSON: has to be parsed in full
+    data = loads(first_line + stream.read())
+    stream.close()
+    header = {key: data.get(key) for key in _META_KEYS}
+
+    def iter_legacy() -> Iterator[Dict]:
+        yield from data.get('submissions', [])
+        yield from data.get('comments', [])
+
+    return header, iter_legacy()
+
+
+def iter_raw_items(path: str) -> Iterator[Dict]:
+    """Lazily yield every item stored in ``path``."""
+    _, items = open_raw_data(path)
+    yield from items
+
+
+def load_raw_data(path: str) -> Dict:
+    """Load a raw-data file of any supported format as a ``get_user_data`` dict."""
+    header, items = open_raw_data(path)
+    submissions = []
+    comments = []
+    for item in items:
+        if item.get('type') == 'comment':
+            comments.append(item)
+        else:
+            submissions.append(item)
+
+    data = dict(header)
+    data.update({
+        'submissions': submissions,
+        'comments': comments,
+        'total_submissions': len(submissions),
+        'total_comments': len(comments)
+    })
+    return data
+
+
+def load_item_store(path: str):
+    """Stream a raw-data file straight into an ``ItemStore``."""
+    from .item_store import ItemStore
+
+    header, items = open_raw_data(path)
+    return ItemStore.from_items(items, meta=header)
@@ -3,26 +3,47 @@ Reddit User Data Scraper
 This module handles scraping Reddit user data using PRAW and the Reddit API.
 """
 
-import praw
-import pandas as pd
-import requests
-import json
 import time
 from datetime import datetime
-from typing import List, Dict, Optional, Union
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import os
 from dotenv import load_dotenv
 
+from . import metrics, profiling
+from .corpus_store import RedditCorpus, corpus_path_for
+from .raw_data_io import raw_data_filename, write_raw_data
+from .stream_consumers import build_analysis_context
+
 load_dotenv()
 
+DEFAULT_BASE_URL = "https://www.reddit.com"
+
+# 429 responses are retried after the server's reset hint, up to this many times
+MAX_RATE_LIMIT_RETRIES = 3
+MAX_RATE_LIMIT_WAIT = 60.0
+
 
 class RedditScraper:
     """Reddit user data scraper using PRAW and fallback web scraping."""
     
-    def __init__(self):
-        """Initialize the Reddit scraper with API credentials."""
+    def __init__(self, base_url: Optional[str] = None, request_delay: Optional[float] = None):
+        """
+        Initialize the Reddit scraper with API credentials.
+        
+        Args:
+            base_url: Base URL for web scraping (default: REDDIT_BASE_URL env var or reddit.com);
+                a custom base URL (e.g. a local mock server) disables PRAW
+            request_delay: Seconds to sleep between listing pages (default: REDDIT_REQUEST_DELAY or 1)
+        """
+        self.base_url = (base_url or os.getenv('REDDIT_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        if request_delay is None:
+            request_delay = float(os.getenv('REDDIT_REQUEST_DELAY', '1'))
+        self.request_delay = request_delay
         self.reddit = None
-        self.setup_praw()
+        if self.base_url == DEFAULT_BASE_URL:
+            self.setup_praw()
+        else:
+            print(f"Using custom Reddit base URL {self.base_url} (web scraping only)")
     
     def setup_praw(self):
         """Setup PRAW with Reddit API credentials."""
@@ -36,6 +57,8 @@ class RedditScraper:
                 self.reddit = None
                 return
             
+            import praw
+            
             self.reddit = praw.Reddit(
                 client_id=client_id,
                 client_secret=client_secret,
@@ -45,8 +68,9 @@ class RedditScraper:
             # Test the connection with a simple request instead of user.me()
             # This tests read-only access without authentication
             try:
-                test_sub = self.reddit.subreddit('test')
-                list(test_sub.hot(limit=1))
+                with profiling.span("PRAW health probe"):
+                    test_sub = self.reddit.subreddit('test')
+                    list(test_sub.hot(limit=1))
                 print("✅ Reddit API connection successful")
             except Exception as test_e:
                 print(f"Reddit API test failed: {test_e}")
@@ -56,7 +80,8 @@ class RedditScraper:
             print(f"PRAW setup failed: {e}")
             self.reddit = None
     
-    def extract_username_from_url(self, url: str) -> str:
+    @staticmethod
+    def extract_username_from_url(url: str) -> str:
         """Extract username from Reddit profile URL."""
         if '/user/' in url:
             username = url.split('/user/')[-1].rstrip('/')
@@ -67,218 +92,320 @@ class RedditScraper:
             username = url.strip()
         return username
     
-    def get_user_data_praw(self, username: str, limit: int = 100, progress_callback=None) -> Optional[Dict]:
-        """Get user data using PRAW (preferred method)."""
+    @staticmethod
+    def _normalize_praw_submission(submission) -> Dict:
+        """Convert a PRAW submission into the item format."""
+        return {
+            'type': 'submission',
+            'id': submission.id,
+            'title': submission.title,
+            'selftext': submission.selftext,
+            'url': f"https://www.reddit.com{submission.permalink}",
+            'subreddit': submission.subreddit.display_name,
+            'score': submission.score,
+            'created_utc': submission.created_utc,
+            'num_comments': submission.num_comments
+        }
+    
+    @staticmethod
+    def _normalize_praw_comment(comment) -> Dict:
+        """Convert a PRAW comment into the item format."""
+        return {
+            'type': 'comment',
+            'id': comment.id,
+            'body': comment.body,
+            'url': f"https://www.reddit.com{comment.permalink}",
+            'subreddit': comment.subreddit.display_name,
+            'score': comment.score,
+            'created_utc': comment.created_utc,
+            'submission_title': comment.submission.title if hasattr(comment, 'submission') else ''
+        }
+    
+    @staticmethod
+    def _normalize_web_comment(comment: Dict) -> Dict:
+        """Convert a comment from the public JSON listing into the item format."""
+        return {
+            'type': 'comment',
+            'id': comment.get('id', ''),
+            'body': comment.get('body', ''),
+            'url': f"https://www.reddit.com{comment.get('permalink', '')}",
+            'subreddit': comment.get('subreddit', ''),
+            'score': comment.get('score', 0),
+            'created_utc': comment.get('created_utc', 0),
+            'submission_title': ''
+        }
+    
+    @staticmethod
+    def _normalize_web_submission(submission: Dict) -> Dict:
+        """Convert a submission from the public JSON listing into the item format."""
+        return {
+            'type': 'submission',
+            'id': submission.get('id', ''),
+            'title': submission.get('title', ''),
+            'selftext': submission.get('selftext', ''),
+            'url': f"https://www.reddit.com{submission.get('permalink', '')}",
+            'subreddit': submission.get('subreddit', ''),
+            'score': submission.get('score', 0),
+            'created_utc': submission.get('created_utc', 0),
+            'num_comments': submission.get('num_comments', 0)
+        }
+    
+    def iter_user_items_praw(self, username: str, limit: int = 100, progress_callback=None) -> Iterator[Dict]:
+        """Yield normalized submissions, then comments, as PRAW fetches each page."""
         if not self.reddit:
-            return None
+            return
         
-        try:
-            if progress_callback:
-                progress_callback("🔍 Connecting to Reddit API...")
+        if progress_callback:
+            progress_callback("🔍 Connecting to Reddit API...")
+        
+        user = self.reddit.redditor(username)
+        
+        if progress_callback:
+            progress_callback("📝 Fetching user submissions...")
+        
+        # Get submissions (posts)
+        for i, submission in enumerate(user.submissions.new(limit=limit)):
+            yield self._normalize_praw_submission(submission)
             
-            user = self.reddit.redditor(username)
+            if progress_callback and i % 10 == 0:
+                progress_callback(f"📝 Fetched {i+1} submissions...")
+        
+        if progress_callback:
+            progress_callback("💬 Fetching user comments...")
+        
+        # Get comments
+        for i, comment in enumerate(user.comments.new(limit=limit)):
+            yield self._normalize_praw_comment(comment)
             
-            if progress_callback:
-                progress_callback("📝 Fetching user submissions...")
+            if progress_callback and i % 10 == 0:
+                progress_callback(f"💬 Fetched {i+1} comments...")
+        
+        if progress_callback:
+            progress_callback("✅ Data collection complete!")
+    
+    def _iter_web_listing(self, username: str, listing: str, limit: int, progress_callback=None) -> Iterator[List[Dict]]:
+        """Yield pages of normalized items from a public JSON listing ('comments' or 'submitted')."""
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36'
+        }
+        
+        if listing == 'comments':
+            kind, label, icon = 't1', 'comments', '💬'
+            normalize = self._normalize_web_comment
+        else:
+            kind, label, icon = 't3', 'submissions', '📝'
+            normalize = self._normalize_web_submission
+        
+        fetched = 0
+        batches = 0
+        after = None
+        while fetched < limit:
+            url = f"{self.base_url}/user/{username}/{listing}.json?limit=25"
+            if after:
+                url += f"&after={after}"
             
-            # Get submissions (posts)
-            submissions = []
-            for i, submission in enumerate(user.submissions.new(limit=limit)):
-                submissions.append({
-                    'type': 'submission',
-                    'id': submission.id,
-                    'title': submission.title,
-                    'selftext': submission.selftext,
-                    'url': f"https://www.reddit.com{submission.permalink}",
-                    'subreddit': submission.subreddit.display_name,
-                    'score': submission.score,
-                    'created_utc': submission.created_utc,
-                    'num_comments': submission.num_comments
-                })
-                
-                if progress_callback and i % 10 == 0:
-                    progress_callback(f"📝 Fetched {i+1} submissions...")
+            response = self._get_with_rate_limit(url, headers, listing, progress_callback)
             
-            if progress_callback:
-                progress_callback("💬 Fetching user comments...")
+            if response.status_code == 403 and listing == 'comments':
+                if progress_callback:
+                    progress_callback("⚠️ Access forbidden - Reddit may be blocking requests")
+                print("Access forbidden: Reddit is blocking the request.")
+                break
+            elif response.status_code != 200:
+                if progress_callback:
+                    progress_callback(f"❌ Error fetching {label}: {response.status_code}")
+                if listing == 'comments':
+                    print(f"Error fetching comments: {response.status_code}")
+                break
             
-            # Get comments
-            comments = []
-            for i, comment in enumerate(user.comments.new(limit=limit)):
-                comments.append({
-                    'type': 'comment',
-                    'id': comment.id,
-                    'body': comment.body,
-                    'url': f"https://www.reddit.com{comment.permalink}",
-                    'subreddit': comment.subreddit.display_name,
-                    'score': comment.score,
-                    'created_utc': comment.created_utc,
-                    'submission_title': comment.submission.title if hasattr(comment, 'submission') else ''
-                })
-                
-                if progress_callback and i % 10 == 0:
-                    progress_callback(f"💬 Fetched {i+1} comments...")
+            data = response.json()
+            
+            if 'data' not in data or 'children' not in data['data']:
+                break
+            
+            batch = [normalize(item['data']) for item in data['data']['children'] if item['kind'] == kind]
+            if not batch:
+                break
+            
+            fetched += len(batch)
+            batches += 1
+            yield batch
             
             if progress_callback:
-                progress_callback("✅ Data collection complete!")
+                progress_callback(f"{icon} Fetched {fetched} {label} (batch {batches})...")
             
-            return {
-                'username': username,
-                'submissions': submissions,
-                'comments': comments,
-                'total_submissions': len(submissions),
-                'total_comments': len(comments),
-                'scraped_at': datetime.now().isoformat(),
-                'method': 'praw'
-            }
+            after = data['data']['after']
+            if not after:
+                break
+            
+            self._rate_limit_sleep(self.request_delay)
+    
+    @staticmethod
+    def _rate_limit_sleep(seconds: float):
+        """Sleep between requests, recording the wait."""
+        if seconds <= 0:
+            return
+        with profiling.span("rate-limit sleep"):
+            time.sleep(seconds)  # Rate limiting
+        metrics.RATE_LIMIT_SLEEP.inc(seconds)
+    
+    @staticmethod
+    def _retry_after(response) -> float:
+        """Seconds to wait before retrying a 429, from Retry-After or X-Ratelimit-Reset."""
+        for header in ('Retry-After', 'X-Ratelimit-Reset'):
+            value = response.headers.get(header)
+            if value:
+                try:
+                    return min(max(float(value), 0.0), MAX_RATE_LIMIT_WAIT)
+                except ValueError:
+                    continue
+        return 1.0
+    
+    @staticmethod
+    def _http_get(url: str, headers: Dict):
+        """Issue a GET request (``requests`` is imported on first use)."""
+        import requests
         
-        except Exception as e:
-            print(f"PRAW scraping failed for {username}: {e}")
-            return None
+        return requests.get(url, headers=headers)
     
-    def get_user_data_web(self, username: str, limit: int = 100, progress_callback=None) -> Dict:
-        """Fallback method using web scraping."""
+    def _get_with_rate_limit(self, url: str, headers: Dict, listing: str, progress_callback=None):
+        """GET a listing page, waiting out and retrying 429 responses."""
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            with metrics.HTTP_LATENCY.time(listing=listing):
+                response = self._http_get(url, headers)
+            metrics.HTTP_REQUESTS.inc(listing=listing, status=response.status_code)
+            
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
+            
+            wait = self._retry_after(response)
+            if progress_callback:
+                progress_callback(f"⏳ Rate limited - retrying in {wait:.0f}s...")
+            self._rate_limit_sleep(wait)
+        return response
+    
+    def iter_user_items_web(self, username: str, limit: int = 100, progress_callback=None) -> Iterator[Dict]:
+        """Yield normalized comments, then submissions, page by page via web scraping."""
         if progress_callback:
             progress_callback("🌐 Switching to web scraping mode...")
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36'
-        }
-        
-        all_comments = []
-        all_submissions = []
-        after = None
-        
-        # Get comments
-        try:
-            if progress_callback:
-                progress_callback("💬 Scraping user comments...")
-            
-            comment_batches = 0
-            while len(all_comments) < limit:
-                url = f"https://www.reddit.com/user/{username}/comments.json?limit=25"
-                if after:
-                    url += f"&after={after}"
-                
-                response = requests.get(url, headers=headers)
-                
-                if response.status_code == 403:
-                    if progress_callback:
-                        progress_callback("⚠️ Access forbidden - Reddit may be blocking requests")
-                    print("Access forbidden: Reddit is blocking the request.")
-                    break
-                elif response.status_code != 200:
-                    if progress_callback:
-                        progress_callback(f"❌ Error fetching comments: {response.status_code}")
-                    print(f"Error fetching comments: {response.status_code}")
-                    break
-                
-                data = response.json()
-                
-                if 'data' not in data or 'children' not in data['data']:
-                    break
-                
-                comments_batch = [item['data'] for item in data['data']['children'] if item['kind'] == 't1']
-                if not comments_batch:
-                    break
-                
-                for comment in comments_batch:
-                    all_comments.append({
-                        'type': 'comment',
-                        'id': comment.get('id', ''),
-                        'body': comment.get('body', ''),
-                        'url': f"https://www.reddit.com{comment.get('permalink', '')}",
-                        'subreddit': comment.get('subreddit', ''),
-                        'score': comment.get('score', 0),
-                        'created_utc': comment.get('created_utc', 0),
-                        'submission_title': ''
-                    })
-                
-                comment_batches += 1
+        for listing, label, icon in (('comments', 'comments', '💬'), ('submitted', 'submissions', '📝')):
+            try:
                 if progress_callback:
-                    progress_callback(f"💬 Fetched {len(all_comments)} comments (batch {comment_batches})...")
+                    progress_callback(f"{icon} Scraping user {label}...")
                 
-                after = data['data']['after']
-                if not after:
-                    break
-                
-                time.sleep(1)  # Rate limiting
-        
-        except Exception as e:
-            print(f"Error scraping comments: {e}")
-            if progress_callback:
-                progress_callback(f"❌ Error scraping comments: {e}")
-        
-        # Get submissions
-        try:
-            if progress_callback:
-                progress_callback("📝 Scraping user submissions...")
+                for page in self._iter_web_listing(username, listing, limit, progress_callback):
+                    yield from page
             
-            after = None
-            submission_batches = 0
-            while len(all_submissions) < limit:
-                url = f"https://www.reddit.com/user/{username}/submitted.json?limit=25"
-                if after:
-                    url += f"&after={after}"
-                
-                response = requests.get(url, headers=headers)
-                
-                if response.status_code != 200:
-                    if progress_callback:
-                        progress_callback(f"❌ Error fetching submissions: {response.status_code}")
-                    break
-                
-                data = response.json()
-                
-                if 'data' not in data or 'children' not in data['data']:
-                    break
-                
-                submissions_batch = [item['data'] for item in data['data']['children'] if item['kind'] == 't3']
-                if not submissions_batch:
-                    break
-                
-                for submission in submissions_batch:
-                    all_submissions.append({
-                        'type': 'submission',
-                        'id': submission.get('id', ''),
-                        'title': submission.get('title', ''),
-                        'selftext': submission.get('selftext', ''),
-                        'url': f"https://www.reddit.com{submission.get('permalink', '')}",
-                        'subreddit': submission.get('subreddit', ''),
-                        'score': submission.get('score', 0),
-                        'created_utc': submission.get('created_utc', 0),
-                        'num_comments': submission.get('num_comments', 0)
-                    })
-                
-                submission_batches += 1
+            except Exception as e:
+                print(f"Error scraping {label}: {e}")
                 if progress_callback:
-                    progress_callback(f"📝 Fetched {len(all_submissions)} submissions (batch {submission_batches})...")
-                
-                after = data['data']['after']
-                if not after:
-                    break
-                
-                time.sleep(1)  # Rate limiting
+                    progress_callback(f"❌ Error scraping {label}: {e}")
         
-        except Exception as e:
-            print(f"Error scraping submissions: {e}")
+        if progress_callback:
+            progress_callback("✅ Web scraping complete!")
+    
+    def _iter_user_items(self, username: str, limit: int = 100, progress_callback=None) -> Iterator[Tuple[str, Dict]]:
+        """Yield ``(method, item)`` pairs, preferring PRAW and falling back to web scraping."""
+        seen = set()
+        
+        # Try PRAW first
+        if self.reddit:
             if progress_callback:
-                progress_callback(f"❌ Error scraping submissions: {e}")
+                progress_callback("🔌 Using Reddit API (PRAW)...")
+            
+            try:
+                for item in self.iter_user_items_praw(username, limit, progress_callback):
+                    seen.add((item['type'], item['id']))
+                    yield 'praw', item
+                if seen:
+                    return
+            except Exception as e:
+                print(f"PRAW scraping failed for {username} after {len(seen)} items: {e}")
         
+        # Fallback to web scraping; when PRAW failed part-way it completes the
+        # history, skipping the items that were already yielded
         if progress_callback:
-            progress_callback("✅ Web scraping complete!")
+            progress_callback("🌐 Falling back to web scraping...")
+        
+        print("Falling back to web scraping...")
+        for item in self.iter_user_items_web(username, limit, progress_callback):
+            if (item['type'], item['id']) not in seen:
+                yield 'web_scraping', item
+    
+    def iter_user_items(self, username_or_url: str, limit: int = 100, progress_callback=None) -> Iterator[Dict]:
+        """
+        Stream a user's items page by page using the best available method.
+        
+        Items are yielded as soon as each page arrives, so downstream stages
+        (e.g. ``ActivityAggregator``, ``AnalysisContextBuilder``) can start
+        before the scrape finishes.
+        
+        Args:
+            username_or_url: Reddit username or profile URL
+            limit: Maximum number of posts/comments to fetch
+            progress_callback: Optional callback function for progress updates
+            
+        Yields:
+            Normalized submission and comment dicts
+        """
+        username = self.extract_username_from_url(username_or_url)
+        for _, item in self._iter_user_items(username, limit, progress_callback):
+            yield item
+    
+    async def aiter_user_items(self, username_or_url: str, limit: int = 100, progress_callback=None) -> AsyncIterator[Dict]:
+        """Async counterpart of ``iter_user_items``; page fetches run in a worker thread."""
+        import asyncio
+        
+        iterator = self.iter_user_items(username_or_url, limit, progress_callback)
+        sentinel = object()
+        while True:
+            item = await asyncio.to_thread(next, iterator, sentinel)
+            if item is sentinel:
+                break
+            yield item
+    
+    def _collect(self, username: str, method: str, items: Iterable[Tuple[str, Dict]], consumers=None) -> Dict:
+        """Collect streamed ``(method, item)`` pairs into the ``get_user_data`` dict, feeding any consumers."""
+        submissions = []
+        comments = []
+        for method, item in items:
+            if item['type'] == 'comment':
+                comments.append(item)
+            else:
+                submissions.append(item)
+            for consumer in consumers or ():
+                consumer.add(item)
         
         return {
             'username': username,
-            'submissions': all_submissions,
-            'comments': all_comments,
-            'total_submissions': len(all_submissions),
-            'total_comments': len(all_comments),
+            'submissions': submissions,
+            'comments': comments,
+            'total_submissions': len(submissions),
+            'total_comments': len(comments),
             'scraped_at': datetime.now().isoformat(),
-            'method': 'web_scraping'
+            'method': method
         }
     
-    def get_user_data(self, username_or_url: str, limit: int = 100, progress_callback=None) -> Optional[Dict]:
+    def get_user_data_praw(self, username: str, limit: int = 100, progress_callback=None) -> Optional[Dict]:
+        """Get user data using PRAW (preferred method)."""
+        if not self.reddit:
+            return None
+        
+        try:
+            items = self.iter_user_items_praw(username, limit, progress_callback)
+            return self._collect(username, 'praw', (('praw', item) for item in items))
+        except Exception as e:
+            print(f"PRAW scraping failed for {username}: {e}")
+            return None
+    
+    def get_user_data_web(self, username: str, limit: int = 100, progress_callback=None) -> Dict:
+        """Fallback method using web scraping."""
+        items = self.iter_user_items_web(username, limit, progress_callback)
+        return self._collect(username, 'web_scraping', (('web_scraping', item) for item in items))
+    
+    def get_user_data(self, username_or_url: str, limit: int = 100, progress_callback=None,
+                      consumers=None) -> Optional[Dict]:
         """
         Get user data using the best available method.
         
@@ -286,6 +413,7 @@ class RedditScraper:
             username_or_url: Reddit username or profile URL
             limit: Maximum number of posts/comments to fetch
             progress_callback: Optional callback function for progress updates
+            consumers: Optional objects with an ``add(item)`` method fed as items arrive
             
         Returns:
             Dictionary containing user data or None if failed
@@ -298,70 +426,60 @@ class RedditScraper:
         if progress_callback:
             progress_callback(f"👤 Analyzing user: u/{username}")
         
-        # Try PRAW first
-        if self.reddit:
-            if progress_callback:
-                progress_callback("🔌 Using Reddit API (PRAW)...")
-            
-            data = self.get_user_data_praw(username, limit, progress_callback)
-            if data and (data['total_comments'] > 0 or data['total_submissions'] > 0):
-                return data
-        
-        # Fallback to web scraping
-        if progress_callback:
-            progress_callback("🌐 Falling back to web scraping...")
+        stream = self._iter_user_items(username, limit, progress_callback)
+        data = self._collect(username, 'web_scraping', stream, consumers)
         
-        print("Falling back to web scraping...")
-        data = self.get_user_data_web(username, limit, progress_callback)
-        
-        if data and (data['total_comments'] > 0 or data['total_submissions'] > 0):
+        if data['total_comments'] > 0 or data['total_submissions'] > 0:
             return data
         
         return None
     
-    def save_raw_data(self, data: Dict, output_dir: str = "output") -> str:
-        """Save raw scraped data to JSON file."""
+    def save_raw_data(self, data: Dict, output_dir: str = "output", corpus_path: Optional[str] = None,
+                      fmt: Optional[str] = None) -> str:
+        """
+        Save raw scraped data to disk and record it in the SQLite corpus.
+        
+        Args:
+            data: Dictionary containing scraped Reddit data
+            output_dir: Directory for the raw data file
+            corpus_path: Optional SQLite corpus path (defaults to PERSONA_CORPUS_DB or output_dir)
+            fmt: 'json' (legacy, pretty-printed), 'ndjson', 'ndjson.gz' or 'ndjson.zst';
+                defaults to the RAW_DATA_FORMAT environment variable or 'json'
+            
+        Returns:
+            Path of the written raw data file
+        """
         os.makedirs(output_dir, exist_ok=True)
-        filename = f"{output_dir}/{data['username']}_raw_data.json"
+        filename = raw_data_filename(data['username'], output_dir, fmt or os.getenv('RAW_DATA_FORMAT', 'json'))
+        with profiling.span("write raw data file"):
+            write_raw_data(data, filename)
+        
+        with profiling.span("write corpus"):
+            self.save_to_corpus(data, corpus_path or corpus_path_for(output_dir))
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with profiling.span("build passage index"):
+            self.save_passage_index(data, output_dir)
         
         return filename
     
+    def save_passage_index(self, data: Dict, output_dir: str = "output") -> Optional[str]:
+        """Build the BM25 passage index used for GraphRAG answers; returns its directory."""
+        try:
+            from .passage_index import build_passage_index
+            return build_passage_index(data, output_dir)
+        except Exception as e:
+            print(f"Error building passage index: {e}")
+            return None
+    
+    def save_to_corpus(self, data: Dict, corpus_path: Optional[str] = None) -> Optional[int]:
+        """Upsert scraped data into the SQLite corpus; returns the scrape run id."""
+        try:
+            with RedditCorpus(corpus_path) as corpus:
+                return corpus.upsert_user_data(data)
+        except Exception as e:
+            print(f"Error saving to corpus: {e}")
+            return None
+    
     def prepare_data_for_analysis(self, data: Dict) -> str:
         """Prepare scraped data for LLM analysis."""
-        username = data['username']
-        submissions = data['submissions']
-        comments = data['comments']
-        
-        formatted_text = f"Reddit User Analysis Data for u/{username}\n"
-        formatted_text += f"Scraped on: {data['scraped_at']}\n"
-        formatted_text += f"Total Submissions: {len(submissions)}\n"
-        formatted_text += f"Total Comments: {len(comments)}\n\n"
-        
-        # Add submissions
-        if submissions:
-            formatted_text += "=== SUBMISSIONS (POSTS) ===\n\n"
-            for i, sub in enumerate(submissions[:20], 1):  # Limit to avoid token limits
-                formatted_text += f"Submission {i}:\n"
-                formatted_text += f"Title: {sub['title']}\n"
-                formatted_text += f"Subreddit: r/{sub['subreddit']}\n"
-                formatted_text += f"Score: {sub['score']}\n"
-                formatted_text += f"URL: {sub['url']}\n"
-                if sub['selftext']:
-                    formatted_text += f"Content: {sub['selftext'][:500]}...\n"
-                formatted_text += "\n"
-        
-        # Add comments
-        if comments:
-            formatted_text += "=== COMMENTS ===\n\n"
-            for i, comment in enumerate(comments[:30], 1):  # Limit to avoid token limits
-                formatted_text += f"Comment {i}:\n"
-                formatted_text += f"Subreddit: r/{comment['subreddit']}\n"
-                formatted_text += f"Score: {comment['score']}\n"
-                formatted_text += f"Content: {comment['body'][:300]}...\n"
-                formatted_text += f"URL: {comment['url']}\n"
-                formatted_text += "\n"
-        
-        return formatted_text
+        return build_analysis_context(data)
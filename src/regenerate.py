@@ -0,0 +1,149 @@
+"""
+Persona Regeneration
+Regenerates personas from stored raw data files without scraping, with
+bounded LLM parallelism and prompt-hash skipping so prompt changes can be
+rolled out across a whole corpus quickly.
+"""
+
+import glob
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from .persona_generator import MODEL_NAME, PersonaGenerator
+from .raw_data_io import RAW_FORMATS, load_raw_data
+from .stream_consumers import build_analysis_context
+
+_RAW_FILE_PATTERN = re.compile(r'^(?P<username>.+)_raw_data\.(?:' + '|'.join(re.escape(fmt) for fmt in RAW_FORMATS) + r')$')
+
+# Outcomes reported per user
+GENERATED = 'generated'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+
+
+def expand_raw_paths(patterns: Iterable[str]) -> List[str]:
+    """
+    Resolve files, directories and glob patterns to raw data files.
+
+    Directories contribute every ``*_raw_data.*`` file inside them. When a
+    user has raw data in several formats, only the newest file is kept.
+    """
+    candidates = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*_raw_data.*')
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        candidates.extend(path for path in matches if os.path.isfile(path))
+
+    newest: Dict[str, str] = {}
+    for path in candidates:
+        match = _RAW_FILE_PATTERN.match(os.path.basename(path))
+        key = match.group('username') if match else os.path.abspath(path)
+        if key not in newest or os.path.getmtime(path) > os.path.getmtime(newest[key]):
+            newest[key] = path
+    return sorted(newest.values())
+
+
+def persona_meta_path(username: str, output_dir: str = "output") -> str:
+    """Sidecar file recording how a saved persona was generated."""
+    return os.path.join(output_dir, f"{username}_persona.meta.json")
+
+
+def _read_meta(path: str) -> Optional[Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def regenerate_persona(generator: PersonaGenerator, raw_path: str, output_dir: str = "output",
+                       force: bool = False) -> Dict:
+    """
+    Regenerate one user's persona from a raw data file.
+
+    Args:
+        generator: Persona generator (shared across threads)
+        raw_path: Raw data file in any supported format
+        output_dir: Directory for the persona and its sidecar
+        force: Regenerate even if the prompt hash is unchanged
+
+    Returns:
+        Dictionary with ``username``, ``status``, ``raw_data_file`` and (when generated) ``persona_file``
+    """
+    reddit_data = load_raw_data(raw_path)
+    username = reddit_data['username']
+    result = {'username': username, 'raw_data_file': raw_path}
+
+    formatted_data = build_analysis_context(reddit_data)
+    prompt_hash = generator.prompt_hash(generator.create_persona_prompt(formatted_data, username))
+    meta_path = persona_meta_path(username, output_dir)
+    persona_path = os.path.join(output_dir, f"{username}_persona.txt")
+
+    if not force and os.path.exists(persona_path):
+        meta = _read_meta(meta_path)
+        if meta and meta.get('prompt_sha256') == prompt_hash:
+            result['status'] = UNCHANGED
+            result['persona_file'] = persona_path
+            return result
+
+    persona_text = generator.generate_persona(reddit_data, formatted_data=formatted_data, allow_fallback=False)
+    if not persona_text:
+        result['status'] = FAILED
+        return result
+
+    result['persona_file'] = generator.save_persona(persona_text, username, output_dir)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'prompt_sha256': prompt_hash,
+            'model': MODEL_NAME if generator.model else 'fallback',
+            'raw_data_file': raw_path,
+            'generated_at': datetime.now().isoformat()
+        }, f, indent=2)
+    result['status'] = GENERATED
+    return result
+
+
+def regenerate_personas(patterns: Iterable[str], output_dir: str = "output", workers: int = 4,
+                        force: bool = False, generator: Optional[PersonaGenerator] = None,
+                        progress_callback=None) -> List[Dict]:
+    """
+    Regenerate personas for every raw data file matching ``patterns``.
+
+    Args:
+        patterns: Raw data files, directories or glob patterns
+        output_dir: Directory for personas and sidecars
+        workers: Maximum concurrent users (bounds parallel Gemini calls)
+        force: Regenerate even when the prompt hash is unchanged
+        generator: Persona generator to use (created when omitted)
+        progress_callback: Optional callback function for progress updates
+
+    Returns:
+        One result per user (see ``regenerate_persona``)
+    """
+    paths = expand_raw_paths(patterns)
+    if not paths:
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+    generator = generator or PersonaGenerator()
+    results = []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(regenerate_persona, generator, path, output_dir, force): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'username': None, 'raw_data_file': futures[future], 'status': FAILED, 'error': str(e)}
+            results.append(result)
+            if progress_callback:
+                icon = {GENERATED: '🎭', UNCHANGED: '⏭️', FAILED: '❌'}[result['status']]
+                name = f"u/{result['username']}" if result['username'] else futures[future]
+                progress_callback(f"{icon} [{len(results)}/{len(paths)}] {name}: {result['status']}")
+
+    return results
@@ -0,0 +1,167 @@
+"""
+Streaming Consumers
+Incremental consumers fed item by item while a scrape is still running.
+
+Each consumer exposes ``add(item)``; pass instances to
+``RedditScraper.get_user_data(consumers=[...])`` or feed them from
+``RedditScraper.iter_user_items``.
+"""
+
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Limits to avoid token limits in the persona prompt
+MAX_PROMPT_SUBMISSIONS = 20
+MAX_PROMPT_COMMENTS = 30
+
+# Timestamped items needed before the context includes a timezone estimate
+MIN_TIMEZONE_ITEMS = 10
+
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+class AnalysisContextBuilder:
+    """Incrementally build the LLM analysis text produced by ``prepare_data_for_analysis``."""
+
+    def __init__(self, username: str, scraped_at: Optional[str] = None):
+        """Start an empty context for ``username``."""
+        self.username = username
+        self.scraped_at = scraped_at
+        self.total_submissions = 0
+        self.total_comments = 0
+        self._submission_blocks: List[str] = []
+        self._comment_blocks: List[str] = []
+        self._hour_counts: List[int] = [0] * 24
+
+    def add(self, item: Dict):
+        """Format one item into the context (only the first few of each type are kept)."""
+        created_utc = item.get('created_utc')
+        if created_utc:
+            self._hour_counts[int(created_utc) % 86400 // 3600] += 1
+        if item['type'] == 'comment':
+            self.total_comments += 1
+            if len(self._comment_blocks) < MAX_PROMPT_COMMENTS:
+                self._comment_blocks.append(self._format_comment(item, len(self._comment_blocks) + 1))
+        else:
+            self.total_submissions += 1
+            if len(self._submission_blocks) < MAX_PROMPT_SUBMISSIONS:
+                self._submission_blocks.append(self._format_submission(item, len(self._submission_blocks) + 1))
+
+    @staticmethod
+    def _format_submission(sub: Dict, i: int) -> str:
+        block = f"Submission {i}:\n"
+        block += f"Title: {sub['title']}\n"
+        block += f"Subreddit: r/{sub['subreddit']}\n"
+        block += f"Score: {sub['score']}\n"
+        block += f"URL: {sub['url']}\n"
+        if sub['selftext']:
+            block += f"Content: {sub['selftext'][:500]}...\n"
+        return block + "\n"
+
+    @staticmethod
+    def _format_comment(comment: Dict, i: int) -> str:
+        block = f"Comment {i}:\n"
+        block += f"Subreddit: r/{comment['subreddit']}\n"
+        block += f"Score: {comment['score']}\n"
+        block += f"Content: {comment['body'][:300]}...\n"
+        block += f"URL: {comment['url']}\n"
+        return block + "\n"
+
+    def build(self, scraped_at: Optional[str] = None) -> str:
+        """Render the analysis text for everything added so far."""
+        formatted_text = f"Reddit User Analysis Data for u/{self.username}\n"
+        formatted_text += f"Scraped on: {scraped_at or self.scraped_at}\n"
+        formatted_text += f"Total Submissions: {self.total_submissions}\n"
+        formatted_text += f"Total Comments: {self.total_comments}\n"
+        formatted_text += self._timezone_line() + "\n"
+
+        if self._submission_blocks:
+            formatted_text += "=== SUBMISSIONS (POSTS) ===\n\n"
+            formatted_text += ''.join(self._submission_blocks)
+
+        if self._comment_blocks:
+            formatted_text += "=== COMMENTS ===\n\n"
+            formatted_text += ''.join(self._comment_blocks)
+
+        return formatted_text
+
+    def _timezone_line(self) -> str:
+        if sum(self._hour_counts) < MIN_TIMEZONE_ITEMS:
+            return ""
+        # numpy-backed; imported here to keep CLI startup light
+        from .activity_analytics import estimate_timezone
+        estimate = estimate_timezone(self._hour_counts)
+        return (f"Estimated Timezone: {estimate['label']} (confidence: {estimate['confidence']:.2f}, "
+                f"inferred from posting hours)\n")
+
+
+def build_analysis_context(data: Dict) -> str:
+    """Build the LLM analysis text for a complete ``get_user_data`` dict."""
+    builder = AnalysisContextBuilder(data['username'], data.get('scraped_at'))
+    for item in data['submissions']:
+        builder.add(item)
+    for item in data['comments']:
+        builder.add(item)
+    return builder.build()
+
+
+class ActivityAggregator:
+    """Running activity statistics (counts, karma, hour/day histograms) over streamed items."""
+
+    def __init__(self):
+        """Start with empty statistics."""
+        self.total_posts = 0
+        self.total_comments = 0
+        self.total_karma = 0
+        self.subreddit_counts: Counter = Counter()
+        self.karma_by_subreddit: Counter = Counter()
+        self.activity_by_hour: List[int] = [0] * 24
+        self.activity_by_day: List[int] = [0] * 7
+        self.most_upvoted: Optional[Dict] = None
+        self.most_downvoted: Optional[Dict] = None
+
+    def add(self, item: Dict):
+        """Fold one item into the statistics."""
+        if item['type'] == 'comment':
+            self.total_comments += 1
+        else:
+            self.total_posts += 1
+
+        score = item.get('score') or 0
+        subreddit = item.get('subreddit') or 'unknown'
+        self.total_karma += score
+        self.subreddit_counts[subreddit] += 1
+        self.karma_by_subreddit[subreddit] += score
+
+        moment = datetime.fromtimestamp(item.get('created_utc') or 0, tz=timezone.utc)
+        self.activity_by_hour[moment.hour] += 1
+        self.activity_by_day[moment.weekday()] += 1
+
+        if self.most_upvoted is None or score > self.most_upvoted['score']:
+            self.most_upvoted = item
+        if self.most_downvoted is None or score < self.most_downvoted['score']:
+            self.most_downvoted = item
+
+    @property
+    def total_items(self) -> int:
+        return self.total_posts + self.total_comments
+
+    @property
+    def avg_karma(self) -> float:
+        return self.total_karma / self.total_items if self.total_items else 0.0
+
+    def snapshot(self) -> Dict:
+        """Return the current statistics as a plain dict."""
+        return {
+            'total_posts': self.total_posts,
+            'total_comments': self.total_comments,
+            'total_karma': self.total_karma,
+            'avg_karma': self.avg_karma,
+            'top_subreddits': self.subreddit_counts.most_common(10),
+            'karma_by_subreddit': self.karma_by_subreddit.most_common(10),
+            'activity_by_hour': dict(enumerate(self.activity_by_hour)),
+            'activity_by_day': dict(zip(DAY_NAMES, self.activity_by_day)),
+            'most_upvoted': self.most_upvoted,
+            'most_downvoted': self.most_downvoted
+        }
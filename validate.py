@@ -39,6 +39,26 @@ try:
 except Exception as e:
     print(f"❌ Persona generator initialization failed: {e}")
 
+# Entity resolution must never merge opposite traits
+try:
+    from src.entity_resolution import resolve_entities
+
+    def merged_count(entity_type, first, second):
+        graph = {'entities': [{'id': 'a', 'type': entity_type, 'properties': {'name': first}},
+                              {'id': 'b', 'type': entity_type, 'properties': {'name': second}}],
+                 'relationships': []}
+        return resolve_entities(graph)['resolution']['merged']
+
+    antonyms = [('Friendly', 'Unfriendly'), ('Reliable', 'Unreliable'),
+                ('Responsible', 'Irresponsible'), ('Political', 'Apolitical')]
+    for entity_type in ('Personality_Trait', 'Interest'):
+        for first, second in antonyms:
+            assert merged_count(entity_type, first, second) == 0, f"{first} / {second} merged as {entity_type}"
+    assert merged_count('Interest', 'Video Games', 'Video Gaming') == 1
+    print("✅ Entity resolution keeps opposite traits apart")
+except Exception as e:
+    print(f"❌ Entity resolution check failed: {e}")
+
 print("\n🎉 Basic validation complete!")
 print("💡 If all tests passed, the app should work correctly.")
 print("💡 Run: streamlit run app.py")